@@ -1,9 +1,14 @@
 import asyncio
+import math
 import os
 from langchain.prompts import PromptTemplate
 import yaml
 from discovery import Discovery
-from openai import AsyncOpenAI
+from discovery.vision_cache import VisionCache
+from discovery.screenshot import crop_for_hint, get_capture_profile
+from discovery.clients import get_async_http_client, get_openai_client, warm_up
+from discovery.llm_cache import get_llm_cache
+from discovery.model_context import SummarizingChatCompletionContext
 from dotenv import load_dotenv
 from typing import List
 
@@ -17,20 +22,75 @@ from autogen_core.tools import FunctionTool
 from autogen_core.models import ModelFamily
 from autogen_core.models import AssistantMessage, LLMMessage, ModelFamily
 from autogen_ext.models.ollama import OllamaChatCompletionClient
+from autogen_ext.models.cache import ChatCompletionCache
+
+# capture_panorama(concurrent=True) で同時に送る画像分析リクエストの最大数
+PANORAMA_CONCURRENCY = 3
+
+
+def _strip_yaml_fence(text: str) -> str:
+    """YAML出力が```yaml ... ```で囲まれている場合、中身だけ取り出す"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+# attention_hint が画面の一部（空、足元、左右、正面）だけを指している場合に、その領域を切り抜いて送るか
+CROP_TO_HINT = os.environ.get('DISCOVERY_CAPTURE_CROP', '1') != '0'
+
+
+async def analyze_view_images(images, attention_hint: str = None, detail: str = "auto") -> str:
+    """
+    スクリーンショットをGPT-4oで分析し、YAML形式の文字列を返します。
+
+    Args:
+        images (list): (方角, Capture) のリスト。方角がNoneの画像が1枚だけの場合は、方角のキーを付けずに記述させます。
+        attention_hint (str, optional): 分析時に特に注意してほしい点
+        detail (str): 画像分析APIに渡す detail ('low', 'high', 'auto')
+
+    Returns:
+        str: YAML形式の文字列
+    """
+    # 接続プールを共有するクライアントを使い回す（呼び出しごとに接続し直さない）
+    client = get_openai_client()
+
+    labeled = [direction for direction, _ in images if direction is not None]
+    if labeled:
+        prompt = f"これはMinecraftゲームの{len(images)}枚のスクリーンショットで、それぞれBOTが {', '.join(labeled)} の方角を向いて撮影したものです（画像の前に方角を記載しています）。各画像の内容を詳細に分析し、方角をトップレベルのキーとして、視界内にある重要なオブジェクト、ブロックの種類、MOB、脅威となる情報、その他 視界から得られる情報を階層的なYAML形式で記述してください。"
+    else:
+        prompt = "これはMinecraftゲームのスクリーンショットです。画像の内容を詳細に分析し、視界内にある重要なオブジェクト、ブロックの種類、MOB、脅威となる情報、その他 視界から得られる情報を階層的なYAML形式で記述してください。"
+    if attention_hint is not None:
+        prompt += f"\n特に、[{attention_hint}] について詳しく記述してください。"
+    prompt += "\n注意: 取得した視界情報はエミュレータから取得した視点であるため、天気や時間は反映されていません。また一部のエンティティのテクスチャがバグり、紫色になっていることがあります。"
+
+    content = [{"type": "text", "text": prompt}]
+    for direction, capture in images:
+        if direction is not None:
+            content.append({"type": "text", "text": f"direction: {direction}"})
+        content.append({
+            "type": "image_url",
+            "image_url": {"url": f"data:{capture.mime_type};base64,{capture.data}", "detail": detail},
+        })
+
+    response = await client.chat.completions.create(
+        model="gpt-4o",
+        messages=[{"role": "user", "content": content}],
+        max_tokens=min(4096, 1500 * len(images)), # YAML出力のために十分なトークン数を確保
+    )
+    return _strip_yaml_fence(response.choices[0].message.content)
 
 
 class ReasoningModelContext(UnboundedChatCompletionContext):
     """A model context for reasoning models."""
 
-    async def get_messages(self) -> List[LLMMessage]:
-        messages = await super().get_messages()
-        # Filter out thought field from AssistantMessage.
-        messages_out: List[LLMMessage] = []
-        for message in messages:
-            if isinstance(message, AssistantMessage):
-                message.thought = None
-            messages_out.append(message)
-        return messages_out
+    async def add_message(self, message: LLMMessage) -> None:
+        # Filter out thought field from AssistantMessage once, instead of on every get_messages call.
+        if isinstance(message, AssistantMessage) and message.thought is not None:
+            message = message.model_copy(update={"thought": None})
+        await super().add_message(message)
 
 class Auto_gen:
     def __init__(self,discovery: Discovery) -> None:
@@ -41,6 +101,8 @@ class Auto_gen:
         self.prompt_file_dir = "LLM/prompts"
         self.discovery = discovery
         self.bot_status = "未取得"
+        # capture_bot_view の分析結果のキャッシュ（ほぼ同じ視界ではAPIを呼ばない）
+        self.vision_cache = VisionCache()
         self.load_tool()
         self.load_agents()
     
@@ -63,20 +125,45 @@ class Auto_gen:
             model=model_name,
             api_key=api_key,
             base_url="https://api.deepseek.com", # From DeepSeek documentation
+            http_client=get_async_http_client(), # Share the keep-alive connection pool
             model_info=model_info
         )
-        return client
+        return self.with_cache(client, model_name)
+
+    def with_cache(self, client, model_name: str):
+        """
+        応答キャッシュが有効な場合（環境変数 DISCOVERY_LLM_CACHE が readwrite または replay）、
+        モデルクライアントを ChatCompletionCache で包みます。キャッシュはモデル名ごとに分けて保存します。
+        replay モードでキャッシュにない要求を受けた場合は CacheMiss を投げます。
+        """
+        cache = get_llm_cache()
+        if not cache.enabled:
+            return client
+        return ChatCompletionCache(client, store=cache.namespace(model_name))
     
+    def new_model_context(self, strip_thoughts: bool = False) -> SummarizingChatCompletionContext:
+        """
+        エージェント1体分のモデルコンテキストを作成します。
+        会話が DISCOVERY_CONTEXT_TOKENS トークンを超えると、古い会話を gpt-4o-mini で要約して置き換えます。
+        """
+        return SummarizingChatCompletionContext(
+            summary_client=self.model_client_o4_mini,
+            strip_thoughts=strip_thoughts,
+        )
+
     def load_agents(self) -> None:
-        self.model_client = OpenAIChatCompletionClient(model="gpt-4.1")
-        self.model_client_o1 = OpenAIChatCompletionClient(model="o1")
-        self.model_client_4o = OpenAIChatCompletionClient(model="gpt-4o")
+        # 全てのモデルクライアントで、共有の接続プールを使う
+        http_client = get_async_http_client()
+        self.model_client = self.with_cache(OpenAIChatCompletionClient(model="gpt-4.1", http_client=http_client), "gpt-4.1")
+        self.model_client_o1 = self.with_cache(OpenAIChatCompletionClient(model="o1", http_client=http_client), "o1")
+        self.model_client_4o = self.with_cache(OpenAIChatCompletionClient(model="gpt-4o", http_client=http_client), "gpt-4o")
         self.model_client_deepseek = self.deepseek_client(model_name="deepseek-reasoner")
 
         # Add the new gpt-4o-mini client
-        self.model_client_o4_mini = OpenAIChatCompletionClient(
+        self.model_client_o4_mini = self.with_cache(OpenAIChatCompletionClient(
             model="gpt-4o-mini",
             api_key=os.getenv("OPENAI_API_KEY"), # Assuming standard OpenAI API key
+            http_client=http_client,
             model_info={
                 "vision": False,            # gpt-4o-mini does not have vision capabilities
                 "function_calling": True,   # OpenAI models generally support function calling
@@ -85,13 +172,14 @@ class Auto_gen:
                 "multiple_system_messages": True, # Assuming support
                 "family": ModelFamily.UNKNOWN
             }
-        )
+        ), "gpt-4o-mini")
 
         # Define the new consolidated agent
         self.BotInformationAgent = AssistantAgent(
             name="BotInformationAgent",
-            tools=[self.get_bot_status_tool, self.capture_bot_view_tool], # Combine tools
+            tools=[self.get_bot_status_tool, self.capture_bot_view_tool, self.capture_panorama_tool], # Combine tools
             model_client=self.model_client_4o, # Use a capable model, like gpt-4o for potential image analysis
+            model_context=self.new_model_context(),
             description="An agent that retrieves and explains the Minecraft Bot's status (stats, inventory items, surroundings blocks, entities) and visual information.",
             system_message="""
             You are an agent specializing in gathering and reporting information about the Minecraft Bot's current state.
@@ -99,12 +187,14 @@ class Auto_gen:
             Your primary responsibilities are:
             1.  **Retrieve Bot Status:** Use the `get_bot_status_tool` to fetch details like health, hunger, position, biome, time, inventory, nearby blocks, and entities when needed or requested.
             2.  **Capture Bot View:** Use the `capture_bot_view_tool` when visual information is required. You can specify a `direction` (e.g., 'north', 'east', 'up', 'down') and an `attention_hint` (e.g., "look for sheep", "analyze the cave entrance"). This tool returns a YAML description of the bot's view.
+                *   When you need to look in **several directions**, call `capture_panorama_tool` once with a list of `directions` instead of calling `capture_bot_view_tool` repeatedly. It returns one YAML document keyed by direction.
             3.  **Report Information:** Clearly summarize the gathered information (status and/or view) in **English**. When reporting view information from `capture_bot_view_tool`, present the YAML output directly as provided by the tool. Ensure all Minecraft item and block names remain in their original English format.
             4.  **Handle Tool Issues:** If a tool call fails or times out, report the issue and suggest that `CodeExecutionAgent` might need to execute `await skills.handle_connection_error()`.
 
             Available Tools:
             - `get_bot_status_tool`: Fetches the bot's numerical and environmental status.
             - `capture_bot_view_tool`: Captures and analyzes the bot's visual perspective, returning a YAML description.
+            - `capture_panorama_tool`: Captures several directions in one pass and returns per-direction YAML.
 
             **You must always provide your answers and summaries in English.** Your goal is to provide accurate and timely information to assist other agents in their tasks.
             """
@@ -118,6 +208,7 @@ class Auto_gen:
         self.MissionPlannerAgent = AssistantAgent(
             name="MissionPlannerAgent",
             model_client=self.model_client,
+            model_context=self.new_model_context(),
             description="MinecraftのBotの状態をもとに、目標達成のためのタスクを立案するエージェント",
             system_message=f"""
             あなたは、マインクラフトを熟知した高度なAIエージェントであり、最終目標達成のための**検証可能なタスク**を立案するエージェントです。
@@ -195,6 +286,7 @@ class Auto_gen:
             name="ProcessReviewerAgent",
             tools=[self.get_skill_summary_tool],
             model_client=self.model_client,
+            model_context=self.new_model_context(),
             description="提案されたタスクが、利用可能な関数や現在のBotの状態で実行可能かをレビューするエージェント",
             system_message="""
             あなたは、提案されたタスクが、MineCraftBotにて実行可能かどうかを評価するエージェントです。
@@ -219,6 +311,7 @@ class Auto_gen:
         self.TaskCompletionAgent = AssistantAgent(
             name="TaskCompletionAgent",
             model_client=self.model_client,
+            model_context=self.new_model_context(),
             description="Pythonコードの実行結果をもとに、タスクの完了を確認するエージェント",
             system_message="""
             あなたは、実行されたタスクが**当初定義された成功条件**を満たしたかどうかを最終的に判断するAIエージェントです。
@@ -244,6 +337,7 @@ class Auto_gen:
                 self.get_skills_list_tool
             ],
             model_client=self.model_client,
+            model_context=self.new_model_context(),
             description="提案されたタスクを実行するためのPythonコードを生成し、即座に実行して結果を報告するエージェント",
             system_message="""
             あなたは、Minecraft Bot の操作を自動化するための Python コードを生成し、**即座に実行してその結果を客観的に報告する**専門のAIエージェントです。
@@ -282,11 +376,14 @@ class Auto_gen:
             *   `await skills.collect_block(block_name, num=1)`
             *   `await skills.place_block(block_name, x, y, z)`
             *   `await skills.craft_items(item_name, num=1)`
+            *   `skills.plan_craft(item_name, num=1)` (材料のレシピまで遡ったクラフト手順と不足素材を確認)
+            *   `await skills.craft_with_plan(item_name, num=1)` (原木などから中間素材を含めてまとめてクラフト)
             *   `await skills.get_inventory_counts()`
             *   `await skills.get_nearest_block(block_name, max_distance=1000)`
             *   `await skills.get_bot_position()`
             *   `await skills.look_at_direction(direction)`
             *   `await skills.smelt_item(item_name, num=1)`
+            *   `await skills.start_smelting(item_name, num=1)` (精錬を開始してすぐ戻る。戻り値の `job` を `await skills.collect_smelting(job)` で回収)
             *   `await skills.put_in_chest(item_name, num=-1)`
             *   `await skills.take_from_chest(item_name, num=-1)`
 
@@ -309,6 +406,7 @@ class Auto_gen:
                 self.get_skill_code_tool
             ],
             model_client=self.model_client,
+            model_context=self.new_model_context(),
             description="コード実行エラーを分析し、実行履歴やスキル情報をツールで確認しながらデバッグと修正案の提案を行います",
             system_message="""
             あなたは、Python コードのデバッグと問題解決を支援する、**高度な分析能力を持つ** AI アシスタントです。
@@ -354,6 +452,8 @@ class Auto_gen:
         プランナーエージェントが他のエージェントの作業開始前にタスクを割り当てていることを確認してください。
         エージェントは1つだけ選択してください。
         """
+        # エージェントの最初の発言を待つ間に、APIへの接続を確立しておく
+        self._warm_up_task = asyncio.create_task(warm_up())
         termination = TextMentionTermination("タスク完了")
         team = SelectorGroupChat(
             participants= [
@@ -401,12 +501,16 @@ class Auto_gen:
     def load_tool(self) -> None:
         self.get_bot_status_tool = FunctionTool(
             self.get_bot_status,
-            description="MineCraftBotの状態を取得するツールです。辞書形式で、BOTの現在地、バイオーム、体力、空腹度、時間、近くの周辺ブロック情報、周囲のエンティティ情報、インベントリ情報を返します。"
+            description="MineCraftBotの状態を取得するツールです。辞書形式で、BOTの現在地、バイオーム、体力、空腹度、時間、近くの周辺ブロック情報、周囲のエンティティ情報、インベントリ情報を返します。引数 `radius`（1〜32、デフォルト3）で周辺ブロック情報を取得する水平方向の範囲を指定できます。"
         )
         self.capture_bot_view_tool = FunctionTool(
             self.capture_bot_view,
             description="指定された方角を向いてからMineCraftBotの視界の情報を取得するツールです。BOT視点の情報を、YAML形式で返します。引数 `direction` で方角（例: 'north', 'east', 'up'）を指定できます。遠くの景色も含めた情報を取得できます。"
         )
+        self.capture_panorama_tool = FunctionTool(
+            self.capture_panorama,
+            description="複数の方角（引数 `directions`、例: ['north', 'east', 'south', 'west', 'up', 'down']。デフォルトは東西南北）を1回の呼び出しでまとめて撮影・分析し、方角をキーとしたYAML形式で返すツールです。複数の方角を確認したい場合は capture_bot_view を繰り返すよりも高速です。"
+        )
         self.get_skills_list_tool = FunctionTool(
             self.get_skills_list,
             description="利用可能な高レベルスキル（`skills`オブジェクトのメソッド）に関する**詳細情報**を取得します。各スキルについて、**完全なシグネチャ、詳細な説明、引数や戻り値を含む包括的な使用方法**を提供します。引数 `skill_names` (文字列のリスト) を指定することで、特定のスキルセットの情報のみを取得できます。指定しない場合、利用可能な全スキルを返します。"
@@ -551,10 +655,15 @@ class Auto_gen:
         
         return "\n".join(output_parts)
     
-    async def get_bot_status(self) -> str:
-        """Retrieves the bot's status from discovery and returns it as a formatted string for the LLM."""
+    async def get_bot_status(self, radius: int = 3) -> str:
+        """Retrieves the bot's status from discovery and returns it as a formatted string for the LLM.
+
+        Args:
+            radius: Horizontal range (in blocks) used to classify nearby blocks by direction.
+        """
         print("\033[34mTool:GetBotStatus called (Retrieving BOT status)\033[0m")
-        bot_status_dict = await self.discovery.get_bot_status()
+        radius = max(1, min(int(radius), 32))
+        bot_status_dict = await self.discovery.get_bot_status(radius=radius)
 
         if bot_status_dict is None:
             return "Could not retrieve bot status."
@@ -573,7 +682,7 @@ class Auto_gen:
         output_lines.append(f"- Hunger: {hunger} / 20")
         output_lines.append(f"- Position: {bot_status_dict.get('bot_position', 'N/A')}")
 
-        output_lines.append("\nNearby Blocks:")
+        output_lines.append(f"\nNearby Blocks (radius {radius}):")
         for direction in ["front", "right", "back", "left", "center"]:
             blocks = bot_status_dict.get(f"{direction}_blocks", [])
             blocks_str = ", ".join(blocks) if blocks else "None"
@@ -615,50 +724,27 @@ class Auto_gen:
         print(f"\033[34mTool:CaptureBotView が呼び出されました(Direction: {direction or 'current'}, Hint: {attention_hint or 'None'})\033[0m")
 
         # --- スクリーンショット取得処理を Discovery に移譲 (direction を渡す) ---
-        base64_image = await self.discovery.get_screenshot_base64(direction=direction)
-        if base64_image is None:
+        # 分析に十分な解像度まで縮小・再エンコードし、ヒントが画面の一部を指していればその領域だけを送る
+        profile = get_capture_profile()
+        crop = crop_for_hint(attention_hint) if CROP_TO_HINT else None
+        capture = await self.discovery.capture_view(direction=direction, profile=profile, crop=crop)
+        if capture is None:
             print("エラー: スクリーンショットの取得に失敗しました。")
             return "None" # エラーを示す文字列を返す
         # --- ここまで変更 ---
 
-        # OpenAI クライアントを初期化
-        client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
+        # 同じ位置・方角・ヒントで、ほぼ同じ画像の分析結果があればそれを返す
+        cache_key = (self._bot_block_position(), direction, attention_hint, profile.name, crop)
+        cached = self.vision_cache.get(cache_key, capture.hash)
+        if cached is not None:
+            print(f"\033[34m前回とほぼ同じ視界のため、キャッシュした分析結果を返します。(hash: {capture.hash})\033[0m")
+            return cached
 
         try:
-            data_url = f"data:image/png;base64,{base64_image}"
-
-            prompt = "これはMinecraftゲームのスクリーンショットです。画像の内容を詳細に分析し、視界内にある重要なオブジェクト、ブロックの種類、MOB、脅威となる情報、その他 視界から得られる情報を階層的なYAML形式で記述してください。"
-            # --- attention_hint をプロンプトに追加するロジックを復元 ---
-            if attention_hint is not None:
-                prompt += f"\n特に、[{attention_hint}] について詳しく記述してください。"
-            prompt += "\n注意: 取得した視界情報はエミュレータから取得した視点であるため、天気や時間は反映されていません。また一部のエンティティのテクスチャがバグり、紫色になっていることがあります。"
-            # --- ここまで復元 ---
-
-            response = await client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": data_url},
-                            },
-                        ],
-                    }
-                ],
-                max_tokens=1500, # YAML出力のために十分なトークン数を確保
-            )
-            yaml_output = response.choices[0].message.content
-            # YAML出力が```yaml ... ```で囲まれている場合、中身だけ取り出す
-            if yaml_output.startswith("```yaml\\n"):
-                yaml_output = yaml_output[len("```yaml\\n"):]
-            if yaml_output.endswith("\\n```"):
-                yaml_output = yaml_output[:-len("\\n```")]
+            yaml_output = await analyze_view_images([(None, capture)], attention_hint, detail=profile.detail)
+            self.vision_cache.put(cache_key, capture.hash, yaml_output)
             print("\033[34mスクリーンショットの内容をGPT-4oで分析し、YAML形式で記述しました。\033[0m")
-            return yaml_output.strip() # 前後の空白を削除
+            return yaml_output
 
         except Exception as e:
             print(f"スクリーンショットの取得またはGPT-4o API呼び出し中にエラーが発生しました: {e}")
@@ -666,6 +752,66 @@ class Auto_gen:
             traceback.print_exc()
             return "None"
 
+    async def capture_panorama(self, directions: List[str] = None, attention_hint: str = None, concurrent: bool = False) -> str:
+        """
+        複数の方角を1つのブラウザセッションで続けて撮影し、GPT-4oでまとめて分析して方角ごとのYAMLを返します。
+
+        Args:
+            directions (List[str], optional): 撮影する方角のリスト。デフォルトは ['north', 'east', 'south', 'west']
+            attention_hint (str, optional): 分析時に特に注意してほしい点を記述する文字列。
+            concurrent (bool, optional): Trueの場合は画像ごとに並行して分析します（最大 PANORAMA_CONCURRENCY 件）。
+                                         Falseの場合は全ての画像を1回のリクエストで分析します。
+
+        Returns:
+            str: 方角をトップレベルのキーとしたYAML形式の文字列。エラー時は"None"。
+        """
+        directions = list(directions or ['north', 'east', 'south', 'west'])
+        print(f"\033[34mTool:CapturePanorama が呼び出されました(Directions: {', '.join(directions)}, Hint: {attention_hint or 'None'})\033[0m")
+
+        profile = get_capture_profile()
+        crop = crop_for_hint(attention_hint) if CROP_TO_HINT else None
+        images = await self.discovery.capture_panorama(directions, profile=profile, crop=crop)
+        captured = [(direction, image) for direction, image in images.items() if image is not None]
+        if not captured:
+            print("エラー: スクリーンショットの取得に失敗しました。")
+            return "None"
+
+        try:
+            if concurrent:
+                semaphore = asyncio.Semaphore(PANORAMA_CONCURRENCY)
+
+                async def analyze(direction, image):
+                    async with semaphore:
+                        return await analyze_view_images([(None, image)], attention_hint, detail=profile.detail)
+
+                outputs = await asyncio.gather(*(analyze(direction, image) for direction, image in captured))
+                sections = []
+                for (direction, _), output in zip(captured, outputs):
+                    body = "\n".join(f"  {line}" for line in output.splitlines())
+                    sections.append(f"{direction}:\n{body}")
+                yaml_output = "\n".join(sections)
+            else:
+                yaml_output = await analyze_view_images(captured, attention_hint, detail=profile.detail)
+            missing = [direction for direction, image in images.items() if image is None]
+            if missing:
+                yaml_output += "\n" + "\n".join(f"{direction}: null  # capture failed" for direction in missing)
+            print("\033[34m複数方角のスクリーンショットをGPT-4oで分析し、YAML形式で記述しました。\033[0m")
+            return yaml_output
+
+        except Exception as e:
+            print(f"スクリーンショットの分析中にエラーが発生しました: {e}")
+            import traceback
+            traceback.print_exc()
+            return "None"
+
+    def _bot_block_position(self):
+        """視界キャッシュのキーに使う、BOTのブロック座標を返します。取得できない場合はNone。"""
+        try:
+            position = self.discovery.bot.entity.position
+            return (math.floor(position.x), math.floor(position.y), math.floor(position.z))
+        except Exception:
+            return None
+
     # Add the new wrapper method for execution history
     async def _get_code_execution_history_wrapper(self) -> str:
         """Retrieves the last 5 code execution history entries and formats them for the LLM."""
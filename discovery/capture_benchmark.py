@@ -0,0 +1,126 @@
+"""
+キャプチャプロファイルごとの、画像サイズ・画像トークン数・所要時間・分析結果の品質を比較するベンチマークです。
+
+使い方:
+    python -m discovery.capture_benchmark --directions north east --hint "足元のブロック"
+
+同じ視点で各プロファイルの画像を撮影して分析し、'full'（従来の960x540 PNG）の分析結果を基準として、
+分析結果に現れるブロック・MOBなどの名前がどれだけ一致するか（Jaccard係数）を品質の目安として表示します。
+"""
+import argparse
+import asyncio
+import math
+import re
+import time
+
+from .discovery import Discovery
+from .autoggen import analyze_view_images
+from .screenshot import CAPTURE_PROFILES, crop_for_hint, get_capture_profile
+
+# 分析結果から名前として取り出す語（snake_case の英単語）
+NAME_PATTERN = re.compile(r"[a-z][a-z0-9]*(?:_[a-z0-9]+)*")
+
+
+def estimate_vision_tokens(width, height, detail):
+    """
+    OpenAI の画像入力のトークン数を見積もります。
+    detail='low' は一定の85トークン、それ以外は2048px四方に収めて短辺を768px以下にした後、512px四方のタイル1枚につき170トークンを加えます。
+    """
+    if detail == "low":
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def extract_names(yaml_text):
+    """分析結果のYAMLから、名前らしい語の集合を取り出します。"""
+    return {name for name in NAME_PATTERN.findall(yaml_text.lower()) if len(name) >= 3}
+
+
+def similarity(names, reference):
+    """2つの語の集合のJaccard係数を返します。"""
+    if not names and not reference:
+        return 1.0
+    return len(names & reference) / len(names | reference)
+
+
+async def run_benchmark(directions, profiles, attention_hint=None, crop=None):
+    """
+    各方角で、全てのプロファイルの画像を撮影・分析して比較結果を返します。
+
+    Returns:
+        list: 方角・プロファイルごとの結果の辞書のリスト
+    """
+    discovery = Discovery()
+    if not await discovery.check_server_and_join():
+        print("サーバーに接続できないため、終了します")
+        return []
+
+    rows = []
+    try:
+        for direction in directions:
+            await discovery._look_towards(direction)
+            reference = None
+            # 基準となる 'full' を最初に分析する
+            for name in ['full'] + [p for p in profiles if p != 'full']:
+                profile = get_capture_profile(name)
+                region = crop if name != 'full' else None
+                started = time.perf_counter()
+                capture = await discovery.viewer_pool.capture(profile=profile, crop=region, expect_change=False)
+                captured = time.perf_counter()
+                yaml_output = await analyze_view_images([(None, capture)], attention_hint, detail=profile.detail)
+                analyzed = time.perf_counter()
+
+                names = extract_names(yaml_output)
+                if reference is None:
+                    reference = names
+                rows.append({
+                    "direction": direction,
+                    "profile": name,
+                    "size": f"{capture.width}x{capture.height}",
+                    "format": capture.mime_type,
+                    "bytes": len(capture.data) * 3 // 4,
+                    "image_tokens": estimate_vision_tokens(capture.width, capture.height, profile.detail),
+                    "capture_ms": (captured - started) * 1000,
+                    "analyze_ms": (analyzed - captured) * 1000,
+                    "quality": similarity(names, reference),
+                })
+    finally:
+        discovery.disconnect_bot()
+        # ViewerPool が起動したブラウザを終了してから asyncio.run を抜ける
+        await discovery.viewer_pool.close()
+    return rows
+
+
+def print_report(rows):
+    """結果を表形式で表示し、プロファイルごとの平均を表示します。"""
+    header = f"{'direction':<10} {'profile':<9} {'size':<9} {'format':<11} {'bytes':>9} {'tokens':>7} {'capture':>9} {'analyze':>9} {'quality':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['direction']:<10} {row['profile']:<9} {row['size']:<9} {row['format']:<11} {row['bytes']:>9} "
+            f"{row['image_tokens']:>7} {row['capture_ms']:>7.0f}ms {row['analyze_ms']:>7.0f}ms {row['quality']:>8.2f}"
+        )
+    print()
+    for name in dict.fromkeys(row['profile'] for row in rows):
+        selected = [row for row in rows if row['profile'] == name]
+        average = lambda key: sum(row[key] for row in selected) / len(selected)
+        print(
+            f"{name:<9} 平均: {average('bytes'):>9.0f} bytes, {average('image_tokens'):>5.0f} tokens, "
+            f"分析 {average('analyze_ms'):>6.0f}ms, 品質 {average('quality'):.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="キャプチャプロファイルごとの画像サイズと分析品質を比較します")
+    parser.add_argument("--directions", nargs="+", default=["north", "east", "south", "west"])
+    parser.add_argument("--profiles", nargs="+", default=list(CAPTURE_PROFILES), choices=list(CAPTURE_PROFILES))
+    parser.add_argument("--hint", default=None, help="分析時の attention_hint。画面の一部を指している場合はその領域を切り抜きます")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.directions, args.profiles, args.hint, crop_for_hint(args.hint)))
+    print_report(results)
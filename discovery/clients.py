@@ -0,0 +1,130 @@
+import asyncio
+import os
+import threading
+from importlib.util import find_spec
+
+import httpx
+import openai
+
+# プロセス全体で共有するLLM・画像分析APIのクライアント
+# APIを呼ぶたびにクライアントを作ると、そのたびに接続とTLSハンドシェイクをやり直すことになるため、
+# keep-alive の接続プールを持つHTTPクライアントを1つだけ作り、全てのクライアントで使い回します。
+
+# HTTP/2 を使うか（h2 パッケージがない場合は HTTP/1.1 になります）
+HTTP2 = os.environ.get('DISCOVERY_HTTP2', '1') != '0' and find_spec('h2') is not None
+
+# 接続プールの設定。keep-alive の接続は keepalive_expiry 秒使われなければ閉じます
+POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=120.0)
+
+# 画像分析や推論モデルは応答まで時間がかかるため、読み取りのタイムアウトは長めにします
+TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+_lock = threading.Lock()
+_async_http_client = None
+_sync_http_client = None
+_openai_clients = {}
+_gemini_models = {}
+
+
+def get_async_http_client():
+    """共有の非同期HTTPクライアント（httpx.AsyncClient）を返します。閉じられていれば作り直します。"""
+    global _async_http_client
+    with _lock:
+        if _async_http_client is None or _async_http_client.is_closed:
+            _async_http_client = httpx.AsyncClient(http2=HTTP2, limits=POOL_LIMITS, timeout=TIMEOUT)
+        return _async_http_client
+
+
+def get_sync_http_client():
+    """共有の同期HTTPクライアント（httpx.Client）を返します。閉じられていれば作り直します。"""
+    global _sync_http_client
+    with _lock:
+        if _sync_http_client is None or _sync_http_client.is_closed:
+            _sync_http_client = httpx.Client(http2=HTTP2, limits=POOL_LIMITS, timeout=TIMEOUT)
+        return _sync_http_client
+
+
+def get_openai_client(api_key=None, base_url=None):
+    """
+    共有の接続プールを使う AsyncOpenAI クライアントを返します。APIキーとURLが同じであれば同じインスタンスです。
+
+    Args:
+        api_key (str, optional): APIキー。デフォルトは環境変数 OPENAI_API_KEY
+        base_url (str, optional): OpenAI互換APIのURL（DeepSeek など）
+    """
+    return _get_openai(openai.AsyncOpenAI, get_async_http_client(), api_key, base_url)
+
+
+def get_openai_sync_client(api_key=None, base_url=None):
+    """共有の接続プールを使う同期版の OpenAI クライアントを返します。引数は get_openai_client と同じです。"""
+    return _get_openai(openai.OpenAI, get_sync_http_client(), api_key, base_url)
+
+
+def _get_openai(client_class, http_client, api_key, base_url):
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    key = (client_class, api_key, base_url)
+    with _lock:
+        client, used_http_client = _openai_clients.get(key, (None, None))
+        # HTTPクライアントが作り直されていれば、OpenAIクライアントも作り直す
+        if client is None or used_http_client is not http_client:
+            client = client_class(api_key=api_key, base_url=base_url, http_client=http_client)
+            _openai_clients[key] = (client, http_client)
+        return client
+
+
+def get_gemini_model(model_name):
+    """
+    Gemini の GenerativeModel をモデル名ごとに1つだけ作成して返します。
+    genai.configure() は呼び出し元で済ませておいてください。
+    """
+    import google.generativeai as genai
+
+    with _lock:
+        model = _gemini_models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            _gemini_models[model_name] = model
+        return model
+
+
+async def warm_up(openai_api_key=None, gemini_models=()):
+    """
+    起動時に各APIへ軽いリクエストを送り、接続とTLSハンドシェイクを済ませておきます。
+    失敗しても例外は投げず、最初の本番のリクエストで接続します。
+
+    Args:
+        openai_api_key (str, optional): OpenAIのAPIキー。デフォルトは環境変数 OPENAI_API_KEY
+        gemini_models (iterable): 事前に作成しておく Gemini のモデル名
+    """
+    tasks = []
+    if openai_api_key or os.getenv("OPENAI_API_KEY"):
+        tasks.append(get_openai_client(openai_api_key).models.list())
+    for model_name in gemini_models:
+        tasks.append(asyncio.to_thread(_warm_up_gemini, model_name))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    failed = [result for result in results if isinstance(result, Exception)]
+    for error in failed:
+        print(f"\033[93mWarning: APIクライアントのウォームアップに失敗しました（無視します）: {error}\033[0m")
+    if tasks:
+        print(f"\033[34mAPIクライアントのウォームアップが完了しました ({len(tasks) - len(failed)}/{len(tasks)}, HTTP/2: {HTTP2})\033[0m")
+
+
+def _warm_up_gemini(model_name):
+    import google.generativeai as genai
+
+    get_gemini_model(model_name)
+    genai.get_model(model_name if model_name.startswith("models/") else f"models/{model_name}")
+
+
+async def close():
+    """共有のHTTPクライアントを閉じます。次に使うときに作り直します。"""
+    global _async_http_client, _sync_http_client
+    with _lock:
+        async_client, sync_client = _async_http_client, _sync_http_client
+        _async_http_client = None
+        _sync_http_client = None
+        _openai_clients.clear()
+    if async_client is not None:
+        await async_client.aclose()
+    if sync_client is not None:
+        sync_client.close()
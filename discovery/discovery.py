@@ -20,7 +20,7 @@ import traceback
 import collections
 import base64
 import time
-from playwright.async_api import async_playwright
+from .screenshot import ViewerPool, Capture, CaptureProfile, CAPTURE_PROFILES
 
 class Discovery:
     def __init__(self):
@@ -36,6 +36,8 @@ class Discovery:
         self.code_execution_history = collections.deque(maxlen=5)
         self.viewer = None
         self.opend_browser = None
+        # スクリーンショット用のブラウザとページ（初回の撮影時に起動し、以降は使い回す）
+        self.viewer_pool = ViewerPool(f"http://localhost:{self.prismarine_viewer_port}")
     
     def load_env(self):
         self.minecraft_host = os.getenv("MINECRAFT_HOST", "host.docker.internal")
@@ -212,6 +214,8 @@ class Discovery:
         self.bot = None
         self.is_connected = False
         self.viewer = None
+        # ビューアーの接続先が変わるので、スクリーンショット用のページは次回読み込み直す
+        self.viewer_pool.invalidate()
 
         # --- クリーンアップ処理 (失敗しても続行) ---
         # 元のViewerを閉じる試み
@@ -273,8 +277,14 @@ class Discovery:
         print("再接続後のサーバー接続を確認しています...")
         return await self.check_server_active(timeout=timeout)
 
-    async def get_bot_status(self, retry_count=0, max_retries=1):
-        """ボットの状態と周辺情報（バイオーム、時間、体力、空腹度、エンティティ、インベントリ、ブロック分類）を取得"""
+    async def get_bot_status(self, retry_count=0, max_retries=1, radius=3):
+        """ボットの状態と周辺情報（バイオーム、時間、体力、空腹度、エンティティ、インベントリ、ブロック分類）を取得
+
+        Args:
+            retry_count (int): 現在のリトライ回数
+            max_retries (int): entityアクセスがタイムアウトした場合の最大リトライ回数
+            radius (int): ブロック分類を行う水平方向の範囲（デフォルト: 3）
+        """
         await self.check_server_active()
         # 接続状態とボットインスタンスの存在をより確実にチェック
         if not self.bot or not self.is_connected:
@@ -302,7 +312,7 @@ class Discovery:
                     if reconnected:
                         print("\033[92m再接続に成功しました。ステータス取得を再試行します。\033[0m")
                         # 再帰呼び出しでリトライカウントを増やす
-                        return await self.get_bot_status(retry_count=retry_count + 1, max_retries=max_retries)
+                        return await self.get_bot_status(retry_count=retry_count + 1, max_retries=max_retries, radius=radius)
                     else:
                         print("\033[91m再接続に失敗しました。ステータス取得を中止します。\033[0m")
                         return None # 再接続失敗時はNoneを返す
@@ -319,62 +329,17 @@ class Discovery:
             bot_food = self.bot.food
             bot_time = self.bot.time.timeOfDay
 
-            # ボットがいるブロックとバイオームを取得
-            center_block = self.bot.blockAt(bot_pos_raw)
-            #bottom_block = self.discovery.bot.blockAt(bot_pos_raw.offset(0, -1, 0))
-            bot_pos = center_block.position.offset(0, 1, 0)
-            bot_biome_id = self.bot.world.getBiome(bot_pos)
-            bot_biome_name = self.mcdata.biomes[str(bot_biome_id)]['name']
-            bot_x = bot_pos.x
-            bot_z = bot_pos.z
-            bot_y = bot_pos.y # y座標も追加
+            # ボットがいるブロックの座標はPython側で計算する（blockAtのブリッジ呼び出しを省略）
+            bot_x = math.floor(bot_pos_raw.x)
+            bot_y = math.floor(bot_pos_raw.y) + 1
+            bot_z = math.floor(bot_pos_raw.z)
+            bot_pos = (bot_x, bot_y, bot_z)
+            bot_biome_id = self.bot.world.getBiome(require('vec3')(bot_x, bot_y, bot_z))
+            bot_biome_name = self.skills.registry.biome_name(bot_biome_id) if self.skills.registry else self.mcdata.biomes[str(bot_biome_id)]['name']
 
             # --- 周囲のブロックを取得 & 分類 ---
-            # _get_surrounding_blocks が await を必要とするか確認
-            blocks = await self.skills._get_surrounding_blocks(
-                position=bot_pos, # スキルの引数名に合わせる
-                x_distance=3,
-                y_distance=2,
-                z_distance=3
-            )
-
-            # ブロック名をグループごとに一時的に格納
-            temp_grouped_block_names = {"group1": [], "group2": [], "group3": [], "group4": [], "group0": []}
-
-            if blocks:
-                for block in blocks:
-                    block_pos_dict = block.get('position')
-                    block_name = block.get('name')
-                    if not isinstance(block_pos_dict, dict) or block_name is None:
-                        continue
-
-                    block_x = block_pos_dict.get('x')
-                    block_z = block_pos_dict.get('z')
-                    if not isinstance(block_x, (int, float)) or not isinstance(block_z, (int, float)):
-                        continue
-
-                    dx = block_x - bot_x
-                    dz = block_z - bot_z
-
-                    if math.fabs(dx) < 1e-6 and math.fabs(dz) < 1e-6:
-                        temp_grouped_block_names["group0"].append(block_name)
-                    elif dz > 1e-6 and math.fabs(dx) <= dz + 1e-6:
-                        temp_grouped_block_names["group1"].append(block_name)
-                    elif dx > 1e-6 and math.fabs(dz) <= dx + 1e-6:
-                        temp_grouped_block_names["group2"].append(block_name)
-                    elif dz < -1e-6 and math.fabs(dx) <= math.fabs(dz) + 1e-6:
-                        temp_grouped_block_names["group3"].append(block_name)
-                    elif dx < -1e-6 and math.fabs(dz) <= math.fabs(dx) + 1e-6:
-                        temp_grouped_block_names["group4"].append(block_name)
-
-            # ブロック分類結果（重複除去とソート）
-            classified_blocks = {
-                "front_blocks": sorted(list(set(temp_grouped_block_names["group1"]))),
-                "right_blocks": sorted(list(set(temp_grouped_block_names["group2"]))),
-                "back_blocks": sorted(list(set(temp_grouped_block_names["group3"]))),
-                "left_blocks": sorted(list(set(temp_grouped_block_names["group4"]))),
-                "center_blocks": sorted(list(set(temp_grouped_block_names["group0"])))
-            }
+            # ワールドキャッシュから取得した範囲を、オフセット配列のマスクで一括して方向ごとに分類する
+            classified_blocks = self.skills._classify_surrounding_blocks(bot_pos, radius=radius, y_distance=2)
 
             # --- 近くのエンティティ情報を取得 ---
             nearby_entities_info = []
@@ -688,18 +653,19 @@ async def {wrapper_func_name}():
         
         return result
 
-    async def get_screenshot_base64(self, direction: str | None = None, width: int = 960, height: int = 540) -> str | None:
+    async def capture_view(self, direction: str | None = None, profile=None, crop=None, width: int | None = None, height: int | None = None) -> Capture | None:
         """
-        指定された方角を向いてから Prismarine Viewer のスクリーンショットを取得し、
-        Base64エンコードされた文字列として返します。
+        指定された方角を向いてから Prismarine Viewer の画面を取得し、キャプチャプロファイルの解像度・形式で返します。
 
         Args:
             direction (str | None, optional): 向きたい方角 ('north', 'south', 'east', 'west', 'up', 'down' など)。Defaults to None.
-            width (int): スクリーンショットの幅。
-            height (int): スクリーンショットの高さ。
+            profile (str | CaptureProfile, optional): キャプチャプロファイル ('full', 'balanced', 'fast')。デフォルトは DISCOVERY_CAPTURE_PROFILE。
+            crop (str | tuple, optional): 切り抜く領域 ('top', 'bottom', 'left', 'right', 'center' または割合のタプル)。
+            width (int | None, optional): 描画するページの幅。デフォルトはビューアーの既定の幅。
+            height (int | None, optional): 描画するページの高さ。デフォルトはビューアーの既定の高さ。
 
         Returns:
-            str | None: Base64エンコードされたPNG画像文字列。エラー時はNone。
+            Capture | None: Base64エンコードされた画像とMIMEタイプ、サイズ、知覚ハッシュ。エラー時はNone。
         """
         await self.check_server_active() # サーバー接続確認は先に行う
         self.bot.chat(f"スクリーンショットを取得します。(Direction: {direction or 'current'})")
@@ -709,46 +675,103 @@ async def {wrapper_func_name}():
             return None
 
         if direction:
-            if self.skills: # skills オブジェクトが初期化されているか確認
-                try:
-                    look_result = await self.skills.look_at_direction(direction)
-                    if not look_result or not look_result.get("success", False):
-                         print(f"\033[93mWarning: Failed to look towards {direction}. Proceeding with current view. Message: {look_result.get('message', 'N/A') if look_result else 'N/A'}\033[0m")
-                    await asyncio.sleep(1) # 視点変更が反映されるのを待つ
-                except Exception as e:
-                     print(f"\033[93mWarning: Error occurred while trying to look towards {direction}: {e}. Proceeding with current view.\033[0m")
-            else:
-                 print("\033[93mWarning: Skills object not initialized. Cannot change direction.\033[0m")
+            await self._look_towards(direction)
+
+        try:
+            # 起動済みのブラウザとページを使い回す（初回や異常時のみ起動・読み込みを行う）
+            # 視点を変えた場合は、変化が描画に反映されて安定するまで待ってから撮影する
+            capture = await self.viewer_pool.capture(
+                profile=profile, crop=crop, expect_change=bool(direction), width=width, height=height
+            )
+            print(f"\033[34mScreenshot captured and encoded successfully. ({capture.mime_type}, {capture.width}x{capture.height}, {len(capture.data)} chars)\033[0m")
+            return capture
+
+        except Exception as e:
+            print(f"スクリーンショットの取得中にエラーが発生しました: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    async def get_screenshot_base64(self, direction: str | None = None, width: int = 960, height: int = 540) -> str | None:
+        """
+        指定された方角を向いてから Prismarine Viewer のスクリーンショットを取得し、
+        Base64エンコードされた文字列として返します。
 
-        url = f"http://localhost:{self.prismarine_viewer_port}"
-        browser = None # finallyブロックで参照できるよう初期化
+        Args:
+            direction (str | None, optional): 向きたい方角 ('north', 'south', 'east', 'west', 'up', 'down' など)。Defaults to None.
+            width (int): スクリーンショットの幅。
+            height (int): スクリーンショットの高さ。
+
+        Returns:
+            str | None: Base64エンコードされたPNG画像文字列。エラー時はNone。
+        """
+        capture = await self.capture_view(direction, profile=self._png_profile(width, height), width=width, height=height)
+        return capture.data if capture else None
+
+    def _png_profile(self, width: int, height: int) -> CaptureProfile:
+        """従来の get_screenshot_base64 と同じ、指定サイズのPNGを返すプロファイル。"""
+        return CAPTURE_PROFILES['full']._replace(width=width, height=height)
+
+    async def _look_towards(self, direction: str) -> None:
+        """スクリーンショットの前に指定された方角を向きます。失敗しても現在の視点のまま続行します。"""
+        if not self.skills: # skills オブジェクトが初期化されているか確認
+            print("\033[93mWarning: Skills object not initialized. Cannot change direction.\033[0m")
+            return
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page(viewport={"width": width, "height": height})
+            look_result = await self.skills.look_at_direction(direction)
+            if not look_result or not look_result.get("success", False):
+                 print(f"\033[93mWarning: Failed to look towards {direction}. Proceeding with current view. Message: {look_result.get('message', 'N/A') if look_result else 'N/A'}\033[0m")
+        except Exception as e:
+             print(f"\033[93mWarning: Error occurred while trying to look towards {direction}: {e}. Proceeding with current view.\033[0m")
 
-                await page.goto(url, wait_until="load", timeout=60000) # タイムアウトを60秒に延長
-                await page.wait_for_selector('canvas', timeout=30000) # canvasが現れるまで最大30秒待機
-                # 描画安定のため十分な待機時間を確保
-                await asyncio.sleep(5) # 必要に応じて調整
+    async def capture_panorama(self, directions: list[str], profile=None, crop=None, width: int | None = None, height: int | None = None) -> dict[str, Capture | None]:
+        """
+        指定された方角を順に向きながら、1つのブラウザページで続けて画面を取得します。
 
-                screenshot_bytes = await page.screenshot(type="png")
-                await browser.close() # スクリーンショット取得後すぐにブラウザを閉じる
-                browser = None # クローズしたことを示す
+        Args:
+            directions (list[str]): 撮影する方角のリスト ('north', 'south', 'east', 'west', 'up', 'down' など)
+            profile (str | CaptureProfile, optional): キャプチャプロファイル。デフォルトは DISCOVERY_CAPTURE_PROFILE。
+            crop (str | tuple, optional): 切り抜く領域。
+            width (int | None, optional): 描画するページの幅。デフォルトはビューアーの既定の幅。
+            height (int | None, optional): 描画するページの高さ。デフォルトはビューアーの既定の高さ。
 
-                base64_image = base64.b64encode(screenshot_bytes).decode('utf-8')
-                print("\033[34mScreenshot captured and encoded successfully.\033[0m")
-                return base64_image
+        Returns:
+            dict[str, Capture | None]: 方角をキー、Capture を値とした辞書。取得に失敗した方角はNone。
+        """
+        await self.check_server_active()
+        self.bot.chat(f"スクリーンショットをまとめて取得します。(Directions: {', '.join(directions)})")
+        print(f"\033[34mCapturing panorama from Prismarine Viewer (Directions: {', '.join(directions)})...\033[0m")
+        if not self.is_server_active():
+            print("エラー: ボットが接続されていません。スクリーンショットを取得できません。")
+            return {direction: None for direction in directions}
 
+        captures = {}
+        try:
+            async with self.viewer_pool.session(width, height) as capture:
+                for direction in directions:
+                    await self._look_towards(direction)
+                    captures[direction] = await capture(expect_change=True, profile=profile, crop=crop)
+            print(f"\033[34m{len(captures)} screenshots captured and encoded successfully.\033[0m")
         except Exception as e:
             print(f"スクリーンショットの取得中にエラーが発生しました: {e}")
             import traceback
             traceback.print_exc()
-            return None
-        finally:
-            if browser: # エラー発生時などでブラウザが開いたままの場合に閉じる
-                 print("エラー発生のため、ブラウザをクローズします。")
-                 await browser.close()
+        return {direction: captures.get(direction) for direction in directions}
+
+    async def get_panorama_base64(self, directions: list[str], width: int = 960, height: int = 540) -> dict[str, str | None]:
+        """
+        指定された方角を順に向きながら、1つのブラウザページで続けてスクリーンショットを取得します。
+
+        Args:
+            directions (list[str]): 撮影する方角のリスト ('north', 'south', 'east', 'west', 'up', 'down' など)
+            width (int): スクリーンショットの幅。
+            height (int): スクリーンショットの高さ。
+
+        Returns:
+            dict[str, str | None]: 方角をキー、Base64エンコードされたPNG画像文字列を値とした辞書。取得に失敗した方角はNone。
+        """
+        captures = await self.capture_panorama(directions, profile=self._png_profile(width, height), width=width, height=height)
+        return {direction: capture.data if capture else None for direction, capture in captures.items()}
 
 async def run_craft_example():
     """Skillsクラスのcraft_itemsメソッドを使用する例"""
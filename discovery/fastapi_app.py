@@ -75,7 +75,7 @@ async def get_server_info():
 
 # ボット接続状態の確認 -> ボット周辺ブロックの領域分類に変更
 @app.get("/bot/status", tags=["bot"], summary="ボットの状態と周辺情報（バイオーム、時間、体力、空腹度、エンティティ、インベントリ、ブロック分類）を取得")
-async def get_bot_status():
+async def get_bot_status(radius: int = Query(3, ge=1, le=32, description="ブロック分類を行う水平方向の範囲")):
     # --- ボットの基本情報を取得 ---
     try:
         bot_entity = discovery.bot.entity
@@ -84,67 +84,24 @@ async def get_bot_status():
         bot_food = discovery.bot.food
         bot_time = discovery.bot.time.timeOfDay
 
-        # ボットがいるブロックとバイオームを取得
-        center_block = discovery.bot.blockAt(bot_pos_raw)
-        bottom_block = discovery.bot.blockAt(bot_pos_raw.offset(0, -1, 0))
-        bot_pos = center_block.position.offset(0, 1, 0)
-        bot_biome_id = discovery.bot.world.getBiome(bot_pos)
-        bot_biome_name = discovery.mcdata.biomes[str(bot_biome_id)]['name']
-        bot_x = bot_pos.x
-        bot_z = bot_pos.z
+        # ボットがいるブロックの座標はPython側で計算し、バイオームを取得
+        center_x = math.floor(bot_pos_raw.x)
+        center_y = math.floor(bot_pos_raw.y)
+        center_z = math.floor(bot_pos_raw.z)
+        bot_pos = (center_x, center_y + 1, center_z)
+        bot_biome_id = discovery.bot.world.getBiome(require('vec3')(*bot_pos))
+        registry = discovery.skills.registry
+        bot_biome_name = registry.biome_name(bot_biome_id) if registry else discovery.mcdata.biomes[str(bot_biome_id)]['name']
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"ボットの基本情報の取得に失敗しました: {e}")
 
     # --- 周囲のブロックを取得 & 分類 ---
     try:
-        blocks = await skills.get_surrounding_blocks(
-            position=bot_pos, # スキルの引数名に合わせる
-            x_distance=3,
-            y_distance=2,
-            z_distance=3
-        )
+        classified_blocks = skills._classify_surrounding_blocks(bot_pos, radius=radius, y_distance=2)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"周辺ブロック情報の取得に失敗しました: {e}")
 
-    # ブロック名をグループごとに一時的に格納
-    temp_grouped_block_names = {"group1": [], "group2": [], "group3": [], "group4": [], "group0": []}
-
-    if blocks:
-        for block in blocks:
-            block_pos_dict = block.get('position')
-            block_name = block.get('name')
-            if not isinstance(block_pos_dict, dict) or block_name is None:
-                continue
-
-            block_x = block_pos_dict.get('x')
-            block_z = block_pos_dict.get('z')
-            if not isinstance(block_x, (int, float)) or not isinstance(block_z, (int, float)):
-                continue
-
-            dx = block_x - bot_x
-            dz = block_z - bot_z
-
-            if math.fabs(dx) < 1e-6 and math.fabs(dz) < 1e-6:
-                 temp_grouped_block_names["group0"].append(block_name)
-            elif dz > 1e-6 and math.fabs(dx) <= dz + 1e-6:
-                temp_grouped_block_names["group1"].append(block_name)
-            elif dx > 1e-6 and math.fabs(dz) <= dx + 1e-6:
-                temp_grouped_block_names["group2"].append(block_name)
-            elif dz < -1e-6 and math.fabs(dx) <= math.fabs(dz) + 1e-6:
-                temp_grouped_block_names["group3"].append(block_name)
-            elif dx < -1e-6 and math.fabs(dz) <= math.fabs(dx) + 1e-6:
-                temp_grouped_block_names["group4"].append(block_name)
-
-    # ブロック分類結果（重複除去とソート）
-    classified_blocks = {
-        "front_blocks": sorted(list(set(temp_grouped_block_names["group1"]))),
-        "right_blocks": sorted(list(set(temp_grouped_block_names["group2"]))),
-        "back_blocks": sorted(list(set(temp_grouped_block_names["group3"]))),
-        "left_blocks": sorted(list(set(temp_grouped_block_names["group4"]))),
-        "center_blocks": sorted(list(set(temp_grouped_block_names["group0"])))
-    }
-
     # --- 近くのエンティティ情報を取得 ---
     nearby_entities_info = []
     try:
@@ -181,7 +138,7 @@ async def get_bot_status():
         "time_of_day": bot_time,
         "health": bot_health,
         "hunger": bot_food,
-        "bot_position": f"x = {center_block.position.x}, y = {center_block.position.y}, z = {center_block.position.z}",
+        "bot_position": f"x = {center_x}, y = {center_y}, z = {center_z}",
         "nearby_entities": nearby_entities_info,
         "inventory": inventory_info,
         **classified_blocks # ブロック分類結果を展開して結合
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import openai
 import google.generativeai as genai
@@ -6,6 +7,67 @@ from langchain.memory import ConversationBufferMemory
 import json
 import traceback
 import uuid # Gemini の tool call ID 生成に必要
+from .clients import get_openai_client, get_openai_sync_client, get_gemini_model, warm_up
+from .llm_cache import CacheMiss, get_llm_cache, make_key
+
+class _ToolCallAssembler:
+    """
+    ストリーミングで断片的に届く OpenAI のツール呼び出しを組み立てます。
+    引数のJSONが閉じた時点で、そのツール呼び出しを完成したものとして返します。
+    """
+
+    def __init__(self):
+        self._calls: Dict[int, Dict] = {}
+        self._emitted = set()
+
+    def add(self, delta) -> List[Dict]:
+        """
+        ツール呼び出しの断片を追加し、新たに完成したツール呼び出しのリストを返します。
+
+        Args:
+            delta: ストリームの choices[0].delta.tool_calls の要素 (index, id, function.name, function.arguments)
+        """
+        call = self._calls.setdefault(delta.index, {'id': None, 'type': 'function', 'function': {'name': '', 'arguments': ''}})
+        if delta.id:
+            call['id'] = delta.id
+        arguments = ''
+        if delta.function:
+            call['function']['name'] += delta.function.name or ''
+            arguments = delta.function.arguments or ''
+            call['function']['arguments'] += arguments
+
+        completed = []
+        # 次のツール呼び出しが始まっていれば、それより前のものは完成している
+        for index in sorted(self._calls):
+            if index < delta.index and index not in self._emitted:
+                completed.append(self._emit(index))
+        # 引数のJSONは最後の '}' が届くまで不完全なので、'}' を含む断片のときだけ解析を試す
+        if '}' in arguments and delta.index not in self._emitted and self._is_complete(call):
+            completed.append(self._emit(delta.index))
+        return completed
+
+    def finish(self) -> List[Dict]:
+        """ストリームの終了時に呼び、まだ返していないツール呼び出しを返します。"""
+        return [self._emit(index) for index in sorted(self._calls) if index not in self._emitted]
+
+    def calls(self) -> List[Dict]:
+        """組み立てた全てのツール呼び出しを index 順に返します。"""
+        return [self._calls[index] for index in sorted(self._calls)]
+
+    def _emit(self, index: int) -> Dict:
+        self._emitted.add(index)
+        call = self._calls[index]
+        if not call['function']['arguments']:
+            call['function']['arguments'] = "{}"
+        return call
+
+    @staticmethod
+    def _is_complete(call: Dict) -> bool:
+        try:
+            return isinstance(json.loads(call['function']['arguments']), dict)
+        except json.JSONDecodeError:
+            return False
+
 
 class LLMClient:
     """
@@ -34,90 +96,347 @@ class LLMClient:
         # 会話メモリを初期化
         self.memory = ConversationBufferMemory(return_messages=True)
 
+        # 応答キャッシュ (環境変数 DISCOVERY_LLM_CACHE で off / readwrite / replay を切り替える)
+        self.cache = get_llm_cache()
+
     def _call_openai(self, messages: List[Dict], model: str, tools: Optional[List[Dict]]) -> Dict[str, Union[str, List[Dict], None]]:
         """ OpenAI API を呼び出す内部メソッド """
         if not self._openai_api_key:
             raise ValueError("OpenAI API key is not configured.")
         try:
-            client = openai.OpenAI(api_key=self._openai_api_key)
-            completion_args = {
-                "model": model,
-                "messages": messages,
-            }
-            if tools:
-                completion_args["tools"] = tools
-                completion_args["tool_choice"] = "auto"
-
-            response = client.chat.completions.create(**completion_args)
-
-            message = response.choices[0].message
-            response_content = message.content
-            response_tool_calls = None
-            if message.tool_calls:
-                response_tool_calls = [
-                    {
-                        'id': tc.id,
-                        'type': tc.type,
-                        'function': {'name': tc.function.name, 'arguments': tc.function.arguments}
-                     } for tc in message.tool_calls
-                ]
-            return {'content': response_content, 'tool_calls': response_tool_calls}
+            # 接続プールを共有するクライアントを使い回す（リクエストごとに接続し直さない）
+            client = get_openai_sync_client(self._openai_api_key)
+            response = client.chat.completions.create(**self._openai_completion_args(messages, model, tools))
+            return self._parse_openai_message(response.choices[0].message)
         except Exception as e:
             print(f"Error calling OpenAI API: {e}")
             raise # エラーを再発生させて get_response で処理できるようにする
 
+    async def _acall_openai(self, messages: List[Dict], model: str, tools: Optional[List[Dict]]) -> Dict[str, Union[str, List[Dict], None]]:
+        """ OpenAI API を非同期で呼び出す内部メソッド """
+        if not self._openai_api_key:
+            raise ValueError("OpenAI API key is not configured.")
+        try:
+            client = get_openai_client(self._openai_api_key)
+            response = await client.chat.completions.create(**self._openai_completion_args(messages, model, tools))
+            return self._parse_openai_message(response.choices[0].message)
+        except Exception as e:
+            print(f"Error calling OpenAI API: {e}")
+            raise # エラーを再発生させて aget_response で処理できるようにする
+
+    def _openai_completion_args(self, messages: List[Dict], model: str, tools: Optional[List[Dict]]) -> Dict:
+        completion_args = {
+            "model": model,
+            "messages": messages,
+        }
+        if tools:
+            completion_args["tools"] = tools
+            completion_args["tool_choice"] = "auto"
+        return completion_args
+
+    def _parse_openai_message(self, message) -> Dict[str, Union[str, List[Dict], None]]:
+        response_content = message.content
+        response_tool_calls = None
+        if message.tool_calls:
+            response_tool_calls = [
+                {
+                    'id': tc.id,
+                    'type': tc.type,
+                    'function': {'name': tc.function.name, 'arguments': tc.function.arguments}
+                 } for tc in message.tool_calls
+            ]
+        return {'content': response_content, 'tool_calls': response_tool_calls}
+
     def _call_gemini(self, full_prompt: str, model: str, tools: Optional[List[Dict]], thinking_budget: Optional[int]) -> Dict[str, Union[str, List[Dict], None]]:
         """ Gemini API を呼び出す内部メソッド """
         if not self._google_api_key:
             raise ValueError("Google API key is not configured.")
         try:
-            gen_model = genai.GenerativeModel(model)
-
-            generation_config = None
-            if thinking_budget is not None:
-                if not isinstance(thinking_budget, int) or thinking_budget < 0:
-                     raise ValueError("thinking_budget must be a non-negative integer.")
-                from google.generativeai import types
-                generation_config = types.GenerationConfig(
-                    thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget)
-                )
-
+            gen_model = get_gemini_model(model)
             gemini_response = gen_model.generate_content(
                 full_prompt,
-                generation_config=generation_config,
+                generation_config=self._gemini_generation_config(thinking_budget),
                 tools=tools
             )
+            return self._parse_gemini_response(gemini_response)
+        except Exception as e:
+            print(f"Error calling Google Generative AI API: {e}")
+            raise
 
-            response_content = None
-            response_tool_calls = None
-            candidate = gemini_response.candidates[0]
-            if candidate.content and candidate.content.parts:
-                text_parts = []
-                tool_call_parts = []
-                for part in candidate.content.parts:
-                    if hasattr(part, 'text') and part.text:
-                        text_parts.append(part.text)
-                    elif hasattr(part, 'function_call') and part.function_call:
-                        fc = part.function_call
-                        tool_call_id = f"call_{uuid.uuid4()}"
-                        tool_call_parts.append({
-                            'id': tool_call_id,
-                            'type': 'function',
-                            'function': {
-                                'name': fc.name,
-                                'arguments': json.dumps(dict(fc.args)) if fc.args else "{}" # JSON文字列に変換
-                            }
-                        })
-                if text_parts:
-                    response_content = "\n".join(text_parts)
-                if tool_call_parts:
-                    response_tool_calls = tool_call_parts
-
-            return {'content': response_content, 'tool_calls': response_tool_calls}
+    async def _acall_gemini(self, full_prompt: str, model: str, tools: Optional[List[Dict]], thinking_budget: Optional[int]) -> Dict[str, Union[str, List[Dict], None]]:
+        """ Gemini API を非同期で呼び出す内部メソッド """
+        if not self._google_api_key:
+            raise ValueError("Google API key is not configured.")
+        try:
+            gen_model = get_gemini_model(model)
+            gemini_response = await gen_model.generate_content_async(
+                full_prompt,
+                generation_config=self._gemini_generation_config(thinking_budget),
+                tools=tools
+            )
+            return self._parse_gemini_response(gemini_response)
         except Exception as e:
             print(f"Error calling Google Generative AI API: {e}")
             raise
 
+    def _gemini_generation_config(self, thinking_budget: Optional[int]):
+        if thinking_budget is None:
+            return None
+        if not isinstance(thinking_budget, int) or thinking_budget < 0:
+             raise ValueError("thinking_budget must be a non-negative integer.")
+        from google.generativeai import types
+        return types.GenerationConfig(
+            thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget)
+        )
+
+    def _parse_gemini_response(self, gemini_response) -> Dict[str, Union[str, List[Dict], None]]:
+        response_content = None
+        response_tool_calls = None
+        candidate = gemini_response.candidates[0]
+        if candidate.content and candidate.content.parts:
+            text_parts = []
+            tool_call_parts = []
+            for part in candidate.content.parts:
+                if hasattr(part, 'text') and part.text:
+                    text_parts.append(part.text)
+                elif hasattr(part, 'function_call') and part.function_call:
+                    fc = part.function_call
+                    tool_call_id = f"call_{uuid.uuid4()}"
+                    tool_call_parts.append({
+                        'id': tool_call_id,
+                        'type': 'function',
+                        'function': {
+                            'name': fc.name,
+                            'arguments': json.dumps(dict(fc.args)) if fc.args else "{}" # JSON文字列に変換
+                        }
+                    })
+            if text_parts:
+                response_content = "\n".join(text_parts)
+            if tool_call_parts:
+                response_tool_calls = tool_call_parts
+
+        return {'content': response_content, 'tool_calls': response_tool_calls}
+
+    def _prepare_call(self, system_prompt: str, user_prompt: str, service: str, use_memory: bool) -> Dict:
+        """
+        サービスごとの呼び出し引数 (OpenAI は messages、Gemini は full_prompt) を作成します。
+
+        Raises:
+            ValueError: サービスが未対応の場合。
+        """
+        history_messages: List[Dict[str, str]] = []
+        history_text: str = ""
+
+        if use_memory:
+            # メモリから過去の会話履歴を取得
+            # ConversationBufferMemory(return_messages=True) の場合、 .chat_memory.messages に BaseMessage のリストが入る
+            # これを OpenAI/Gemini で使える形式に変換する
+            loaded_memory = self.memory.load_memory_variables({})
+            # loaded_memory['history'] は BaseMessage のリスト
+            base_messages = loaded_memory.get('history', [])
+
+            # OpenAI 形式のメッセージリストを作成
+            for msg in base_messages:
+                if hasattr(msg, 'content'): # HumanMessage, AIMessage など
+                   role = "user" if msg.type == "human" else "assistant"
+                   history_messages.append({"role": role, "content": msg.content})
+
+            # Gemini 形式のテキスト履歴を作成 (単純な連結)
+            history_text = "\n".join([f"{'User' if msg.type == 'human' else 'AI'}: {msg.content}" for msg in base_messages])
+
+        if service == "openai":
+            # OpenAI用のメッセージリストを作成
+            messages = [{"role": "system", "content": system_prompt}]
+            if use_memory:
+                messages.extend(history_messages)
+            messages.append({"role": "user", "content": user_prompt})
+            return {"messages": messages}
+
+        if service == "gemini":
+            # Gemini用のプロンプトテキストを作成
+            prompt_parts = [system_prompt]
+            if use_memory and history_text:
+                prompt_parts.append("\n\n--- Conversation History ---" + history_text)
+            prompt_parts.append("\n\n--- Current Prompt ---" + user_prompt)
+            return {"full_prompt": "\n".join(prompt_parts)}
+
+        raise ValueError(f"Unsupported service: {service}. Choose 'openai' or 'gemini'.")
+
+    def _cache_key(self, service: str, model: str, call_args: Dict, tools: Optional[List[Dict]], thinking_budget: Optional[int]) -> str:
+        """要求の内容 (サービス、モデル、メッセージ、ツール、生成の設定) から応答キャッシュのキーを作成します。"""
+        return make_key(service=service, model=model, request=call_args, tools=tools, thinking_budget=thinking_budget)
+
+    def _save_response(self, user_prompt: str, response_data: Dict, save_memory: bool) -> None:
+        """メモリへの保存 (テキスト応答があり、ツール呼び出しがない場合のみ)"""
+        response_content = response_data.get('content')
+        response_tool_calls = response_data.get('tool_calls')
+        if save_memory and response_content and not response_tool_calls:
+            self.memory.save_context({"input": user_prompt}, {"output": response_content})
+
+    async def aget_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        service: Literal["openai", "gemini"],
+        model: str,
+        thinking_budget: Optional[int] = None,
+        save_memory: bool = False,
+        use_memory: bool = False,
+        tools: Optional[List[Dict]] = None,
+    ) -> Dict[str, Union[str, List[Dict], None]]:
+        """
+        指定されたLLMサービスとモデルからレスポンスを非同期で取得します。会話メモリ機能とツール/Function Callingをサポートします。
+        各サービスの非同期SDK (AsyncOpenAI, generate_content_async) を使うため、応答を待つ間もイベントループ
+        (BOTのイベント処理やFastAPIのリクエスト) は止まりません。
+
+        Args:
+            system_prompt: モデルの動作を制御するシステムプロンプト。
+            user_prompt: ユーザーのクエリまたは指示。
+            service: 使用するLLMサービス ('openai' または 'gemini')。
+            model: 使用する具体的なモデル名 (例: 'gpt-4', 'gemini-pro')。
+            thinking_budget: Geminiの思考プロセスのためのオプショナルなトークン予算。
+                             'gemini' サービスの場合のみ適用。
+                             デフォルトはNone (モデルのデフォルト動作)。
+                             0を設定すると思考を無効化。
+            save_memory: Trueの場合、テキスト応答をメモリに保存 (ツール呼び出し時は保存されない)。
+            use_memory: Trueの場合、過去の会話履歴をプロンプトに含める。
+            tools: LLM に提供するツール/関数の定義リスト (OpenAI/Gemini 形式)。
+
+        Returns:
+            get_response と同じ、'content' と 'tool_calls' をキーに持つ辞書。
+            エラー時はどちらもNoneです。
+
+        Raises:
+            CacheMiss: 応答キャッシュが replay モードで、キャッシュに応答がない場合。
+        """
+        try:
+            call_args = self._prepare_call(system_prompt, user_prompt, service, use_memory)
+            cache_key = self._cache_key(service, model, call_args, tools, thinking_budget)
+            response_data = self.cache.lookup(cache_key)
+            if response_data is None:
+                if service == "openai":
+                    response_data = await self._acall_openai(model=model, tools=tools, **call_args)
+                else:
+                    response_data = await self._acall_gemini(model=model, tools=tools, thinking_budget=thinking_budget, **call_args)
+                self.cache.store(cache_key, response_data)
+            self._save_response(user_prompt, response_data, save_memory)
+            return response_data
+
+        except CacheMiss:
+            # replay モードでは、キャッシュにない要求を空の応答で隠さずに失敗させる
+            raise
+        except Exception as e:
+             print(f"Error during aget_response for service '{service}': {e}")
+             return {'content': None, 'tool_calls': None}
+
+    async def astream_response(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        service: Literal["openai", "gemini"],
+        model: str,
+        thinking_budget: Optional[int] = None,
+        save_memory: bool = False,
+        use_memory: bool = False,
+        tools: Optional[List[Dict]] = None,
+    ):
+        """
+        aget_response のストリーミング版です。応答を生成されたそばから、イベントの辞書として順に返します。
+        ツール呼び出しは引数のJSONが揃った時点で返すため、メッセージの残りを待たずにツールを実行し始められます。
+
+        Args:
+            aget_response と同じです。
+
+        Yields:
+            以下のいずれかの辞書:
+            - {'type': 'content', 'delta': str}: テキストの断片
+            - {'type': 'tool_call', 'tool_call': dict}: 引数が揃ったツール呼び出し (get_response の tool_calls の要素と同じ形式)
+            - {'type': 'done', 'content': str | None, 'tool_calls': list | None}: 最後に1回。aget_response の戻り値と同じ内容
+              (エラー時は 'error' キーにエラーメッセージを含み、content と tool_calls はNone)
+
+        Example:
+            >>> async for event in client.astream_response(system_prompt, user_prompt, "openai", "gpt-4o", tools=tools):
+            ...     if event['type'] == 'content':
+            ...         print(event['delta'], end="", flush=True)
+            ...     elif event['type'] == 'tool_call':
+            ...         tasks.append(asyncio.create_task(client.handle_tool_call(event['tool_call'])))
+        """
+        content_parts: List[str] = []
+        tool_calls: List[Dict] = []
+        try:
+            call_args = self._prepare_call(system_prompt, user_prompt, service, use_memory)
+            cache_key = self._cache_key(service, model, call_args, tools, thinking_budget)
+            cached = self.cache.lookup(cache_key)
+            if cached is not None:
+                # キャッシュされた応答は1つの断片として返す
+                if cached['content']:
+                    yield {'type': 'content', 'delta': cached['content']}
+                for call in cached['tool_calls'] or ():
+                    yield {'type': 'tool_call', 'tool_call': call}
+                self._save_response(user_prompt, cached, save_memory)
+                yield {'type': 'done', **cached}
+                return
+            if service == "openai":
+                stream = self._astream_openai(model=model, tools=tools, **call_args)
+            else:
+                stream = self._astream_gemini(model=model, tools=tools, thinking_budget=thinking_budget, **call_args)
+            async for event in stream:
+                if event['type'] == 'content':
+                    content_parts.append(event['delta'])
+                else:
+                    tool_calls.append(event['tool_call'])
+                yield event
+        except CacheMiss:
+            raise
+        except Exception as e:
+            print(f"Error during astream_response for service '{service}': {e}")
+            yield {'type': 'done', 'content': None, 'tool_calls': None, 'error': str(e)}
+            return
+
+        response_data = {'content': "".join(content_parts) or None, 'tool_calls': tool_calls or None}
+        self.cache.store(cache_key, response_data)
+        self._save_response(user_prompt, response_data, save_memory)
+        yield {'type': 'done', **response_data}
+
+    async def _astream_openai(self, messages: List[Dict], model: str, tools: Optional[List[Dict]]):
+        """ OpenAI API をストリーミングで呼び出し、テキストの断片と完成したツール呼び出しを返す内部メソッド """
+        if not self._openai_api_key:
+            raise ValueError("OpenAI API key is not configured.")
+        client = get_openai_client(self._openai_api_key)
+        stream = await client.chat.completions.create(**self._openai_completion_args(messages, model, tools), stream=True)
+        assembler = _ToolCallAssembler()
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                yield {'type': 'content', 'delta': delta.content}
+            for tool_call_delta in delta.tool_calls or ():
+                for call in assembler.add(tool_call_delta):
+                    yield {'type': 'tool_call', 'tool_call': call}
+        for call in assembler.finish():
+            yield {'type': 'tool_call', 'tool_call': call}
+
+    async def _astream_gemini(self, full_prompt: str, model: str, tools: Optional[List[Dict]], thinking_budget: Optional[int]):
+        """ Gemini API をストリーミングで呼び出す内部メソッド。Gemini の関数呼び出しは1つの断片で届くため、そのまま返します """
+        if not self._google_api_key:
+            raise ValueError("Google API key is not configured.")
+        gen_model = get_gemini_model(model)
+        stream = await gen_model.generate_content_async(
+            full_prompt,
+            generation_config=self._gemini_generation_config(thinking_budget),
+            tools=tools,
+            stream=True
+        )
+        async for chunk in stream:
+            if not chunk.candidates:
+                continue
+            parsed = self._parse_gemini_response(chunk)
+            if parsed['content']:
+                yield {'type': 'content', 'delta': parsed['content']}
+            for call in parsed['tool_calls'] or ():
+                yield {'type': 'tool_call', 'tool_call': call}
+
     def get_response(
         self,
         system_prompt: str,
@@ -132,6 +451,7 @@ class LLMClient:
         """
         指定されたLLMサービスとモデルからレスポンスを取得します。会話メモリ機能とツール/Function Callingをサポートします。
         内部でサービス固有の呼び出しメソッド (_call_openai, _call_gemini) を使用します。
+        応答を待つ間は呼び出し元のスレッドが止まるため、async 関数の中からは aget_response を使ってください。
 
         Args:
             system_prompt: モデルの動作を制御するシステムプロンプト。
@@ -156,60 +476,24 @@ class LLMClient:
             ValueError: サービスが未対応、APIキーが未設定、
                       またはthinking_budgetが無効な場合。
             Exception: API呼び出し中のエラー。
+            CacheMiss: 応答キャッシュが replay モードで、キャッシュに応答がない場合。
         """
-        history_messages: List[Dict[str, str]] = []
-        history_text: str = ""
-
-        if use_memory:
-            # メモリから過去の会話履歴を取得
-            # ConversationBufferMemory(return_messages=True) の場合、 .chat_memory.messages に BaseMessage のリストが入る
-            # これを OpenAI/Gemini で使える形式に変換する
-            loaded_memory = self.memory.load_memory_variables({})
-            # loaded_memory['history'] は BaseMessage のリスト
-            base_messages = loaded_memory.get('history', [])
-
-            # OpenAI 形式のメッセージリストを作成
-            for msg in base_messages:
-                if hasattr(msg, 'content'): # HumanMessage, AIMessage など
-                   role = "user" if msg.type == "human" else "assistant"
-                   history_messages.append({"role": role, "content": msg.content})
-
-            # Gemini 形式のテキスト履歴を作成 (単純な連結)
-            history_text = "\n".join([f"{'User' if msg.type == 'human' else 'AI'}: {msg.content}" for msg in base_messages])
-
-
-        response_data = None
         try:
-            if service == "openai":
-                # OpenAI用のメッセージリストを作成
-                messages = [{"role": "system", "content": system_prompt}]
-                if use_memory:
-                    messages.extend(history_messages)
-                messages.append({"role": "user", "content": user_prompt})
-                # OpenAI呼び出し
-                response_data = self._call_openai(messages=messages, model=model, tools=tools)
-
-            elif service == "gemini":
-                # Gemini用のプロンプトテキストを作成
-                prompt_parts = [system_prompt]
-                if use_memory and history_text:
-                    prompt_parts.append("\n\n--- Conversation History ---" + history_text)
-                prompt_parts.append("\n\n--- Current Prompt ---" + user_prompt)
-                full_prompt = "\n".join(prompt_parts)
-                # Gemini呼び出し
-                response_data = self._call_gemini(full_prompt=full_prompt, model=model, tools=tools, thinking_budget=thinking_budget)
-
-            else:
-                raise ValueError(f"Unsupported service: {service}. Choose 'openai' or 'gemini'.")
-
-            # メモリへの保存 (テキスト応答があり、ツール呼び出しがない場合のみ)
-            response_content = response_data.get('content')
-            response_tool_calls = response_data.get('tool_calls')
-            if save_memory and response_content and not response_tool_calls:
-                self.memory.save_context({"input": user_prompt}, {"output": response_content})
-
+            call_args = self._prepare_call(system_prompt, user_prompt, service, use_memory)
+            cache_key = self._cache_key(service, model, call_args, tools, thinking_budget)
+            response_data = self.cache.lookup(cache_key)
+            if response_data is None:
+                if service == "openai":
+                    response_data = self._call_openai(model=model, tools=tools, **call_args)
+                else:
+                    response_data = self._call_gemini(model=model, tools=tools, thinking_budget=thinking_budget, **call_args)
+                self.cache.store(cache_key, response_data)
+            self._save_response(user_prompt, response_data, save_memory)
             return response_data
 
+        except CacheMiss:
+            # replay モードでは、キャッシュにない要求を空の応答で隠さずに失敗させる
+            raise
         except Exception as e:
              # API呼び出し中のエラーをキャッチした場合など
              print(f"Error during get_response for service '{service}': {e}")
@@ -254,62 +538,94 @@ class LLMClient:
             return tool_results
 
         for call in tool_calls:
-            function_name = call['function']['name']
-            function_args_str = call['function']['arguments']
-            tool_call_id = call['id']
-            result_content = "" # ツール実行結果
+            tool_results.append(await self.handle_tool_call(call))
 
-            print(f"\n--- Handling Tool Call ---")
-            print(f"ID: {tool_call_id}")
-            print(f"Function: {function_name}")
-            print(f"Arguments: {function_args_str}")
+        return tool_results
 
-            try:
-                # 引数をJSONとしてパース
-                args = json.loads(function_args_str)
-
-                if function_name == "get_skill_full_code":
-                    skill_name = args.get("skill_name")
-                    if skill_name:
-                        # get_skill_code は docstring を除くため注意。含む場合は別途実装が必要
-                        # get_skill_code は非同期なので await する
-                        code = await self.discovery.get_skill_code([skill_name])
-                        if code and code.get(skill_name, {}).get('success'):
-                            result_content = f"Source code for skill '{skill_name}':\n```python\n{code[skill_name]['code']}\n```"
-                        else:
-                            error_message = code.get(skill_name, {}).get('message', 'It might not exist or is inaccessible.')
-                            result_content = f"Error: Could not retrieve source code for skill '{skill_name}'. Reason: {error_message}"
-                    else:
-                        result_content = "Error: Missing required argument 'skill_name' for get_skill_full_code."
+    async def handle_tool_call(self, call: Dict) -> Dict:
+        """
+        ツール呼び出しを1つ処理し、結果をtoolロールメッセージで返す
+        (astream_response で引数が揃ったツール呼び出しから順に実行する場合に使う)
+        """
+        function_name = call['function']['name']
+        function_args_str = call['function']['arguments']
+        tool_call_id = call['id']
+        result_content = "" # ツール実行結果
 
-                # --- 他のツールの処理をここに追加 ---
-                # elif function_name == "other_tool":
-                #    arg1 = args.get("arg1")
-                #    result = await self.some_other_async_skill(arg1) # 例
-                #    result_content = f"Result of other_tool: {result}"
-                # ---------------------------------
+        print(f"\n--- Handling Tool Call ---")
+        print(f"ID: {tool_call_id}")
+        print(f"Function: {function_name}")
+        print(f"Arguments: {function_args_str}")
 
+        try:
+            # 引数をJSONとしてパース
+            args = json.loads(function_args_str)
+
+            if function_name == "get_skill_full_code":
+                skill_name = args.get("skill_name")
+                if skill_name:
+                    # get_skill_code は docstring を除くため注意。含む場合は別途実装が必要
+                    # get_skill_code は非同期なので await する
+                    code = await self.discovery.get_skill_code([skill_name])
+                    if code and code.get(skill_name, {}).get('success'):
+                        result_content = f"Source code for skill '{skill_name}':\n```python\n{code[skill_name]['code']}\n```"
+                    else:
+                        error_message = code.get(skill_name, {}).get('message', 'It might not exist or is inaccessible.')
+                        result_content = f"Error: Could not retrieve source code for skill '{skill_name}'. Reason: {error_message}"
                 else:
-                    result_content = f"Error: Unknown tool function '{function_name}'."
+                    result_content = "Error: Missing required argument 'skill_name' for get_skill_full_code."
 
-            except json.JSONDecodeError:
-                result_content = f"Error: Invalid JSON arguments provided for tool '{function_name}': {function_args_str}"
-            except Exception as e:
-                # get_skill_code や他のツール実行中の予期せぬエラー
-                result_content = f"Error executing tool '{function_name}': {e}"
-                print(f"Error details: {traceback.format_exc()}") # 詳細ログ
+            # --- 他のツールの処理をここに追加 ---
+            # elif function_name == "other_tool":
+            #    arg1 = args.get("arg1")
+            #    result = await self.some_other_async_skill(arg1) # 例
+            #    result_content = f"Result of other_tool: {result}"
+            # ---------------------------------
 
-            print(f"Result Content: {result_content[:200]}...") # 長すぎる場合は省略して表示
-            print("--------------------------\n")
+            else:
+                result_content = f"Error: Unknown tool function '{function_name}'."
 
-            # LLMに返す tool ロールのメッセージを作成
-            tool_results.append({
-                "role": "tool",
-                "tool_call_id": tool_call_id,
-                "content": result_content,
-            })
+        except json.JSONDecodeError:
+            result_content = f"Error: Invalid JSON arguments provided for tool '{function_name}': {function_args_str}"
+        except Exception as e:
+            # get_skill_code や他のツール実行中の予期せぬエラー
+            result_content = f"Error executing tool '{function_name}': {e}"
+            print(f"Error details: {traceback.format_exc()}") # 詳細ログ
 
-        return tool_results
+        print(f"Result Content: {result_content[:200]}...") # 長すぎる場合は省略して表示
+        print("--------------------------\n")
+
+        # LLMに返す tool ロールのメッセージを作成
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call_id,
+            "content": result_content,
+        }
+
+    async def _stream_to_console(self, **request) -> Dict:
+        """
+        astream_response の応答をコンソールに逐次表示し、ツール呼び出しは引数が揃った時点で実行を始めます。
+
+        Returns:
+            'content'、'tool_calls' と、実行中のツールのタスクのリスト 'tool_tasks' を持つ辞書
+        """
+        tool_tasks = []
+        result = {'content': None, 'tool_calls': None}
+        printed = False
+        async for event in self.astream_response(**request):
+            if event['type'] == 'content':
+                if not printed:
+                    print("AI: ", end="", flush=True)
+                    printed = True
+                print(event['delta'], end="", flush=True)
+            elif event['type'] == 'tool_call':
+                # 説明文の続きを待たずにツールを実行し始める
+                tool_tasks.append(asyncio.create_task(self.handle_tool_call(event['tool_call'])))
+            else:
+                result = event
+        if printed:
+            print()
+        return {'content': result.get('content'), 'tool_calls': result.get('tool_calls'), 'tool_tasks': tool_tasks}
 
     async def run_interactive_loop(self):
         """LLM と対話的にやり取りし、ツール呼び出しを処理するループ (デモ用)"""
@@ -317,6 +633,9 @@ class LLMClient:
             print("エラー: Google API keyが初期化されていません。ツールを実行できません。")
             return
 
+        # 最初の問い合わせの前に接続を確立しておく
+        await warm_up(self._openai_api_key, gemini_models=["gemini-pro"])
+
         # get_skill_full_code ツールの定義
         tools_definition = [
             {
@@ -347,7 +666,8 @@ class LLMClient:
 
         print("\n--- Interactive LLM Loop (Type 'quit' to exit) ---")
         while True:
-            user_input = input("You: ")
+            # 入力待ちの間もイベントループを止めない
+            user_input = await asyncio.to_thread(input, "You: ")
             if user_input.lower() == 'quit':
                 break
 
@@ -355,33 +675,17 @@ class LLMClient:
 
             try:
                 # LLM に応答を要求 (ツール定義を渡す)
-                response_data = self.get_response(
-                    system_prompt="", # 履歴に含まれるため空で良い
-                    user_prompt="",   # 履歴に含まれるため空で良い
-                    service="gemini", # または "openai" (Tool Calling対応モデルを選択)
-                    model="gemini-pro",  # Tool Calling に適したモデルを選択
-                    tools=tools_definition,
-                    use_memory=False, # use_memory=Trueにして履歴管理をLLMClientに任せても良いが、ここでは手動管理
-                    # messages 引数を直接渡せるように get_response を修正する方がより良い設計かも
-                    # 現状は use_memory=True 相当の動作を messages 配列で模倣する
-                )
-
-                # ---- get_response が messages を直接受け取れない場合の代替実装 ----
-                # 現在の実装に合わせて、最新のユーザープロンプトと履歴を使う
+                # 応答は生成されたそばから表示し、ツール呼び出しは引数が揃った時点で実行を始める
                 current_user_prompt = messages[-1]["content"]
-                # use_memory=True にして、手動の message append を減らす形も検討
-                # self.memory.chat_memory.add_user_message(current_user_prompt) # メモリに手動追加する場合
-
-                response_data = self.get_response(
+                response_data = await self._stream_to_console(
                      system_prompt=messages[0]["content"], # システムプロンプトは常に渡す
                      user_prompt=current_user_prompt, # 最新のユーザープロンプト
-                     service="gemini",
-                     model="gemini-pro",
+                     service="gemini", # または "openai" (Tool Calling対応モデルを選択)
+                     model="gemini-pro",  # Tool Calling に適したモデルを選択
                      tools=tools_definition,
                      use_memory=True, # LLMClient のメモリを使う
                      save_memory=False # ループ内で手動管理するか、ここでTrueにして任せるか
                  )
-                # ------------------------------------------------------------
 
                 ai_response_content = response_data.get('content')
                 tool_calls = response_data.get('tool_calls')
@@ -399,8 +703,8 @@ class LLMClient:
 
                 if tool_calls:
                     print("AI: (Requesting tool use...)")
-                    # ツール呼び出しを処理
-                    tool_results_messages = await self.handle_tool_calls(tool_calls)
+                    # ストリーミング中に実行を始めたツールの結果を待つ
+                    tool_results_messages = list(await asyncio.gather(*response_data['tool_tasks']))
                     # ツール実行結果を履歴に追加
                     messages.extend(tool_results_messages)
 
@@ -410,7 +714,7 @@ class LLMClient:
                     # この部分も get_response が messages を直接受け取る方が綺麗
                     latest_tool_result_content = tool_results_messages[0]["content"] # 簡略化のため最初の結果のみ
 
-                    response_data_after_tool = self.get_response(
+                    response_data_after_tool = await self._stream_to_console(
                         system_prompt=messages[0]["content"],
                         user_prompt=latest_tool_result_content, # tool結果をプロンプトとして渡すのは微妙かも
                         service="gemini",
@@ -423,7 +727,6 @@ class LLMClient:
 
                     final_content = response_data_after_tool.get('content')
                     if final_content:
-                        print(f"AI: {final_content}")
                         messages.append({"role": "assistant", "content": final_content})
                         # LLMClientのメモリにも最終応答を保存する場合
                         # self.memory.save_context({"input": tool_results_messages[-1]["content"]}, {"output": final_content})
@@ -434,8 +737,7 @@ class LLMClient:
 
 
                 elif ai_response_content:
-                    # ツール呼び出しがなく、テキスト応答があった場合
-                    print(f"AI: {ai_response_content}")
+                    # ツール呼び出しがなく、テキスト応答があった場合 (応答はストリーミング中に表示済み)
                     # 応答は既に追加済みだが、save_memory=True で LLMClient 側で保存する場合
                     if self.memory: # LLMClient にメモリがあるか確認
                        self.memory.save_context({"input": user_input}, {"output": ai_response_content})
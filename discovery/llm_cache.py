@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from .skill.registry import cache_dir
+
+# LLMの応答キャッシュの動作モード
+# "off": 使わない / "readwrite": キャッシュにあれば使い、なければAPIを呼んで保存する /
+# "replay": キャッシュにある応答だけを使い、ない場合は CacheMiss を投げる（同じミッションの再現実行用）
+CACHE_MODES = ("off", "readwrite", "replay")
+LLM_CACHE_MODE = os.environ.get('DISCOVERY_LLM_CACHE', 'off')
+
+# キャッシュファイルの最大サイズ。超えた場合は最も長く使われていない応答から削除します
+LLM_CACHE_MAX_BYTES = int(float(os.environ.get('DISCOVERY_LLM_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+
+class CacheMiss(LookupError):
+    """replay モードで、キャッシュにない要求を受けた場合に投げる例外です。"""
+
+
+def make_key(**parts):
+    """
+    要求の内容（モデル名、メッセージ、ツール、サンプリングの設定など）から、キャッシュのキーとなるハッシュ値を返します。
+    キーの順序によらず、同じ内容であれば同じ値になります。
+    """
+    serialized = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LLMの応答を、要求の内容のハッシュ値をキーとしてSQLiteのファイルに保存するキャッシュです。
+    同じミッションを再実行する場合（回帰テスト、デモ、ベンチマーク）に、APIを呼ばずに同じ応答を返せます。
+    ファイルの合計サイズが max_bytes を超えた場合は、最も長く使われていない応答から削除します。
+    """
+
+    def __init__(self, path=None, mode=None, max_bytes=None):
+        """
+        Args:
+            path (str, optional): SQLiteファイルのパス。デフォルトは cache_dir() の llm_cache.sqlite
+            mode (str, optional): "off"、"readwrite"、"replay" のいずれか。デフォルトは環境変数 DISCOVERY_LLM_CACHE
+            max_bytes (int, optional): 保存する応答の合計サイズの上限（バイト）
+
+        Raises:
+            ValueError: mode が不明な場合
+        """
+        self.mode = mode or LLM_CACHE_MODE
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"不明なキャッシュモードです: {self.mode} (利用可能: {', '.join(CACHE_MODES)})")
+        self.path = path or os.path.join(cache_dir(), 'llm_cache.sqlite')
+        self.max_bytes = max_bytes or LLM_CACHE_MAX_BYTES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self._connection.commit()
+        return self._connection
+
+    # --- 要求単位の参照と保存 ---
+
+    def lookup(self, key):
+        """
+        キャッシュされた応答を返します。off モードまたはキャッシュにない場合はNoneです。
+
+        Raises:
+            CacheMiss: replay モードでキャッシュにない場合
+        """
+        if not self.enabled:
+            return None
+        value = self.get(key)
+        if value is None:
+            self.misses += 1
+            if self.mode == "replay":
+                raise CacheMiss(f"replay モードですが、キャッシュに応答がありません (key: {key[:16]}...)")
+            return None
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        """readwrite モードの場合だけ応答を保存します。"""
+        if self.mode == "readwrite":
+            self.put(key, value)
+
+    # --- 低レベルの操作 ---
+
+    def get(self, key):
+        """キーに対応する値を返し、最終使用時刻を更新します。ない場合はNoneです。"""
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            connection.commit()
+        return pickle.loads(row[0])
+
+    def put(self, key, value):
+        """値を保存し、合計サイズが上限を超えていれば古いものから削除します。"""
+        blob = pickle.dumps(value)
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self._evict(connection)
+            connection.commit()
+
+    def _evict(self, connection):
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 上限の9割まで減らし、保存のたびに削除が起きないようにする
+        target = total - int(self.max_bytes * 0.9)
+        removed = 0
+        stale = []
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if removed >= target:
+                break
+            stale.append((key,))
+            removed += size
+        connection.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def clear(self):
+        """全ての応答を削除します。"""
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM responses")
+            connection.commit()
+
+    def namespace(self, name):
+        """
+        AutoGen の ChatCompletionCache に渡すストアを返します。
+        ChatCompletionCache のキーにはモデル名が含まれないため、name（モデル名）を付けてから保存します。
+        """
+        return _NamespacedStore(self, name)
+
+
+class _NamespacedStore:
+    """autogen_core の CacheStore と同じ get/set を持つ、LLMResponseCache の名前空間付きのビューです。"""
+
+    def __init__(self, cache, name):
+        self._cache = cache
+        self._name = name
+
+    def get(self, key, default=None):
+        value = self._cache.lookup(make_key(namespace=self._name, key=key))
+        return default if value is None else value
+
+    def set(self, key, value):
+        self._cache.store(make_key(namespace=self._name, key=key), value)
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """プロセス全体で共有する LLMResponseCache を返します。"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMResponseCache()
+        return _shared_cache
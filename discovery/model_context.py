@@ -0,0 +1,196 @@
+import os
+from typing import Any, Dict, List, Mapping, Optional
+
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import (
+    AssistantMessage,
+    ChatCompletionClient,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    SystemMessage,
+    UserMessage,
+)
+
+from .llm_cache import CacheMiss
+
+# エージェントごとのモデルコンテキストに含めるトークン数の上限
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('DISCOVERY_CONTEXT_TOKENS', '16000'))
+
+# 古い会話をまとめた要約の長さの目安（トークン数）
+SUMMARY_TOKEN_BUDGET = int(os.environ.get('DISCOVERY_SUMMARY_TOKENS', '1500'))
+
+# 要約するときに、ツールの実行結果1件あたりに含める最大文字数
+RESULT_CHARS = 2000
+
+SUMMARY_INSTRUCTIONS = """あなたはMinecraft BOTを操作するマルチエージェントの会話を要約する担当です。
+「これまでの要約」と「新しい会話」を統合し、更新した要約だけを出力してください。
+最終目標、完了したタスクと成功条件、失敗したタスクとその原因、BOTの状態（位置・体力・主要なインベントリ）、
+判明した座標や資源の場所、次に予定している作業を、具体的な数値とアイテム名（英語のまま）を残して簡潔に記述してください。
+要約は {budget} トークン以内に収めてください。"""
+
+
+class SummarizingChatCompletionContext(ChatCompletionContext):
+    """
+    トークン数の上限を持つモデルコンテキストです。
+    システムメッセージと最近のメッセージはそのまま残し、上限を超えた古いメッセージは要約用のモデルで
+    1つの要約にまとめます。要約は新しく溢れたメッセージだけを追加して更新するため、毎回全体を要約し直すことはありません。
+    各メッセージのトークン数は最初に数えたものを保持し、同じメッセージを数え直しません。
+    """
+
+    def __init__(
+        self,
+        summary_client: ChatCompletionClient,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        summary_budget: int = SUMMARY_TOKEN_BUDGET,
+        keep_recent: int = 6,
+        strip_thoughts: bool = False,
+        initial_messages: Optional[List[LLMMessage]] = None,
+    ) -> None:
+        """
+        Args:
+            summary_client (ChatCompletionClient): 要約の作成とトークン数の計算に使うモデルクライアント
+            token_budget (int): get_messages が返すメッセージの合計トークン数の上限
+            summary_budget (int): 要約の長さの目安（トークン数）
+            keep_recent (int): 上限を超えても要約せずに残す最近のメッセージの最小数
+            strip_thoughts (bool): Trueの場合、AssistantMessage の thought を追加時に取り除きます（推論モデル用）
+            initial_messages (list, optional): 最初に追加するメッセージ
+        """
+        super().__init__(initial_messages)
+        self._summary_client = summary_client
+        self._token_budget = token_budget
+        self._summary_budget = summary_budget
+        self._keep_recent = keep_recent
+        self._strip_thoughts = strip_thoughts
+        self._summary = ""
+        self._summary_message: Optional[UserMessage] = None
+        # id(メッセージ) -> トークン数。メッセージは self._messages から参照され続けるため id は変わらない
+        self._token_counts: Dict[int, int] = {}
+
+    async def add_message(self, message: LLMMessage) -> None:
+        if self._strip_thoughts and isinstance(message, AssistantMessage) and message.thought is not None:
+            message = message.model_copy(update={"thought": None})
+        await super().add_message(message)
+
+    async def get_messages(self) -> List[LLMMessage]:
+        system = [m for m in self._messages if isinstance(m, SystemMessage)]
+        history = [m for m in self._messages if not isinstance(m, SystemMessage)]
+        summary = [self._summary_message] if self._summary_message is not None else []
+        if self._total(system + summary + history) > self._token_budget:
+            await self._fold(system, history)
+            history = [m for m in self._messages if not isinstance(m, SystemMessage)]
+            summary = [self._summary_message] if self._summary_message is not None else []
+        return system + summary + history
+
+    async def clear(self) -> None:
+        await super().clear()
+        self._summary = ""
+        self._summary_message = None
+        self._token_counts.clear()
+
+    async def save_state(self) -> Mapping[str, Any]:
+        state = dict(await super().save_state())
+        state["summary"] = self._summary
+        return state
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        await super().load_state(state)
+        self._token_counts.clear()
+        self._set_summary(state.get("summary", ""))
+
+    # --- 要約 ---
+
+    async def _fold(self, system: List[LLMMessage], history: List[LLMMessage]) -> None:
+        """古いメッセージを要約に移し、最近のメッセージが上限の6割程度に収まるようにします。"""
+        # 要約のたびに上限ぎりぎりまで戻すと、次の数回の発言でまた要約が必要になるため余裕を持たせる
+        available = int(self._token_budget * 0.6) - self._total(system) - self._summary_budget
+        cut = len(history)
+        used = 0
+        while cut > 0:
+            tokens = self._count(history[cut - 1])
+            if used + tokens > available and len(history) - cut >= self._keep_recent:
+                break
+            used += tokens
+            cut -= 1
+        # ツールの実行結果を、それを要求した AssistantMessage から切り離さない
+        while cut < len(history) and isinstance(history[cut], FunctionExecutionResultMessage):
+            cut += 1
+        folded = history[:cut]
+        if not folded:
+            return
+
+        try:
+            summary = await self._summarize(folded)
+        except CacheMiss:
+            # replay モードでは、キャッシュにない要約の要求を握りつぶさずに失敗させる
+            raise
+        except Exception as e:
+            # 要約できなかった場合は、上限を超えたまま全てのメッセージを残す
+            print(f"\033[93mWarning: 会話の要約に失敗しました。要約せずに続行します: {e}\033[0m")
+            return
+
+        folded_ids = {id(m) for m in folded}
+        self._messages = [m for m in self._messages if id(m) not in folded_ids]
+        for message_id in folded_ids:
+            self._token_counts.pop(message_id, None)
+        self._set_summary(summary)
+        print(f"\033[34m{len(folded)}件の古いメッセージを要約しました (残り {len(self._messages)}件)\033[0m")
+
+    async def _summarize(self, messages: List[LLMMessage]) -> str:
+        transcript = "\n".join(_describe(m) for m in messages)
+        body = f"## これまでの要約\n{self._summary or '(なし)'}\n\n## 新しい会話\n{transcript}"
+        result = await self._summary_client.create([
+            SystemMessage(content=SUMMARY_INSTRUCTIONS.format(budget=self._summary_budget)),
+            UserMessage(content=body, source="user"),
+        ])
+        if not isinstance(result.content, str) or not result.content.strip():
+            raise ValueError("要約が空でした")
+        return result.content.strip()
+
+    def _set_summary(self, summary: str) -> None:
+        if self._summary_message is not None:
+            self._token_counts.pop(id(self._summary_message), None)
+        self._summary = summary
+        self._summary_message = (
+            UserMessage(content=f"これまでの経過の要約（古い会話はこの要約に置き換えています）:\n{summary}", source="summary")
+            if summary else None
+        )
+
+    # --- トークン数 ---
+
+    def _total(self, messages: List[LLMMessage]) -> int:
+        return sum(self._count(m) for m in messages)
+
+    def _count(self, message: LLMMessage) -> int:
+        key = id(message)
+        count = self._token_counts.get(key)
+        if count is None:
+            try:
+                count = self._summary_client.count_tokens([message])
+            except Exception:
+                # トークナイザーがないモデルでは文字数から見積もる（日本語は1文字1トークン前後）
+                count = len(_describe(message))
+            self._token_counts[key] = count
+        return count
+
+
+def _describe(message: LLMMessage) -> str:
+    """メッセージを要約用の1行のテキストにします。"""
+    if isinstance(message, FunctionExecutionResultMessage):
+        results = "; ".join(_truncate(str(result.content)) for result in message.content)
+        return f"[tool results] {results}"
+    source = getattr(message, "source", None) or type(message).__name__
+    if isinstance(message.content, str):
+        return f"[{source}] {message.content}"
+    parts = []
+    for item in message.content:
+        if isinstance(item, str):
+            parts.append(item)
+        elif hasattr(item, "arguments"):
+            parts.append(f"{item.name}({_truncate(item.arguments)})")
+        else:
+            parts.append("[image]")
+    return f"[{source}] {' '.join(parts)}"
+
+
+def _truncate(text: str) -> str:
+    return text if len(text) <= RESULT_CHARS else text[:RESULT_CHARS] + "...(省略)"
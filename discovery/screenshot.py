@@ -0,0 +1,470 @@
+import asyncio
+import os
+import re
+from collections import namedtuple
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+
+
+class CaptureProfile(namedtuple('CaptureProfile', ['name', 'width', 'height', 'format', 'quality', 'detail'])):
+    """
+    画像分析に送るスクリーンショットの形式です。
+
+    Attributes:
+        name (str): プロファイル名
+        width (int): 出力画像の最大幅
+        height (int): 出力画像の最大高さ
+        format (str): 'png'、'jpeg'、'webp' のいずれか
+        quality (float | None): jpeg/webp の品質（0〜1）。png では使いません
+        detail (str): 画像分析APIに渡す detail ('low'、'high'、'auto')
+    """
+
+    __slots__ = ()
+
+    @property
+    def mime_type(self):
+        return f"image/{self.format}"
+
+
+# OpenAI の画像入力は detail='high' のとき 512px 四方のタイル数に比例してトークンを消費する
+# (960x540 は 4 タイル、768x432 は 2 タイル、512x288 は 1 タイル。detail='low' はサイズによらず一定)
+CAPTURE_PROFILES = {
+    # 従来と同じ 960x540 の PNG
+    'full': CaptureProfile('full', 960, 540, 'png', None, 'high'),
+    'balanced': CaptureProfile('balanced', 768, 432, 'jpeg', 0.8, 'high'),
+    'fast': CaptureProfile('fast', 512, 288, 'webp', 0.7, 'low'),
+}
+
+# capture_bot_view などで使うプロファイル
+DEFAULT_CAPTURE_PROFILE = os.environ.get('DISCOVERY_CAPTURE_PROFILE', 'balanced')
+
+# 撮影結果。data はBase64エンコードした画像、hash は切り抜く前の画面全体の知覚ハッシュ
+Capture = namedtuple('Capture', ['data', 'mime_type', 'width', 'height', 'hash'])
+
+# 画面上の領域 (左端, 上端, 幅, 高さ)。画面全体を 1 とした割合で表します
+CROP_REGIONS = {
+    'top': (0.0, 0.0, 1.0, 0.5),
+    'bottom': (0.0, 0.5, 1.0, 0.5),
+    'left': (0.0, 0.0, 0.5, 1.0),
+    'right': (0.5, 0.0, 0.5, 1.0),
+    'center': (0.25, 0.25, 0.5, 0.5),
+}
+
+# attention_hint に含まれていれば、その領域だけを切り抜く語
+CROP_KEYWORDS = {
+    'top': ('sky', 'ceiling', 'above', '上空', '天井', '頭上'),
+    'bottom': ('ground', 'floor', 'below', 'feet', '地面', '足元', '床'),
+    'left': ('left', '左'),
+    'right': ('right', '右'),
+    'center': ('center', 'ahead', 'in front', 'crosshair', '正面', '前方', '中央'),
+}
+
+
+def get_capture_profile(profile=None):
+    """
+    プロファイル名（または CaptureProfile）から CaptureProfile を返します。Noneの場合は DEFAULT_CAPTURE_PROFILE です。
+
+    Raises:
+        ValueError: 存在しないプロファイル名の場合
+    """
+    if isinstance(profile, CaptureProfile):
+        return profile
+    name = profile or DEFAULT_CAPTURE_PROFILE
+    if name not in CAPTURE_PROFILES:
+        raise ValueError(f"不明なキャプチャプロファイルです: {name} (利用可能: {', '.join(CAPTURE_PROFILES)})")
+    return CAPTURE_PROFILES[name]
+
+
+def crop_for_hint(attention_hint):
+    """
+    attention_hint が画面の特定の領域（空、足元、左右、正面）だけを指している場合、その領域名を返します。
+    領域を指していない、または複数の領域を指している場合はNoneを返します（画面全体を使います）。
+    """
+    if not attention_hint:
+        return None
+    hint = attention_hint.lower()
+    # 英単語は単語単位で照合する（'bright' を 'right' とみなさないため）
+    matched = [
+        region for region, words in CROP_KEYWORDS.items()
+        if any(re.search(rf"\b{word}\b", hint) if word.isascii() else word in hint for word in words)
+    ]
+    return matched[0] if len(matched) == 1 else None
+
+
+def resolve_crop(crop):
+    """領域名または (左端, 上端, 幅, 高さ) の割合を、割合のタプルにして返します。Noneの場合はNoneです。"""
+    if crop is None:
+        return None
+    if isinstance(crop, str):
+        if crop not in CROP_REGIONS:
+            raise ValueError(f"不明な切り抜き領域です: {crop} (利用可能: {', '.join(CROP_REGIONS)})")
+        return CROP_REGIONS[crop]
+    x, y, w, h = crop
+    return (float(x), float(y), float(w), float(h))
+
+
+# ビューアーのページに読み込み前に注入するスクリプト
+# - WebGLのコンテキストを preserveDrawingBuffer: true で作らせ、描画済みの画素を読めるようにする
+# - 1フレームあたりの描画呼び出し数を数え、チャンクのメッシュが増えている間は安定していないとみなす
+# - window.__discoveryWaitStable(options) で、描画呼び出し数と縮小画像の画素差分が
+#   stableFrames フレーム続けて threshold 以下になるまで待つ。結果には最後のフレームの dHash を含める
+# - window.__discoveryEncode(options) で、canvas の指定領域を縮小して jpeg/webp/png にエンコードする
+READINESS_PROBE = """
+(() => {
+  const getContext = HTMLCanvasElement.prototype.getContext
+  HTMLCanvasElement.prototype.getContext = function (type, attributes) {
+    if (type === 'webgl' || type === 'webgl2' || type === 'experimental-webgl') {
+      attributes = Object.assign({}, attributes, { preserveDrawingBuffer: true })
+    }
+    return getContext.call(this, type, attributes)
+  }
+
+  let drawCalls = 0
+  for (const proto of [window.WebGLRenderingContext, window.WebGL2RenderingContext]) {
+    if (!proto) continue
+    for (const name of ['drawElements', 'drawArrays']) {
+      const original = proto.prototype[name]
+      proto.prototype[name] = function (...args) {
+        drawCalls++
+        return original.apply(this, args)
+      }
+    }
+  }
+
+  const SAMPLE_WIDTH = 64
+  const SAMPLE_HEIGHT = 36
+  let sampler = null
+  const grab = (canvas) => {
+    if (!sampler) {
+      const sample = document.createElement('canvas')
+      sample.width = SAMPLE_WIDTH
+      sample.height = SAMPLE_HEIGHT
+      sampler = sample.getContext('2d', { willReadFrequently: true })
+    }
+    sampler.drawImage(canvas, 0, 0, SAMPLE_WIDTH, SAMPLE_HEIGHT)
+    return sampler.getImageData(0, 0, SAMPLE_WIDTH, SAMPLE_HEIGHT).data
+  }
+  // 0 (同一) から 1 (全画素が白黒反転) の平均差分
+  const difference = (a, b) => {
+    let sum = 0
+    for (let i = 0; i < a.length; i += 4) {
+      sum += Math.abs(a[i] - b[i]) + Math.abs(a[i + 1] - b[i + 1]) + Math.abs(a[i + 2] - b[i + 2])
+    }
+    return sum / (a.length / 4) / 765
+  }
+  const nextFrame = () => new Promise(resolve => requestAnimationFrame(resolve))
+
+  // 9x8 に縮小したグレースケール画像で、左右に隣り合う画素の明暗を比べた 64bit の知覚ハッシュ（16進数）
+  let hasher = null
+  const frameHash = (canvas) => {
+    if (!hasher) {
+      const sample = document.createElement('canvas')
+      sample.width = 9
+      sample.height = 8
+      hasher = sample.getContext('2d', { willReadFrequently: true })
+    }
+    hasher.drawImage(canvas, 0, 0, 9, 8)
+    const data = hasher.getImageData(0, 0, 9, 8).data
+    const gray = (x, y) => {
+      const i = (y * 9 + x) * 4
+      return data[i] * 0.299 + data[i + 1] * 0.587 + data[i + 2] * 0.114
+    }
+    let hex = ''
+    for (let y = 0; y < 8; y++) {
+      let byte = 0
+      for (let x = 0; x < 8; x++) byte = (byte << 1) | (gray(x, y) < gray(x + 1, y) ? 1 : 0)
+      hex += byte.toString(16).padStart(2, '0')
+    }
+    return hex
+  }
+
+  window.__discoveryWaitStable = async (options) => {
+    const { threshold = 0.002, stableFrames = 3, timeout = 5000, expectChange = false, changeTimeout = 1000 } = options || {}
+    const start = performance.now()
+    const canvas = document.querySelector('canvas')
+    if (!canvas) return { ready: false, reason: 'no_canvas', elapsed: 0 }
+
+    // ビューアーがワールドを公開している場合は、チャンクのメッシュ生成の完了も待つ
+    const world = window.viewer && window.viewer.world
+    let meshesReady = !(world && typeof world.waitForChunksToRender === 'function')
+    if (!meshesReady) world.waitForChunksToRender().then(() => { meshesReady = true })
+
+    await nextFrame()
+    drawCalls = 0
+    let previous = grab(canvas)
+    let previousCalls = -1
+    let changed = !expectChange
+    let stable = 0
+    let delta = 1
+    while (performance.now() - start < timeout) {
+      await nextFrame()
+      const calls = drawCalls
+      drawCalls = 0
+      const current = grab(canvas)
+      delta = difference(previous, current)
+      previous = current
+      if (!changed) {
+        // 視点を変えた直後は、変化が描画に反映されるまで（または changeTimeout まで）待つ
+        changed = delta > threshold || performance.now() - start > changeTimeout
+        continue
+      }
+      stable = (delta <= threshold && calls === previousCalls) ? stable + 1 : 0
+      previousCalls = calls
+      if (stable >= stableFrames && meshesReady) {
+        return { ready: true, delta, drawCalls: calls, elapsed: performance.now() - start, hash: frameHash(canvas) }
+      }
+    }
+    return { ready: false, reason: 'timeout', delta, elapsed: performance.now() - start, hash: frameHash(canvas) }
+  }
+
+  // crop ([左端, 上端, 幅, 高さ] の割合) の領域を、width x height に収まるよう縮小してエンコードする（拡大はしない）
+  window.__discoveryEncode = (options) => {
+    const { type = 'image/png', quality, width, height, crop } = options || {}
+    const canvas = document.querySelector('canvas')
+    if (!canvas) return null
+    const [cx, cy, cw, ch] = crop || [0, 0, 1, 1]
+    const sx = Math.round(cx * canvas.width)
+    const sy = Math.round(cy * canvas.height)
+    const sw = Math.max(1, Math.round(cw * canvas.width))
+    const sh = Math.max(1, Math.round(ch * canvas.height))
+    const scale = Math.min(1, (width || sw) / sw, (height || sh) / sh)
+    const output = document.createElement('canvas')
+    output.width = Math.max(1, Math.round(sw * scale))
+    output.height = Math.max(1, Math.round(sh * scale))
+    const context = output.getContext('2d')
+    context.imageSmoothingQuality = 'high'
+    context.drawImage(canvas, sx, sy, sw, sh, 0, 0, output.width, output.height)
+    // 対応していない形式を指定すると png になるため、実際の形式も返す
+    const url = output.toDataURL(type, quality)
+    const comma = url.indexOf(',')
+    return { data: url.slice(comma + 1), type: url.slice(5, url.indexOf(';')), width: output.width, height: output.height }
+  }
+})()
+"""
+
+
+class ViewerPool:
+    """
+    Prismarine Viewer を表示したままのヘッドレスChromiumのページを保持し、スクリーンショットに使い回します。
+    ブラウザの起動とページの読み込みは初回（または異常を検知したとき）だけ行うため、
+    2回目以降のスクリーンショットはページの撮影だけで済みます。
+    ページは取得のたびに状態を確認し、ブラウザが落ちている・ページが閉じている・canvasがない場合は作り直します。
+    """
+
+    def __init__(self, url, size=1, width=960, height=540, threshold=0.002, stable_frames=3, timeout=5.0):
+        """
+        Args:
+            url (str): Prismarine Viewer のURL
+            size (int): 保持するページの数。同時に撮影できる数になります
+            width (int): ページの幅の初期値
+            height (int): ページの高さの初期値
+            threshold (float): 描画が安定したとみなすフレーム間の画素差分（0〜1）
+            stable_frames (int): 差分が threshold 以下のフレームが何フレーム続けば安定とみなすか
+            timeout (float): 描画の安定を待つ最大秒数
+        """
+        self.url = url
+        self.size = size
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        self.stable_frames = stable_frames
+        self.timeout = timeout
+        self._playwright = None
+        self._browser = None
+        self._pages = None
+        self._lock = asyncio.Lock()
+        self._opened = set()
+        self._stale = set()
+
+    async def _ensure_browser(self):
+        """ブラウザが起動していなければ起動します。"""
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            await self._shutdown()
+            print("\033[34mスクリーンショット用のChromiumを起動します...\033[0m")
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self._pages = asyncio.Queue()
+            self._opened = set()
+            self._stale = set()
+            for _ in range(self.size):
+                self._pages.put_nowait(None)
+
+    async def _open_page(self, width, height):
+        page = await self._browser.new_page(viewport={"width": width, "height": height})
+        await page.add_init_script(READINESS_PROBE)
+        await page.goto(self.url, wait_until="load", timeout=60000)
+        await page.wait_for_selector('canvas', timeout=30000)
+        await self.on_page_loaded(page)
+        self._opened.add(page)
+        return page
+
+    async def on_page_loaded(self, page):
+        """ページを読み込んだ直後に呼ばれます。チャンクが描画されて画面が安定するまで待機します。"""
+        await self.wait_until_stable(page, timeout=max(self.timeout, 15.0))
+
+    async def wait_until_stable(self, page, expect_change=False, timeout=None):
+        """
+        ページの描画が安定する（チャンクのメッシュが揃い、フレーム間の画素差分がしきい値以下になる）まで待ちます。
+
+        Args:
+            page (Page): ビューアーのページ
+            expect_change (bool): 視点を変えた直後の場合はTrue。変化が描画に反映されてから安定を待ちます
+            timeout (float, optional): 最大待機秒数（デフォルト: self.timeout）
+
+        Returns:
+            dict: ready (安定したか)、elapsed (待機ミリ秒) などを含む辞書
+        """
+        timeout = timeout or self.timeout
+        state = await page.evaluate(
+            "(options) => window.__discoveryWaitStable(options)",
+            {
+                "threshold": self.threshold,
+                "stableFrames": self.stable_frames,
+                "timeout": int(timeout * 1000),
+                "expectChange": expect_change,
+            },
+        )
+        if not state.get("ready"):
+            print(f"\033[93mWarning: ビューアーの描画が安定しないまま撮影します ({state.get('reason')}, {state.get('elapsed', 0):.0f}ms)\033[0m")
+        return state
+
+    async def _is_healthy(self, page):
+        """ページが使える状態（開いていて、ビューアーのcanvasがある）かを確認します。"""
+        if page is None or page.is_closed() or page in self._stale:
+            return False
+        try:
+            return await asyncio.wait_for(page.evaluate("() => !!document.querySelector('canvas')"), 5)
+        except Exception:
+            return False
+
+    async def acquire(self, width=None, height=None):
+        """
+        使えるページを1つ取り出します。使い終わったら release() で返してください。
+
+        Returns:
+            Page: Prismarine Viewer を表示しているページ
+        """
+        width = width or self.width
+        height = height or self.height
+        for attempt in range(2):
+            await self._ensure_browser()
+            page = await self._pages.get()
+            try:
+                if not await self._is_healthy(page):
+                    if page is not None:
+                        self._stale.discard(page)
+                        self._opened.discard(page)
+                        try:
+                            await page.close()
+                        except Exception:
+                            pass
+                    page = await self._open_page(width, height)
+                elif page.viewport_size != {"width": width, "height": height}:
+                    await page.set_viewport_size({"width": width, "height": height})
+                return page
+            except Exception as e:
+                self._pages.put_nowait(None)
+                if attempt == 1:
+                    raise
+                print(f"\033[93mWarning: ビューアーのページを開けませんでした。ブラウザを再起動します: {e}\033[0m")
+                await self.close()
+        raise RuntimeError("ビューアーのページを取得できませんでした")
+
+    def release(self, page):
+        """acquire() で取り出したページを返却します。"""
+        if self._pages is not None:
+            self._pages.put_nowait(page)
+
+    def invalidate(self):
+        """保持しているページを次回の取得時に読み込み直すようにします（BOTの再接続後など）。"""
+        self._stale.update(self._opened)
+
+    async def _capture_page(self, page, profile, crop, expect_change):
+        """描画の安定を待ってから、ページの canvas をプロファイルの形式でエンコードします。"""
+        state = await self.wait_until_stable(page, expect_change=expect_change)
+        encoded = await page.evaluate(
+            "(options) => window.__discoveryEncode(options)",
+            {
+                "type": profile.mime_type,
+                "quality": profile.quality,
+                "width": profile.width,
+                "height": profile.height,
+                "crop": resolve_crop(crop),
+            },
+        )
+        if encoded is None:
+            raise RuntimeError("ビューアーのcanvasが見つかりません")
+        return Capture(encoded["data"], encoded["type"], encoded["width"], encoded["height"], state.get("hash"))
+
+    @asynccontextmanager
+    async def session(self, width=None, height=None):
+        """
+        ページを1つ占有したまま、続けて何枚も撮影するためのコンテキストマネージャーです。
+        capture(expect_change=False, profile=None, crop=None) は Capture を返します。
+
+        Example:
+            >>> async with pool.session() as capture:
+            ...     image = await capture(expect_change=True, profile='fast')
+        """
+        page = await self.acquire(width, height)
+
+        async def capture(expect_change=False, profile=None, crop=None):
+            return await self._capture_page(page, get_capture_profile(profile), crop, expect_change)
+
+        try:
+            yield capture
+        except Exception:
+            # 撮影に失敗したページは次回作り直す
+            self._stale.add(page)
+            raise
+        finally:
+            self.release(page)
+
+    async def capture(self, profile=None, crop=None, expect_change=False, width=None, height=None):
+        """
+        描画が安定するのを待ってから、ビューアーの画面をプロファイルの解像度・形式で取得します。
+        縮小・切り抜き・エンコードはページ内で行うため、Python側での画像処理は不要です。
+
+        Args:
+            profile (str | CaptureProfile, optional): キャプチャプロファイル（デフォルト: DEFAULT_CAPTURE_PROFILE）
+            crop (str | tuple, optional): 切り抜く領域。CROP_REGIONS の名前、または (左端, 上端, 幅, 高さ) の割合
+            expect_change (bool): 直前に視点を変えた場合はTrue
+            width (int, optional): ページ（描画）の幅
+            height (int, optional): ページ（描画）の高さ
+
+        Returns:
+            Capture: Base64エンコードした画像、MIMEタイプ、画像サイズ、知覚ハッシュ
+        """
+        profile = get_capture_profile(profile)
+        page = await self.acquire(width, height)
+        try:
+            return await self._capture_page(page, profile, crop, expect_change)
+        except Exception:
+            # 撮影に失敗したページは次回作り直す
+            self._stale.add(page)
+            raise
+        finally:
+            self.release(page)
+
+    async def _shutdown(self):
+        browser, playwright = self._browser, self._playwright
+        self._browser = None
+        self._playwright = None
+        self._pages = None
+        try:
+            if browser is not None:
+                await browser.close()
+        except Exception as e:
+            print(f"\033[31mError closing screenshot browser (ignored): {e}\033[0m")
+        try:
+            if playwright is not None:
+                await playwright.stop()
+        except Exception as e:
+            print(f"\033[31mError stopping Playwright (ignored): {e}\033[0m")
+
+    async def close(self):
+        """ブラウザを終了します。次回の撮影時に自動で起動し直します。"""
+        async with self._lock:
+            await self._shutdown()
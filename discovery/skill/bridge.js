@@ -0,0 +1,498 @@
+// Python (JSPyBridge) から一括で呼び出すためのヘルパー関数群
+// ブリッジ越しの呼び出しは1回ごとにIPCが発生するため、ループ処理はNode側で完結させ、
+// 結果はJSON文字列（プリミティブ）として返します。
+const Vec3 = require('vec3')
+
+/**
+ * 直方体範囲のブロックを1回の呼び出しで取得します。
+ * 戻り値はJSON文字列で、palette（ブロック名の配列。未ロード領域はnull）と
+ * data（paletteへのインデックスを格納したUint16Arrayのbase64）を含みます。
+ * インデックスの並びは (dx * sy + dy) * sz + dz です。
+ */
+function scanCuboid (bot, x0, y0, z0, sx, sy, sz) {
+  const palette = []
+  const paletteIndex = new Map()
+  const data = new Uint16Array(sx * sy * sz)
+  const minY = bot.game.minY ?? 0
+  const maxY = minY + (bot.game.height ?? 256)
+  const pos = new Vec3(0, 0, 0)
+
+  const indexOf = (key, name) => {
+    let index = paletteIndex.get(key)
+    if (index === undefined) {
+      index = palette.length
+      palette.push(name)
+      paletteIndex.set(key, index)
+    }
+    return index
+  }
+
+  let i = 0
+  for (let dx = 0; dx < sx; dx++) {
+    pos.x = x0 + dx
+    for (let dy = 0; dy < sy; dy++) {
+      pos.y = y0 + dy
+      for (let dz = 0; dz < sz; dz++) {
+        pos.z = z0 + dz
+        let index
+        if (pos.y < minY || pos.y >= maxY || !bot.world.getColumnAt(pos)) {
+          index = indexOf(-1, null)
+        } else {
+          const stateId = bot.world.getBlockStateId(pos)
+          const block = bot.registry.blocksByStateId[stateId]
+          index = indexOf(stateId, block ? block.name : null)
+        }
+        data[i++] = index
+      }
+    }
+  }
+
+  return JSON.stringify({
+    origin: [x0, y0, z0],
+    shape: [sx, sy, sz],
+    palette,
+    data: Buffer.from(data.buffer).toString('base64')
+  })
+}
+
+/**
+ * ブロックのステートID表を返します。
+ * 各要素は [ブロックID, ブロック名, 最小ステートID, 最大ステートID, 掘れるか, 固体ブロックか] です。
+ */
+function blockStates (bot) {
+  return JSON.stringify(blockRows(bot))
+}
+
+function blockRows (bot) {
+  return bot.registry.blocksArray.map(block => [
+    block.id,
+    block.name,
+    block.minStateId ?? block.id,
+    block.maxStateId ?? block.id,
+    !!block.diggable,
+    block.boundingBox === 'block'
+  ])
+}
+
+/**
+ * Python側のレジストリ表（RegistryTables）の元になるデータを1回の呼び出しでまとめて返します。
+ * blocks は blockStates と同じ形式で、hardness と harvestTools は blocks と同じ並びです（harvestTools は道具不要なら null）。
+ * items は [id, name, stackSize]、biomes は [id, name]、foods は [name, foodPoints, saturation] の配列です。
+ */
+function registryTables (bot) {
+  const registry = bot.registry
+  const blocks = registry.blocksArray
+  return JSON.stringify({
+    version: bot.version,
+    blocks: blockRows(bot),
+    hardness: blocks.map(block => block.hardness ?? null),
+    harvestTools: blocks.map(block => block.harvestTools ? Object.keys(block.harvestTools).map(Number) : null),
+    items: registry.itemsArray.map(item => [item.id, item.name, item.stackSize]),
+    biomes: (registry.biomesArray || []).map(biome => [biome.id, biome.name]),
+    foods: (registry.foodsArray || []).map(food => [food.name, food.foodPoints, food.saturation])
+  })
+}
+
+/**
+ * 全てのクラフトレシピを1回の呼び出しでまとめて返します。
+ * 各要素は [作成されるアイテム名, 作成数, [[材料名, 個数], ...], 作業台が必要か] です。
+ */
+function recipeTable (bot) {
+  const registry = bot.registry
+  const idOf = entry => (entry !== null && typeof entry === 'object') ? entry.id : entry
+  const rows = []
+  for (const [resultId, recipes] of Object.entries(registry.recipes || {})) {
+    const result = registry.items[resultId]
+    if (!result) continue
+    for (const recipe of recipes) {
+      const counts = new Map()
+      const add = entry => {
+        const id = idOf(entry)
+        if (id === null || id === undefined || id < 0 || !registry.items[id]) return
+        const name = registry.items[id].name
+        counts.set(name, (counts.get(name) || 0) + 1)
+      }
+      let needsTable = false
+      if (recipe.inShape) {
+        recipe.inShape.forEach(row => row.forEach(add))
+        needsTable = recipe.inShape.length > 2 || recipe.inShape.some(row => row.length > 2)
+      } else if (recipe.ingredients) {
+        recipe.ingredients.forEach(add)
+        needsTable = recipe.ingredients.length > 4
+      }
+      if (counts.size === 0) continue
+      rows.push([result.name, recipe.result ? recipe.result.count : 1, Array.from(counts.entries()), needsTable])
+    }
+  }
+  return JSON.stringify(rows)
+}
+
+/**
+ * 1チャンク列分のブロックをセクション（16x16x16）単位で書き出します。
+ * セクションごとにステートIDのパレットと、(x * 16 + y) * 16 + z 順のインデックス配列を持ちます。
+ * 空気だけのセクションは null になります。
+ */
+function dumpColumn (bot, chunkX, chunkZ) {
+  const column = bot.world.getColumn(chunkX, chunkZ)
+  if (!column) return null
+  const minY = bot.game.minY ?? 0
+  const height = bot.game.height ?? 256
+  const pos = new Vec3(0, 0, 0)
+  const sections = []
+  for (let baseY = minY; baseY < minY + height; baseY += 16) {
+    const palette = []
+    const paletteIndex = new Map()
+    const data = new Uint16Array(4096)
+    let i = 0
+    for (let x = 0; x < 16; x++) {
+      pos.x = x
+      for (let y = 0; y < 16; y++) {
+        pos.y = baseY + y
+        for (let z = 0; z < 16; z++) {
+          pos.z = z
+          const stateId = column.getBlockStateId(pos) ?? 0
+          let index = paletteIndex.get(stateId)
+          if (index === undefined) {
+            index = palette.length
+            palette.push(stateId)
+            paletteIndex.set(stateId, index)
+          }
+          data[i++] = index
+        }
+      }
+    }
+    if (palette.length === 1 && palette[0] === 0) {
+      sections.push(null)
+    } else {
+      const packed = palette.length <= 256 ? Uint8Array.from(data) : data
+      sections.push({
+        palette,
+        bits: packed.BYTES_PER_ELEMENT * 8,
+        data: Buffer.from(packed.buffer).toString('base64')
+      })
+    }
+  }
+  return { x: chunkX, z: chunkZ, minY, sections }
+}
+
+/**
+ * ワールドの変化をPython側のキャッシュへ送ります。
+ * 既にロード済みのチャンク列を送った後、chunkColumnLoad / chunkColumnUnload / blockUpdate を購読します。
+ * blockUpdate は同じティック内の更新をまとめて [x, y, z, stateId, ...] の形で送ります。
+ * 戻り値の detach() で購読を解除できます。
+ */
+function attachWorldFeed (bot, onEvent) {
+  let pending = []
+  const flush = () => {
+    const batch = pending
+    pending = []
+    onEvent('blocks', JSON.stringify(batch))
+  }
+  const onLoad = (point) => {
+    const column = dumpColumn(bot, point.x >> 4, point.z >> 4)
+    if (column) onEvent('load', JSON.stringify(column))
+  }
+  const onUnload = (point) => onEvent('unload', point.x >> 4, point.z >> 4)
+  const onBlock = (oldBlock, newBlock) => {
+    const block = newBlock ?? oldBlock
+    if (!block || !block.position) return
+    if (pending.length === 0) setImmediate(flush)
+    pending.push(block.position.x, block.position.y, block.position.z, newBlock ? newBlock.stateId : 0)
+  }
+
+  if (typeof bot.world.getColumns === 'function') {
+    for (const { chunkX, chunkZ } of bot.world.getColumns()) {
+      onLoad({ x: Number(chunkX) * 16, z: Number(chunkZ) * 16 })
+    }
+  }
+  bot.on('chunkColumnLoad', onLoad)
+  bot.on('chunkColumnUnload', onUnload)
+  bot.on('blockUpdate', onBlock)
+
+  return {
+    detach () {
+      bot.removeListener('chunkColumnLoad', onLoad)
+      bot.removeListener('chunkColumnUnload', onUnload)
+      bot.removeListener('blockUpdate', onBlock)
+    }
+  }
+}
+
+/**
+ * bot.findBlocks で複数種類のブロックをまとめて検索し、座標を [x, y, z, ...] のJSON文字列で返します。
+ * blockIds はブロックIDの配列のJSON文字列です。
+ */
+function findBlockPositions (bot, blockIds, x, y, z, maxDistance, count) {
+  const positions = bot.findBlocks({
+    point: new Vec3(x, y, z),
+    matching: JSON.parse(blockIds),
+    maxDistance,
+    count
+  })
+  const flat = []
+  for (const pos of positions) flat.push(pos.x, pos.y, pos.z)
+  return JSON.stringify(flat)
+}
+
+/**
+ * pathfinder の移動状況をPython側へ通知します。
+ * goal_reached / path_stop はそのまま、path_update は経路が見つからない場合（noPath / timeout）だけ送ります。
+ * noPath でも pathfinder は途中までの経路をたどるため、path_update は移動の終了を意味しません。
+ * スタック検出は move イベントで最後に位置が変わった時刻を記録し、採掘・設置をしていないのに
+ * stuckMs ミリ秒以上動いていなければ、経路をたどっている間は 'stuck' を、最初の経路計算の後に
+ * pathfinder が止まっている場合（途中までの経路の終点に着いた場合など）は 'idle' を送ります
+ * （サンプリングはNode側で行うためブリッジ呼び出しは発生しません）。
+ * 戻り値の detach() で購読を解除できます。
+ */
+function watchGoal (bot, onEvent, stuckMs) {
+  let lastPos = bot.entity.position.clone()
+  let lastMove = Date.now()
+  let computed = false
+  const onGoalReached = () => onEvent('goal_reached')
+  const onPathStop = () => onEvent('path_stop')
+  const onPathUpdate = (results) => {
+    computed = true
+    if (results.status === 'noPath' || results.status === 'timeout') onEvent('path_update', results.status)
+  }
+  const onMove = () => {
+    const pos = bot.entity.position
+    if (pos.distanceTo(lastPos) >= 0.01) {
+      lastPos = pos.clone()
+      lastMove = Date.now()
+    }
+  }
+  const timer = setInterval(() => {
+    const pathfinder = bot.pathfinder
+    if (pathfinder.isMining() || pathfinder.isBuilding()) {
+      lastMove = Date.now()
+      return
+    }
+    if (Date.now() - lastMove < stuckMs) return
+    lastMove = Date.now()
+    if (pathfinder.isMoving()) {
+      const pos = bot.entity.position
+      onEvent('stuck', pos.x, pos.y, pos.z)
+    } else if (computed) {
+      onEvent('idle')
+    }
+  }, 100)
+
+  bot.on('goal_reached', onGoalReached)
+  bot.on('path_stop', onPathStop)
+  bot.on('path_update', onPathUpdate)
+  bot.on('move', onMove)
+
+  return {
+    detach () {
+      clearInterval(timer)
+      bot.removeListener('goal_reached', onGoalReached)
+      bot.removeListener('path_stop', onPathStop)
+      bot.removeListener('path_update', onPathUpdate)
+      bot.removeListener('move', onMove)
+    }
+  }
+}
+
+/**
+ * ロード済みの全エンティティの情報を1回の呼び出しでまとめて返します。
+ * 戻り値はJSON文字列で、self は [id, x, y, z]、entities の各要素は
+ * [id, name, type, x, y, z, ドロップアイテム名（アイテムエンティティ以外はnull）, vx, vy, vz, health] です。
+ */
+function entitySnapshot (bot) {
+  const entities = []
+  for (const entity of Object.values(bot.entities)) {
+    if (!entity || !entity.position) continue
+    entities.push(entityRow(bot, entity))
+  }
+  const me = bot.entity
+  return JSON.stringify({
+    self: me ? [me.id, me.position.x, me.position.y, me.position.z] : null,
+    entities
+  })
+}
+
+function entityRow (bot, entity) {
+  let item = null
+  if (entity.name === 'item') {
+    const itemId = entity.metadata?.[8]?.itemId
+    const info = itemId !== undefined ? bot.registry.items[itemId] : null
+    item = info ? info.name : null
+  }
+  const velocity = entity.velocity ?? { x: 0, y: 0, z: 0 }
+  return [
+    entity.id, entity.name ?? null, entity.type ?? null,
+    entity.position.x, entity.position.y, entity.position.z, item,
+    velocity.x, velocity.y, velocity.z, entity.health ?? null
+  ]
+}
+
+/**
+ * エンティティの変化をPython側のテーブルへ送ります。
+ * 同じティック内の変化をまとめ、'batch' イベントとして次の形のJSON文字列で送ります。
+ *   rows: 出現・メタデータ更新したエンティティの行（entitySnapshot と同じ形式）
+ *   moved: 移動したエンティティの [id, x, y, z, vx, vy, vz, ...]
+ *   dead / gone: 死亡・消滅したエンティティのID
+ *   self: BOT自身が移動した場合の [x, y, z]
+ * 戻り値の detach() で購読を解除できます。
+ */
+function attachEntityFeed (bot, onEvent) {
+  let rows = new Map()
+  let moved = new Map()
+  let dead = []
+  let gone = []
+  let selfMoved = false
+  let scheduled = false
+
+  const flush = () => {
+    scheduled = false
+    const movedRows = []
+    for (const entity of moved.values()) {
+      const velocity = entity.velocity ?? { x: 0, y: 0, z: 0 }
+      movedRows.push(entity.id, entity.position.x, entity.position.y, entity.position.z, velocity.x, velocity.y, velocity.z)
+    }
+    const me = bot.entity
+    const batch = {
+      rows: Array.from(rows.values(), (entity) => entityRow(bot, entity)),
+      moved: movedRows,
+      dead,
+      gone,
+      self: selfMoved && me ? [me.position.x, me.position.y, me.position.z] : null
+    }
+    rows = new Map()
+    moved = new Map()
+    dead = []
+    gone = []
+    selfMoved = false
+    onEvent('batch', JSON.stringify(batch))
+  }
+  const schedule = () => {
+    if (!scheduled) {
+      scheduled = true
+      setImmediate(flush)
+    }
+  }
+
+  const onRow = (entity) => {
+    if (!entity || !entity.position || entity === bot.entity) return
+    rows.set(entity.id, entity)
+    schedule()
+  }
+  const onMoved = (entity) => {
+    if (!entity || !entity.position || entity === bot.entity) return
+    moved.set(entity.id, entity)
+    schedule()
+  }
+  const onDead = (entity) => {
+    dead.push(entity.id)
+    schedule()
+  }
+  const onGone = (entity) => {
+    rows.delete(entity.id)
+    moved.delete(entity.id)
+    gone.push(entity.id)
+    schedule()
+  }
+  const onSelfMove = () => {
+    selfMoved = true
+    schedule()
+  }
+
+  bot.on('entitySpawn', onRow)
+  bot.on('entityUpdate', onRow)
+  bot.on('entityMoved', onMoved)
+  bot.on('entityDead', onDead)
+  bot.on('entityGone', onGone)
+  bot.on('move', onSelfMove)
+
+  return {
+    detach () {
+      bot.removeListener('entitySpawn', onRow)
+      bot.removeListener('entityUpdate', onRow)
+      bot.removeListener('entityMoved', onMoved)
+      bot.removeListener('entityDead', onDead)
+      bot.removeListener('entityGone', onGone)
+      bot.removeListener('move', onSelfMove)
+    }
+  }
+}
+
+/**
+ * インベントリの全スロットを1回の呼び出しでまとめて返します。
+ * 戻り値はJSON文字列で、start / end は bot.inventory.items() の対象範囲、slots は [slot, name, count] の配列です。
+ */
+function inventorySnapshot (bot) {
+  const slots = []
+  bot.inventory.slots.forEach((item, slot) => {
+    if (item) slots.push([slot, item.name, item.count])
+  })
+  return JSON.stringify({
+    start: bot.inventory.inventoryStart,
+    end: bot.inventory.inventoryEnd,
+    slots
+  })
+}
+
+/**
+ * インベントリのスロット更新（updateSlot）をPython側へ送ります。
+ * アイテムの拾得やウィンドウ操作による変更もすべて updateSlot として届きます。
+ * 同じティック内の更新をまとめて 'slots' イベントで [[slot, name, count], ...] の形で送ります（空のスロットは name が null）。
+ * 戻り値の detach() で購読を解除できます。
+ */
+function attachInventoryFeed (bot, onEvent) {
+  let pending = new Map()
+  const flush = () => {
+    const rows = Array.from(pending.entries(), ([slot, item]) => [slot, item ? item.name : null, item ? item.count : 0])
+    pending = new Map()
+    onEvent('slots', JSON.stringify(rows))
+  }
+  const onUpdate = (slot, oldItem, newItem) => {
+    if (pending.size === 0) setImmediate(flush)
+    pending.set(slot, newItem)
+  }
+  bot.inventory.on('updateSlot', onUpdate)
+  return {
+    detach () {
+      bot.inventory.removeListener('updateSlot', onUpdate)
+    }
+  }
+}
+
+/**
+ * 開いているかまどのウィンドウの更新を Python 側へ送ります。
+ * 'update' は毎ティックの進捗でも発生するため、材料・完成品・燃料の個数が変わったときだけ
+ * onEvent('update', 材料の個数, 完成品の個数, 燃料の個数) を呼びます。
+ * 戻り値の detach() で購読を解除できます。
+ */
+function watchFurnace (furnace, onEvent) {
+  const count = item => item ? item.count : 0
+  let last = null
+  const onUpdate = () => {
+    const current = [count(furnace.inputItem()), count(furnace.outputItem()), count(furnace.fuelItem())]
+    if (last && current.every((value, i) => value === last[i])) return
+    last = current
+    onEvent('update', ...current)
+  }
+  furnace.on('update', onUpdate)
+  onUpdate()
+  return {
+    detach () {
+      furnace.removeListener('update', onUpdate)
+    }
+  }
+}
+
+module.exports = {
+  inventorySnapshot,
+  attachInventoryFeed,
+  entitySnapshot,
+  attachEntityFeed,
+  watchGoal,
+  scanCuboid,
+  findBlockPositions,
+  blockStates,
+  registryTables,
+  recipeTable,
+  watchFurnace,
+  dumpColumn,
+  attachWorldFeed
+}
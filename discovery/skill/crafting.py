@@ -0,0 +1,187 @@
+import json
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+# 作成されるアイテム名・1回のクラフトで作成される数・材料 ((名前, 個数), ...)・作業台が必要か
+Recipe = namedtuple('Recipe', ['result', 'count', 'ingredients', 'needs_table'])
+
+# クラフト手順の1段階。item を times 回クラフトして count 個作成します
+CraftStep = namedtuple('CraftStep', ['item', 'times', 'count', 'needs_table', 'recipe'])
+
+
+class CraftPlan:
+    """
+    plan_craft の結果です。
+
+    Attributes:
+        item (str): 作成するアイテム名
+        count (int): 作成する数
+        steps (list): 実行順に並べた CraftStep のリスト
+        raw_materials (dict): クラフトできない素材（原木など）の合計使用数
+        missing (dict): インベントリに足りない素材とその不足数
+    """
+
+    def __init__(self, item, count, steps, raw_materials, missing):
+        self.item = item
+        self.count = count
+        self.steps = steps
+        self.raw_materials = raw_materials
+        self.missing = missing
+
+    @property
+    def feasible(self):
+        """現在のインベントリだけで全ての手順を実行できるかを返します。"""
+        return not self.missing
+
+    @property
+    def needs_table(self):
+        return any(step.needs_table for step in self.steps)
+
+    def to_dict(self):
+        return {
+            "item": self.item,
+            "count": self.count,
+            "steps": [
+                {"item": step.item, "times": step.times, "count": step.count, "crafting_table": step.needs_table}
+                for step in self.steps
+            ],
+            "raw_materials": dict(self.raw_materials),
+            "missing": dict(self.missing),
+        }
+
+
+class RecipeIndex:
+    """
+    全てのクラフトレシピを、作成されるアイテム名で引ける辞書として保持します。
+    bridge.js の recipeTable で接続時に1回だけ取得し、以降はブリッジを介さずにレシピを参照・計画できます。
+    """
+
+    def __init__(self, rows):
+        recipes = {}
+        for result, count, ingredients, needs_table in rows:
+            recipe = Recipe(result, count, tuple((name, n) for name, n in ingredients), bool(needs_table))
+            recipes.setdefault(result, []).append(recipe)
+        self.recipes = {name: tuple(found) for name, found in recipes.items()}
+        self._plan_cached = lru_cache(maxsize=256)(self._plan)
+
+    @classmethod
+    def from_json(cls, raw):
+        """bridge.js の recipeTable の戻り値から RecipeIndex を作成します。"""
+        return cls(json.loads(raw))
+
+    def __contains__(self, item):
+        return item in self.recipes
+
+    def get(self, item):
+        """item を作成するレシピのタプルを返します。レシピがない場合は空のタプルです。"""
+        return self.recipes.get(item, ())
+
+    def plan_craft(self, item, count=1, inventory=None, has_table=False):
+        """
+        item を count 個作成するために必要なクラフト手順を、材料のレシピまで遡って求めます。
+        インベントリにある中間素材（板材や棒など）は優先して使い、足りない分だけをクラフトします。
+        レシピが複数ある場合は、不足する素材が最も少なくなるものを選びます。
+        同じ引数での結果はキャッシュされます。
+
+        Args:
+            item (str): 作成するアイテム名
+            count (int): 作成する数
+            inventory (dict, optional): アイテム名をキー、個数を値とした現在のインベントリ
+            has_table (bool): 作業台を使える状態か（近くにある、またはインベントリにある）
+
+        Returns:
+            CraftPlan: クラフト手順。item のレシピがない場合はNone
+        """
+        if item not in self.recipes:
+            return None
+        inventory_key = frozenset((name, n) for name, n in (inventory or {}).items() if n > 0)
+        return self._plan_cached(item, count, inventory_key, has_table)
+
+    def _plan(self, item, count, inventory_key, has_table):
+        state = _PlanState(dict(inventory_key), has_table)
+        # 目的のアイテムは手持ちがあってもクラフトする
+        self._craft(item, count, state, (item,))
+        return CraftPlan(item, count, _merge_steps(state.steps), state.raw, state.missing)
+
+    def _need(self, item, quantity, state, stack):
+        """item を quantity 個確保します。手持ちを使い、足りない分はクラフトするか不足として記録します。"""
+        used = min(state.available.get(item, 0), quantity)
+        if used:
+            state.available[item] -= used
+            quantity -= used
+            if item not in self.recipes:
+                state.raw[item] = state.raw.get(item, 0) + used
+        if quantity == 0:
+            return
+        if item not in self.recipes or item in stack:
+            state.raw[item] = state.raw.get(item, 0) + quantity
+            state.missing[item] = state.missing.get(item, 0) + quantity
+            return
+        self._craft(item, quantity, state, stack + (item,))
+
+    def _craft(self, item, quantity, state, stack):
+        best = None
+        for recipe in self.recipes[item]:
+            trial = state.copy()
+            times = math.ceil(quantity / recipe.count)
+            if recipe.needs_table and not trial.has_table:
+                # 作業台は設置して使い、後で回収するので消費しない
+                self._need('crafting_table', 1, trial, stack)
+                trial.available['crafting_table'] = trial.available.get('crafting_table', 0) + 1
+                trial.has_table = True
+            for name, n in recipe.ingredients:
+                self._need(name, n * times, trial, stack)
+            trial.steps.append(CraftStep(item, times, times * recipe.count, recipe.needs_table, recipe))
+            trial.available[item] = trial.available.get(item, 0) + times * recipe.count - quantity
+            score = (sum(trial.missing.values()), len(trial.steps))
+            if best is None or score < best[0]:
+                best = (score, trial)
+                if score[0] == 0:
+                    # 不足なく作れるレシピが見つかれば、それ以降の候補は調べない
+                    break
+        state.update(best[1])
+
+
+def _merge_steps(steps):
+    """
+    同じレシピの手順を、前にある手順にまとめます。
+    間の手順がそのレシピの材料を作っている場合は、順序が変わると材料が足りなくなるのでまとめません。
+    """
+    merged = []
+    for step in steps:
+        for i in range(len(merged) - 1, -1, -1):
+            earlier = merged[i]
+            if earlier.recipe == step.recipe:
+                merged[i] = earlier._replace(times=earlier.times + step.times, count=earlier.count + step.count)
+                break
+            ingredients = {name for name, _ in step.recipe.ingredients}
+            if earlier.item in ingredients:
+                merged.append(step)
+                break
+        else:
+            merged.append(step)
+    return merged
+
+
+class _PlanState:
+    """plan_craft の探索中の状態。レシピの候補ごとに複製して比較します。"""
+
+    __slots__ = ("available", "has_table", "steps", "raw", "missing")
+
+    def __init__(self, available, has_table, steps=None, raw=None, missing=None):
+        self.available = available
+        self.has_table = has_table
+        self.steps = steps if steps is not None else []
+        self.raw = raw if raw is not None else {}
+        self.missing = missing if missing is not None else {}
+
+    def copy(self):
+        return _PlanState(dict(self.available), self.has_table, list(self.steps), dict(self.raw), dict(self.missing))
+
+    def update(self, other):
+        self.available = other.available
+        self.has_table = other.has_table
+        self.steps = other.steps
+        self.raw = other.raw
+        self.missing = other.missing
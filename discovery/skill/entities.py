@@ -0,0 +1,238 @@
+import json
+import math
+import threading
+from collections import defaultdict, namedtuple
+
+# 敵対的なモブの名前
+HOSTILE_MOBS = frozenset([
+    'zombie', 'skeleton', 'creeper', 'spider', 'enderman',
+    'witch', 'slime', 'silverfish', 'cave_spider', 'ghast',
+    'zombie_pigman', 'blaze', 'magma_cube', 'wither_skeleton',
+    'guardian', 'elder_guardian', 'shulker', 'husk', 'stray',
+    'phantom', 'drowned', 'pillager', 'ravager', 'vex',
+    'evoker', 'vindicator', 'hoglin', 'zoglin', 'piglin_brute'
+])
+
+Point = namedtuple('Point', ['x', 'y', 'z'])
+
+
+class EntityRecord:
+    """
+    Python側で保持するエンティティの情報です。
+    攻撃や追跡などでJavaScriptのエンティティが必要な場合は、id から bot.entities を引いてください。
+    """
+
+    __slots__ = ("id", "name", "type", "x", "y", "z", "item", "vx", "vy", "vz", "health")
+
+    def __init__(self, id, name, type, x, y, z, item=None, vx=0.0, vy=0.0, vz=0.0, health=None):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.x = x
+        self.y = y
+        self.z = z
+        self.item = item
+        self.vx = vx
+        self.vy = vy
+        self.vz = vz
+        self.health = health
+
+    @property
+    def position(self):
+        return Point(self.x, self.y, self.z)
+
+    @property
+    def velocity(self):
+        return Point(self.vx, self.vy, self.vz)
+
+    @property
+    def is_hostile(self):
+        return self.name in HOSTILE_MOBS
+
+    def distance_to(self, x, y, z):
+        return math.sqrt((self.x - x) ** 2 + (self.y - y) ** 2 + (self.z - z) ** 2)
+
+    def __repr__(self):
+        return f"EntityRecord(id={self.id}, name={self.name!r}, position=({self.x:.1f}, {self.y:.1f}, {self.z:.1f}))"
+
+
+class EntityTable:
+    """
+    エンティティを一様グリッドで索引付けして保持します。
+    半径・種類・敵対かどうかによる検索を、グリッドの近傍セルだけを調べて行います。
+    attach() すると bridge.js の attachEntityFeed から届くイベントで常に最新の状態に保たれます。
+    イベントはブリッジのスレッドから届くので、更新と参照はロックで保護しています。
+    """
+
+    def __init__(self, cell_size=8):
+        self.cell_size = cell_size
+        self.self_id = None
+        self.self_position = None
+        self.records = {}
+        self._grid = defaultdict(set)
+        self._cells = {}
+        self._lock = threading.Lock()
+        self._handle = None
+        self._callback = None
+
+    @property
+    def attached(self):
+        return self._handle is not None
+
+    def _cell(self, x, y, z):
+        size = self.cell_size
+        return (math.floor(x / size), math.floor(y / size), math.floor(z / size))
+
+    # --- 更新 ---
+
+    def attach(self, bot, bridge):
+        """
+        bot のエンティティイベントの購読を開始します。現在のエンティティもこの時点で取り込まれます。
+
+        Args:
+            bot: Mineflayer の bot
+            bridge: require した bridge.js
+        """
+        self.detach()
+
+        def on_event(kind, *args):
+            try:
+                if kind == "batch":
+                    self.apply_batch(json.loads(args[0]))
+            except Exception as e:
+                print(f"エンティティテーブルの更新中にエラーが発生しました: {e}")
+
+        # コールバックへの参照を保持しておかないとGCで回収されるため、属性に保存します
+        self._callback = on_event
+        self._handle = bridge.attachEntityFeed(bot, on_event)
+        self.load_snapshot(bridge.entitySnapshot(bot))
+
+    def detach(self):
+        """エンティティイベントの購読を解除します。"""
+        if self._handle is not None:
+            try:
+                self._handle.detach()
+            except Exception as e:
+                print(f"エンティティテーブルの購読解除に失敗しました（無視します）: {e}")
+        self._handle = None
+        self._callback = None
+
+    def load_snapshot(self, raw):
+        """
+        bridge.js の entitySnapshot が返すJSON文字列でテーブルを作り直します。
+
+        Args:
+            raw (str): {"self": [id, x, y, z], "entities": [[id, name, type, x, y, z, item, vx, vy, vz, health], ...]}
+        """
+        payload = json.loads(raw)
+        with self._lock:
+            me = payload.get("self")
+            if me:
+                self.self_id = me[0]
+                self.self_position = Point(me[1], me[2], me[3])
+            self.records = {}
+            self._grid = defaultdict(set)
+            self._cells = {}
+            for row in payload["entities"]:
+                self._upsert(row)
+
+    def apply_batch(self, batch):
+        """attachEntityFeed の 'batch' イベントの内容を反映します。"""
+        with self._lock:
+            for row in batch["rows"]:
+                self._upsert(row)
+            moved = batch["moved"]
+            for i in range(0, len(moved), 7):
+                record = self.records.get(moved[i])
+                if record is None:
+                    continue
+                record.x, record.y, record.z, record.vx, record.vy, record.vz = moved[i + 1:i + 7]
+                self._reindex(record)
+            for entity_id in batch["dead"]:
+                record = self.records.get(entity_id)
+                if record is not None:
+                    record.health = 0
+            for entity_id in batch["gone"]:
+                self._remove(entity_id)
+            if batch["self"]:
+                self.self_position = Point(*batch["self"])
+
+    def _upsert(self, row):
+        if row[0] == self.self_id:
+            self.self_position = Point(row[3], row[4], row[5])
+        record = EntityRecord(*row)
+        self.records[record.id] = record
+        self._reindex(record)
+
+    def _reindex(self, record):
+        cell = self._cell(record.x, record.y, record.z)
+        previous = self._cells.get(record.id)
+        if previous == cell:
+            return
+        if previous is not None:
+            self._discard_from_cell(previous, record.id)
+        self._grid[cell].add(record.id)
+        self._cells[record.id] = cell
+
+    def _discard_from_cell(self, cell, entity_id):
+        ids = self._grid.get(cell)
+        if ids is not None:
+            ids.discard(entity_id)
+            if not ids:
+                del self._grid[cell]
+
+    def _remove(self, entity_id):
+        self.records.pop(entity_id, None)
+        cell = self._cells.pop(entity_id, None)
+        if cell is not None:
+            self._discard_from_cell(cell, entity_id)
+
+    # --- 参照 ---
+
+    def get(self, entity_id):
+        return self.records.get(entity_id)
+
+    def query(self, center, radius, names=None, hostile=None):
+        """
+        center から radius 以内のエンティティを近い順に返します。自分自身は含みません。
+
+        Args:
+            center (tuple): 検索の中心座標 (x, y, z)
+            radius (float): 検索する最大距離
+            names (set, optional): 対象とするエンティティ名
+            hostile (bool, optional): Trueなら敵対的なもののみ、Falseなら敵対的でないもののみ
+
+        Returns:
+            list: (距離, EntityRecord) のリスト
+        """
+        cx, cy, cz = center
+        x0, y0, z0 = self._cell(cx - radius, cy - radius, cz - radius)
+        x1, y1, z1 = self._cell(cx + radius, cy + radius, cz + radius)
+        found = []
+        with self._lock:
+            # 範囲がグリッド全体より広い場合は全件を調べる
+            if (x1 - x0 + 1) * (y1 - y0 + 1) * (z1 - z0 + 1) > len(self._grid):
+                candidates = list(self.records.keys())
+            else:
+                candidates = [
+                    entity_id
+                    for gx in range(x0, x1 + 1)
+                    for gy in range(y0, y1 + 1)
+                    for gz in range(z0, z1 + 1)
+                    for entity_id in self._grid.get((gx, gy, gz), ())
+                ]
+            for entity_id in candidates:
+                if entity_id == self.self_id:
+                    continue
+                record = self.records[entity_id]
+                if record.health == 0:  # 死亡済み（消滅待ち）
+                    continue
+                if names is not None and record.name not in names:
+                    continue
+                if hostile is not None and record.is_hostile != hostile:
+                    continue
+                distance = record.distance_to(cx, cy, cz)
+                if distance <= radius:
+                    found.append((distance, record))
+        found.sort(key=lambda f: f[0])
+        return found
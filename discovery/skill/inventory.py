@@ -0,0 +1,145 @@
+import json
+import threading
+
+
+class InventoryMirror:
+    """
+    BOTのインベントリをPython側に写したものです。
+    bridge.js の attachInventoryFeed から届くスロット更新で同期し、アイテム名ごとの個数を保持するため、
+    count / has / as_dict はブリッジを介さずに参照できます。
+    対象は bot.inventory.items() と同じ範囲（inventoryStart から inventoryEnd の手前まで）のスロットです。
+    """
+
+    def __init__(self):
+        self.start = 9
+        self.end = 45
+        self._slots = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._handle = None
+        self._callback = None
+
+    @property
+    def attached(self):
+        return self._handle is not None
+
+    # --- 更新 ---
+
+    def attach(self, bot, bridge):
+        """
+        bot のインベントリのスロット更新の購読を開始します。現在の内容もこの時点で取り込まれます。
+
+        Args:
+            bot: Mineflayer の bot
+            bridge: require した bridge.js
+        """
+        self.detach()
+
+        def on_event(kind, *args):
+            try:
+                if kind == "slots":
+                    self.apply_slots(json.loads(args[0]))
+            except Exception as e:
+                print(f"インベントリの同期中にエラーが発生しました: {e}")
+
+        # コールバックへの参照を保持しておかないとGCで回収されるため、属性に保存します
+        self._callback = on_event
+        self._handle = bridge.attachInventoryFeed(bot, on_event)
+        self.load_snapshot(bridge.inventorySnapshot(bot))
+
+    def detach(self):
+        """スロット更新の購読を解除します。"""
+        if self._handle is not None:
+            try:
+                self._handle.detach()
+            except Exception as e:
+                print(f"インベントリの購読解除に失敗しました（無視します）: {e}")
+        self._handle = None
+        self._callback = None
+
+    def load_snapshot(self, raw):
+        """
+        bridge.js の inventorySnapshot が返すJSON文字列で内容を作り直します。
+
+        Args:
+            raw (str): {"start": inventoryStart, "end": inventoryEnd, "slots": [[slot, name, count], ...]}
+        """
+        payload = json.loads(raw)
+        with self._lock:
+            self.start = payload["start"]
+            self.end = payload["end"]
+            self._slots = {}
+            self._counts = {}
+            for slot, name, count in payload["slots"]:
+                self._set(slot, name, count)
+
+    def apply_slots(self, rows):
+        """[[slot, name, count], ...] 形式のスロット更新を反映します。空になったスロットは name が None です。"""
+        with self._lock:
+            for slot, name, count in rows:
+                self._set(slot, name, count)
+
+    def _set(self, slot, name, count):
+        previous = self._slots.pop(slot, None)
+        if previous is not None and self.start <= slot < self.end:
+            self._add(previous[0], -previous[1])
+        if name is None or count <= 0:
+            return
+        self._slots[slot] = (name, count)
+        if self.start <= slot < self.end:
+            self._add(name, count)
+
+    def _add(self, name, count):
+        total = self._counts.get(name, 0) + count
+        if total > 0:
+            self._counts[name] = total
+        else:
+            self._counts.pop(name, None)
+
+    # --- 参照 ---
+
+    def count(self, name):
+        """アイテムの合計個数を返します。"""
+        return self._counts.get(name, 0)
+
+    def has(self, name, n=1):
+        """アイテムを n 個以上持っているかを返します。"""
+        return self._counts.get(name, 0) >= n
+
+    def as_dict(self):
+        """アイテム名をキー、合計個数を値とした辞書を返します。"""
+        with self._lock:
+            return dict(self._counts)
+
+    def find_slot(self, match):
+        """
+        条件に合うアイテムが入っている最初のスロット番号を返します。
+
+        Args:
+            match (str or callable): アイテム名、またはアイテム名を受け取って真偽値を返す関数
+
+        Returns:
+            int or None: スロット番号。見つからない場合はNone
+        """
+        if isinstance(match, str):
+            name = match
+            match = lambda item_name: item_name == name
+        with self._lock:
+            for slot in sorted(self._slots):
+                if self.start <= slot < self.end and match(self._slots[slot][0]):
+                    return slot
+        return None
+
+    def diff(self, counts):
+        """
+        別に取得した個数の辞書と比較し、食い違っているアイテムを返します。デバッグ用です。
+
+        Returns:
+            dict: アイテム名をキー、(ミラーの個数, 比較対象の個数) を値とした辞書
+        """
+        mirrored = self.as_dict()
+        return {
+            name: (mirrored.get(name, 0), counts.get(name, 0))
+            for name in set(mirrored) | set(counts)
+            if mirrored.get(name, 0) != counts.get(name, 0)
+        }
@@ -0,0 +1,119 @@
+import json
+import os
+from types import MappingProxyType
+
+from .world import BlockStateTable
+
+# 保存形式を変えた場合はこの値を上げ、古いキャッシュを読み込まないようにします
+CACHE_FORMAT = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'cache')
+
+
+def cache_dir():
+    """レジストリ表などの保存先ディレクトリを返します。環境変数 DISCOVERY_CACHE_DIR で変更できます。"""
+    return os.environ.get('DISCOVERY_CACHE_DIR', DEFAULT_CACHE_DIR)
+
+
+class RegistryTables:
+    """
+    Minecraftのバージョンごとに固定のレジストリ（ブロック・アイテム・バイオーム・食べ物・硬さ・適正ツール）を
+    Python側の辞書と配列として保持します。作成後は変更しません。
+    bridge.js の registryTables で1回だけ取得し、ディスクに保存して次回以降の起動では読み込むだけで済ませます。
+    """
+
+    def __init__(self, payload):
+        self.version = payload["version"]
+        self.blocks = BlockStateTable(payload["blocks"])
+
+        hardness = {}
+        harvest_tools = {}
+        for row, value, tools in zip(payload["blocks"], payload["hardness"], payload["harvestTools"]):
+            hardness[row[1]] = value
+            if tools is not None:
+                harvest_tools[row[1]] = frozenset(tools)
+        self.hardness = MappingProxyType(hardness)
+        self.harvest_tools = MappingProxyType(harvest_tools)
+
+        max_item = max(row[0] for row in payload["items"])
+        item_names = [None] * (max_item + 1)
+        item_ids = {}
+        stack_sizes = {}
+        for item_id, name, stack_size in payload["items"]:
+            item_names[item_id] = name
+            item_ids[name] = item_id
+            stack_sizes[name] = stack_size
+        self.item_names = tuple(item_names)
+        self.item_ids = MappingProxyType(item_ids)
+        self.stack_sizes = MappingProxyType(stack_sizes)
+
+        self.biome_names = MappingProxyType({biome_id: name for biome_id, name in payload["biomes"]})
+        self.foods = MappingProxyType({
+            name: (food_points, saturation) for name, food_points, saturation in payload["foods"]
+        })
+
+    @classmethod
+    def load(cls, bot, bridge, directory=None):
+        """
+        bot のバージョンのレジストリ表を返します。保存済みであればディスクから読み込み、
+        なければブリッジ経由で取得して保存します。
+
+        Args:
+            bot: Mineflayer の bot
+            bridge: require した bridge.js
+            directory (str, optional): 保存先ディレクトリ（デフォルト: cache_dir()）
+
+        Returns:
+            RegistryTables: レジストリ表
+        """
+        directory = directory or cache_dir()
+        path = os.path.join(directory, f"registry-{bot.version}-v{CACHE_FORMAT}.json")
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    return cls(json.load(f))
+            except Exception as e:
+                print(f"レジストリ表のキャッシュを読み込めませんでした。作り直します: {e}")
+
+        raw = bridge.registryTables(bot)
+        tables = cls(json.loads(raw))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(raw)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"レジストリ表をキャッシュに保存できませんでした（無視します）: {e}")
+        return tables
+
+    # --- 参照 ---
+
+    def item_id(self, name):
+        """アイテム名からアイテムIDを返します。見つからない場合はNoneを返します。"""
+        return self.item_ids.get(name)
+
+    def item_name(self, item_id):
+        """アイテムIDからアイテム名を返します。見つからない場合はNoneを返します。"""
+        if item_id is None or not 0 <= item_id < len(self.item_names):
+            return None
+        return self.item_names[item_id]
+
+    def block_id(self, name):
+        """ブロック名からブロックIDを返します。見つからない場合はNoneを返します。"""
+        return self.blocks.block_id_by_name.get(name)
+
+    def biome_name(self, biome_id):
+        """バイオームIDからバイオーム名を返します。見つからない場合はNoneを返します。"""
+        return self.biome_names.get(biome_id)
+
+    def is_food(self, name):
+        return name in self.foods
+
+    def can_harvest(self, block_name, item_id):
+        """
+        item_id のアイテム（素手なら None）で block_name のブロックを回収できるかを返します。
+        Mineflayer の Block.canHarvest と同じく、適正ツールの指定がないブロックは何でも回収できます。
+        """
+        tools = self.harvest_tools.get(block_name)
+        return tools is None or (item_id is not None and item_id in tools)
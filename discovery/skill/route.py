@@ -0,0 +1,126 @@
+from collections import OrderedDict
+import numpy as np
+
+
+def _distance_matrix(points):
+    """座標の配列から全点間のユークリッド距離の行列を返します。"""
+    diff = points[:, None, :] - points[None, :, :]
+    return np.sqrt((diff ** 2).sum(axis=2))
+
+
+def route_length(start, points):
+    """
+    start から points を順に巡る経路の長さを返します。
+
+    Args:
+        start (tuple): 出発地点 (x, y, z)
+        points (list): 巡回する座標 (x, y, z) のリスト
+
+    Returns:
+        float: 経路の長さ
+    """
+    if not points:
+        return 0.0
+    path = np.array([start] + list(points), dtype=float)
+    return float(np.sqrt(((path[1:] - path[:-1]) ** 2).sum(axis=1)).sum())
+
+
+def plan_route(start, points, max_passes=10):
+    """
+    start から全ての points を1回ずつ巡る短い経路を求めます（始点固定・終点自由）。
+    最近傍法で初期経路を作り、2-opt で交差を解消して改善します。
+
+    Args:
+        start (tuple): 出発地点 (x, y, z)
+        points (list): 巡回する座標 (x, y, z) のリスト
+        max_passes (int): 2-opt の改善を繰り返す最大回数
+
+    Returns:
+        list: 巡回順に並べ替えた points
+    """
+    points = [tuple(p) for p in points]
+    n = len(points)
+    if n <= 1:
+        return points
+
+    # 0番目を出発地点とした距離行列
+    coords = np.array([start] + points, dtype=float)
+    dist = _distance_matrix(coords)
+
+    # 最近傍法
+    order = [0]
+    visited = np.zeros(n + 1, dtype=bool)
+    visited[0] = True
+    for _ in range(n):
+        row = np.where(visited, np.inf, dist[order[-1]])
+        nearest = int(np.argmin(row))
+        visited[nearest] = True
+        order.append(nearest)
+
+    # 2-opt: order[i..k] を反転して短くなる限り繰り返す（order[0] は出発地点なので固定）
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n):
+            prev = order[i - 1]
+            for k in range(i + 1, n + 1):
+                before = dist[prev, order[i]]
+                after = dist[prev, order[k]]
+                if k < n:
+                    before += dist[order[k], order[k + 1]]
+                    after += dist[order[i], order[k + 1]]
+                if after < before - 1e-9:
+                    order[i:k + 1] = order[i:k + 1][::-1]
+                    improved = True
+        if not improved:
+            break
+
+    return [points[j - 1] for j in order[1:]]
+
+
+class PathStatusCache:
+    """
+    直近に経路計算が成功した条件を保持するLRUキャッシュです。
+    キーは (Movementsの設定, 目標座標, 許容距離) と出発チャンクです。
+    noPath でも pathfinder は途中までの経路をたどれるため、success 以外（noPath / timeout）は保存しません。
+    結果はワールドキャッシュのチャンク列の更新回数と一緒に保存し、地形が変わった場合は破棄します。
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key, start, revision):
+        """
+        保存されている結果を返します。
+
+        Args:
+            key (tuple): キャッシュのキー（Movementsの設定, 目標座標, 許容距離 など）
+            start (tuple): 出発地点のブロック座標 (x, y, z)
+            revision (tuple): 出発地点と目標地点のチャンク列の更新回数
+
+        Returns:
+            str or None: "success"。未保存、または地形が変わっている場合はNone
+        """
+        entry_key = (key, tuple(v >> 4 for v in start))
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return None
+        status, saved_revision = entry
+        if saved_revision != revision:
+            del self._entries[entry_key]
+            return None
+        self._entries.move_to_end(entry_key)
+        return status
+
+    def put(self, key, start, revision, status):
+        """経路計算の結果が success の場合だけ保存します。古いものから maxsize を超えた分を削除します。"""
+        if status != "success":
+            return
+        entry_key = (key, tuple(v >> 4 for v in start))
+        self._entries[entry_key] = (status, revision)
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
@@ -1,7 +1,23 @@
 from javascript import require, On, Once, AsyncTask, once, off
 import asyncio
+import json
 import math
-from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+from .world import BlockVolume, BlockStateTable, WorldCache
+from .route import plan_route, PathStatusCache
+from .entities import EntityTable, EntityRecord, HOSTILE_MOBS
+from .inventory import InventoryMirror
+from .registry import RegistryTables
+from .crafting import RecipeIndex
+from .workstations import WorkstationRegistry, WORKSTATION_KINDS, WORKSTATION_POLICY
+from .smelting import SmeltingJob, FurnaceAssignment, FUEL_BURN, SMELT_TICKS, TICKS_PER_SECOND, fuel_needed
+
+# 一括処理用のNode側ヘルパー
+BRIDGE_JS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bridge.js')
+
+# 1にすると、get_inventory_counts のたびにインベントリのミラーを実際の内容と照合します（デバッグ用）
+INVENTORY_CHECK = os.environ.get('DISCOVERY_INVENTORY_CHECK', '0') == '1'
 
 class Skills:
     def __init__(self, discovery):
@@ -17,6 +33,171 @@ class Skills:
         self.pathfinder = discovery.pathfinder
         self.movements = discovery.movements
         self.mineflayer = discovery.mineflayer
+        self.bridge = require(BRIDGE_JS_PATH)
+        self.registry = None
+        self._load_registry()
+        self.recipes = None
+        self._load_recipes()
+        self.block_states = None
+        self.world_cache = None
+        self._attach_world_cache()
+        # 設定ごとのMovementsと、直近の経路計算の結果
+        self._movements_cache = {}
+        self.path_status_cache = PathStatusCache()
+        # エンティティの索引（エンティティのイベントで常に最新に保つ）
+        self.entity_table = EntityTable()
+        self._entities_refreshed_at = None
+        self._attach_entity_table()
+        # インベントリのミラー（スロット更新のイベントで常に最新に保つ）
+        self.inventory = InventoryMirror()
+        self._attach_inventory()
+        # 設置した・見つけた作業台、かまど、チェストの位置
+        self.workstations = WorkstationRegistry.load()
+
+    def _load_registry(self):
+        """
+        現在のバージョンのレジストリ表を読み込みます（保存済みでなければブリッジ経由で作成して保存します）。
+        失敗した場合は registry を None にし、各スキルは mcdata を直接参照します。
+        """
+        try:
+            self.registry = RegistryTables.load(self.bot, self.bridge)
+        except Exception as e:
+            self.registry = None
+            print(f"レジストリ表の読み込みに失敗しました。mcdataを直接参照します: {e}")
+
+    def _load_recipes(self):
+        """
+        全てのクラフトレシピを取得してレシピ索引を作成します。
+        失敗した場合は recipes を None にし、レシピは mcdata を直接参照します。
+        """
+        try:
+            self.recipes = RecipeIndex.from_json(self.bridge.recipeTable(self.bot))
+        except Exception as e:
+            self.recipes = None
+            print(f"レシピ索引の作成に失敗しました。mcdataを直接参照します: {e}")
+
+    def _attach_world_cache(self):
+        """
+        ワールドキャッシュを作成し、チャンクとブロック更新のイベント購読を開始します。
+        失敗した場合は world_cache を None にし、各スキルはブリッジ経由の検索を使用します。
+        """
+        if self.world_cache is not None:
+            self.world_cache.detach()
+            self.world_cache = None
+        try:
+            if self.registry is not None:
+                self.block_states = self.registry.blocks
+            else:
+                self.block_states = BlockStateTable.from_json(self.bridge.blockStates(self.bot))
+            world_cache = WorldCache(self.block_states)
+            world_cache.attach(self.bot, self.bridge)
+            self.world_cache = world_cache
+        except Exception as e:
+            print(f"ワールドキャッシュの初期化に失敗しました。ブリッジ経由でブロックを検索します: {e}")
+
+    def _attach_entity_table(self):
+        """
+        エンティティの出現・移動・死亡・消滅のイベント購読を開始し、entity_table を常に最新に保ちます。
+        失敗した場合は、検索のたびに entitySnapshot でまとめて取得します。
+        """
+        try:
+            self.entity_table.attach(self.bot, self.bridge)
+        except Exception as e:
+            self.entity_table.detach()
+            print(f"エンティティテーブルのイベント購読に失敗しました。検索のたびにまとめて取得します: {e}")
+
+    def _attach_inventory(self):
+        """
+        インベントリのスロット更新の購読を開始し、inventory を常に最新に保ちます。
+        失敗した場合は、get_inventory_counts などは bot.inventory.items() を直接調べます。
+        """
+        try:
+            self.inventory.attach(self.bot, self.bridge)
+        except Exception as e:
+            self.inventory.detach()
+            print(f"インベントリのイベント購読に失敗しました。必要なたびにインベントリを調べます: {e}")
+
+    def _scan_inventory_counts(self):
+        """bot.inventory.items() を走査してアイテム名ごとの個数を数えます。"""
+        inventory_counts = {}
+        for item in self.bot.inventory.items():
+            inventory_counts[item.name] = inventory_counts.get(item.name, 0) + item.count
+        return inventory_counts
+
+    def _count_item(self, item_name):
+        """
+        インベントリ内のアイテムの合計個数を返します。
+
+        Args:
+            item_name (str): アイテム名
+
+        Returns:
+            int: 合計個数
+        """
+        if self.inventory.attached:
+            return self.inventory.count(item_name)
+        return self._scan_inventory_counts().get(item_name, 0)
+
+    def _find_inventory_item(self, match):
+        """
+        条件に合うインベントリ内の最初のアイテムを返します。
+        ミラーが使える場合はスロット番号を引いてから、そのスロットのアイテムだけをJavaScript側から取得します。
+
+        Args:
+            match (str or callable): アイテム名、またはアイテム名を受け取って真偽値を返す関数
+
+        Returns:
+            Item or None: 見つかったアイテム。見つからない場合はNone
+        """
+        if self.inventory.attached:
+            slot = self.inventory.find_slot(match)
+            if slot is not None:
+                item = self.bot.inventory.slots[slot]
+                if item:
+                    return item
+                # ミラーが遅れている場合は走査に切り替える
+        matches = (lambda name: name == match) if isinstance(match, str) else match
+        for item in self.bot.inventory.items():
+            if matches(item.name):
+                return item
+        return None
+
+    def _get_movements(self, **flags):
+        """
+        指定された設定のpathfinder.Movementsを返します。同じ設定の組み合わせでは同じオブジェクトを再利用します。
+
+        Args:
+            **flags: Movementsに設定する属性 (例: canDig=True, allow1by1towers=False)
+
+        Returns:
+            Movements: 設定済みのMovements
+        """
+        key = tuple(sorted(flags.items()))
+        movements = self._movements_cache.get(key)
+        if movements is None:
+            movements = self.pathfinder.Movements(self.bot)
+            for name, value in flags.items():
+                setattr(movements, name, value)
+            self._movements_cache[key] = movements
+        return movements
+
+    def _path_cache_entry(self, flags, start, goal, min_distance):
+        """
+        経路計算結果のキャッシュのキー、出発地点のブロック座標、出発地点・目標地点のチャンク列の更新回数を返します。
+
+        Returns:
+            tuple: (キー, 出発地点, 更新回数)。ワールドキャッシュがない場合は (None, None, None)
+        """
+        if self.world_cache is None:
+            return None, None, None
+        sx, sy, sz = (math.floor(v) for v in start)
+        gx, gy, gz = (math.floor(v) for v in goal)
+        key = (tuple(sorted(flags.items())), (gx, gy, gz), min_distance)
+        revision = (
+            self.world_cache.column_revision(sx >> 4, sz >> 4),
+            self.world_cache.column_revision(gx >> 4, gz >> 4),
+        )
+        return key, (sx, sy, sz), revision
 
     async def get_bot_position(self):
         """
@@ -98,6 +279,30 @@ class Skills:
             traceback.print_exc()
             return result
         
+    def _scan_cuboid(self, center, x_distance, y_distance, z_distance):
+        """
+        center を中心とした直方体範囲のブロックを、Node側への1回の呼び出しでまとめて取得します。
+
+        Args:
+            center (tuple): 中心のブロック座標 (x, y, z)
+            x_distance (int): X方向の探索距離
+            y_distance (int): Y方向の探索距離
+            z_distance (int): Z方向の探索距離
+
+        Returns:
+            BlockVolume: パレットとインデックス配列で表した範囲内のブロック
+        """
+        if self.world_cache is not None:
+            volume = self.world_cache.volume(center, x_distance, y_distance, z_distance)
+            if volume is not None:
+                return volume
+        raw = self.bridge.scanCuboid(
+            self.bot,
+            center[0] - x_distance, center[1] - y_distance, center[2] - z_distance,
+            2 * x_distance + 1, 2 * y_distance + 1, 2 * z_distance + 1
+        )
+        return BlockVolume.from_json(raw)
+
     async def _get_surrounding_blocks(self, position=None, x_distance=10, y_distance=10, z_distance=10):
         """
         指定位置周囲のブロックを取得します。広い範囲でブロック情報を取得する際に有効です。
@@ -112,131 +317,42 @@ class Skills:
             list: 周囲のブロック情報のリスト（各要素は{'name': ブロック名, 'position': 位置}の辞書）
 
         動作の詳細:
-            - 小範囲: 全ブロックを取得
-            - 大範囲: 3つのゾーンに分けて最適化
-              - 近距離（半径5ブロック以内）: 全ブロック取得
-              - 中距離（半径5-10ブロック）: 2ブロックごとに取得
-              - 遠距離（半径10ブロック以上）: 3ブロックごとに取得
-            - バッチ処理でブロック取得を最適化（500ブロックずつ）
-            - 並列処理でフィルタリングを高速化
+            - 範囲内の全ブロックをワールドキャッシュから取得します（未キャッシュの場合はNode側で一括取得。間引きはしません）
+            - 空気ブロックと未ロード領域は結果から除外されます
         """
-        Vec3 = require('vec3') # Vec3 を利用可能にする
-
         self.bot.chat(f"{x_distance}x{y_distance}x{z_distance}の範囲でブロックを取得します。")
         # デフォルト値の設定
         if position is None:
             position = self.bot.entity.position
 
-        # --- 型チェックと変換を追加 --- 
+        # --- 型チェックと変換 ---
         if isinstance(position, tuple) and len(position) == 3:
-            try:
-                position = Vec3(position[0], position[1], position[2])
-            except Exception as e:
-                self.bot.chat("座標の型変換エラーが発生しました。")
-                return [] # エラー時は空リストを返す
-        elif not hasattr(position, 'offset'): # offset メソッドがない場合 (Vec3 でない場合)
+            center = tuple(math.floor(v) for v in position)
+        elif hasattr(position, 'offset'): # Vec3 の場合
+            center = (math.floor(position.x), math.floor(position.y), math.floor(position.z))
+        else:
             self.bot.chat("無効な座標オブジェクトタイプです。")
             return [] # エラー時は空リストを返す
-        # --- ここまで追加 --- 
-
-        x_dist = x_distance
-        y_dist = y_distance
-        z_dist = z_distance
-        
-        # 距離に応じたサンプリングレートの設定
-        coords = []
-        total_vol = (2 * x_dist + 1) * (2 * y_dist + 1) * (2 * z_dist + 1)
-        
-        # 距離に応じたサンプリング（大きな範囲では間引きを行う）
-        if total_vol > 8000:  # 範囲が大きい場合
-            # 近距離は密に、遠距離は疎に
-            near_dist = 5  # 近距離の境界
-            
-            # 近距離ゾーン（完全取得）
-            for x in range(-min(near_dist, x_dist), min(near_dist, x_dist) + 1):
-                for y in range(-min(near_dist, y_dist), min(near_dist, y_dist) + 1):
-                    for z in range(-min(near_dist, z_dist), min(near_dist, z_dist) + 1):
-                        coords.append(position.offset(x, y, z))
-            
-            # 中間ゾーン（2ブロックごとに取得）
-            mid_dist = 10
-            if x_dist > near_dist or y_dist > near_dist or z_dist > near_dist:
-                for x in range(-min(mid_dist, x_dist), min(mid_dist, x_dist) + 1, 2):
-                    for y in range(-min(mid_dist, y_dist), min(mid_dist, y_dist) + 1, 2):
-                        for z in range(-min(mid_dist, z_dist), min(mid_dist, z_dist) + 1, 2):
-                            # 近距離ゾーンに含まれないブロックのみ追加
-                            if abs(x) > near_dist or abs(y) > near_dist or abs(z) > near_dist:
-                                coords.append(position.offset(x, y, z))
-            
-            # 遠距離ゾーン（3ブロックごとに取得）
-            if x_dist > mid_dist or y_dist > mid_dist or z_dist > mid_dist:
-                for x in range(-x_dist, x_dist + 1, 3):
-                    for y in range(-y_dist, y_dist + 1, 3):
-                        for z in range(-z_dist, z_dist + 1, 3):
-                            # 中間ゾーンに含まれないブロックのみ追加
-                            if abs(x) > mid_dist or abs(y) > mid_dist or abs(z) > mid_dist:
-                                coords.append(position.offset(x, y, z))
-            
-        else:
-            # 範囲が小さい場合は全ブロック取得
-            for x in range(-x_dist, x_dist + 1):
-                for y in range(-y_dist, y_dist + 1):
-                    for z in range(-z_dist, z_dist + 1):
-                        coords.append(position.offset(x, y, z))
 
-        # バッチサイズの決定（大量のリクエストを分割して処理）
-        batch_size = 500
-        all_blocks = []
-        
-        # バッチ処理
-        for i in range(0, len(coords), batch_size):
-            batch_end = min(i + batch_size, len(coords))
-            batch = coords[i:batch_end]
-            
-            async def _get_block_async(position):
-                return self.bot.blockAt(position)
-            
-            # バッチ内のブロック取得を並列実行
-            batch_tasks = [_get_block_async(pos) for pos in batch]
-            batch_results = await asyncio.gather(*batch_tasks)
-            all_blocks.extend(batch_results)
-        
-        try:
-            def chunks(lst, n):
-                """リストをn個のチャンクに分割"""
-                for i in range(0, len(lst), n):
-                    yield lst[i:i + n]
-            
-            def process_chunk(chunk):
-                return [{'name': block.name, 'position': {'x': block.position.x, 'y': block.position.y, 'z': block.position.z}} 
-                        for block in chunk if block and block.type != 0]
-            
-            # CPUコア数に基づいて最適なチャンクサイズを計算
-            import os
-            cpu_count = os.cpu_count() or 4
-            chunk_size = max(100, len(all_blocks) // (cpu_count * 2))
-            block_chunks = list(chunks(all_blocks, chunk_size))
-            
-            # マルチスレッドでフィルタリングを実行
-            with ThreadPoolExecutor(max_workers=cpu_count) as executor:
-                filtered_chunks = list(executor.map(process_chunk, block_chunks))
-            
-            # 結果を結合
-            surrounding_blocks = []
-            for chunk in filtered_chunks:
-                surrounding_blocks.extend(chunk)
-                
-        except ImportError:
-            # 並列処理ライブラリがインポートできない場合は標準的なリスト内包表記を使用
-            surrounding_blocks = [
-                {'name': block.name, 'position': {'x': block.position.x, 'y': block.position.y, 'z': block.position.z}}
-                for block in all_blocks
-                if block and block.type != 0
-            ]
-        
-        return surrounding_blocks
+        volume = self._scan_cuboid(center, x_distance, y_distance, z_distance)
+        return volume.to_block_list()
     
     
+    def _classify_surrounding_blocks(self, center, radius=3, y_distance=2):
+        """
+        center 周囲のブロックを前後左右と中心に分類します。get_bot_status から使用します。
+
+        Args:
+            center (tuple): 基準となるブロック座標 (x, y, z)
+            radius (int): 水平方向の範囲（デフォルト: 3）
+            y_distance (int): Y方向の範囲（デフォルト: 2）
+
+        Returns:
+            dict: front_blocks / right_blocks / back_blocks / left_blocks / center_blocks をキーとしたブロック名のリスト
+        """
+        volume = self._scan_cuboid(center, radius, y_distance, radius)
+        return volume.classify_directions(center)
+
     async def get_inventory_counts(self):
         """
         ボットのインベントリ内の各アイテムの名前と数を辞書形式で返します。
@@ -248,18 +364,16 @@ class Skills:
             >>> get_inventory_counts()
             {'birch_planks': 1, 'dirt': 1}
         """
-        print("インベントリ内のアイテムを取得します。")
-        inventory_counts = {}
-        
-        # インベントリ内の全アイテムをループ
-        for item in self.bot.inventory.items():
-            # アイテム名が既に辞書にある場合は数を加算、なければ新規追加
-            if item.name in inventory_counts:
-                inventory_counts[item.name] += item.count
-            else:
-                inventory_counts[item.name] = item.count
-        await asyncio.sleep(0.1)
-        print(inventory_counts)
+        if not self.inventory.attached:
+            return self._scan_inventory_counts()
+
+        inventory_counts = self.inventory.as_dict()
+        if INVENTORY_CHECK:
+            mismatches = self.inventory.diff(self._scan_inventory_counts())
+            if mismatches:
+                print(f"インベントリのミラーが実際の内容と一致しません（ミラー, 実際）: {mismatches}")
+                self.inventory.load_snapshot(self.bridge.inventorySnapshot(self.bot))
+                inventory_counts = self.inventory.as_dict()
         return inventory_counts
     
     async def get_nearest_block(self, block_name, max_distance=1000):
@@ -267,9 +381,9 @@ class Skills:
         BOTの周囲で指定されたブロック名のブロックを検索し、最も近いブロックの情報を返します。
         
         Args:
-            block_name (str): 探すブロック名 (例: "oak_log")
+            block_name (str or list): 探すブロック名 (例: "oak_log")。複数のブロック名のリストや、
+                                      "#log" のようなタグ（"_log" で終わる全てのブロック）も指定できます。
             max_distance (int): 探索する最大ブロック数(デフォルトは1000)
-            canMove (bool): 到達可能なブロックのみを返すか。デフォルトはTrue
         Returns:
             Block: 最も近いブロック、見つからない場合はNone
         
@@ -301,40 +415,178 @@ class Skills:
             >>> print(get_nearest_block('oak_log').position.x)
             -83
         """
+        blocks = await self.get_nearest_blocks(block_name, max_distance, count=1)
+        return blocks[0] if blocks else None
+
+    async def get_nearest_blocks(self, block_names, max_distance=64, count=5, exclude=None):
+        """
+        BOTの周囲で指定されたブロックを検索し、近い順に最大 count 個のブロックを返します。
+        複数種類のブロックを1回の検索でまとめて探せます。
+
+        Args:
+            block_names (str or list): 探すブロック名、ブロック名のリスト、または "#log" のようなタグ
+            max_distance (int): 探索する最大距離(デフォルトは64)
+            count (int): 返す最大個数(デフォルトは5)
+            exclude (list[Vec3], optional): 結果から除外するブロックの座標のリスト
+
+        Returns:
+            list: 近い順に並んだBlockのリスト。見つからない場合は空リスト
+
+        Example:
+            >>> logs = await skills.get_nearest_blocks(['oak_log', 'birch_log'], 32, count=3)
+            >>> print([block.name for block in logs])
+            ['oak_log', 'oak_log', 'birch_log']
+        """
         try:
-            # ブロックのIDを取得
-            block_id = None
-            if hasattr(self.bot.registry, 'blocksByName') and block_name in self.bot.registry.blocksByName:
-                block_id = self.bot.registry.blocksByName[block_name].id
-            else:
-                print(f"get_nearest_blockを実行しましたが、ブロック '{str(block_name)}' はminecraftのブロック名では見つかりません")
-                return None
-                
-            # ブロックを検索
-            blocks_pos = self.bot.findBlocks({
-                'point': self.bot.entity.position,
-                'matching': block_id,
-                'maxDistance': max_distance,
-                'count': 20
-            })
-            distance_min = None
-            block_min = None
-            # 本当に距離計算できてる？
-            for block_pos in blocks_pos:
-                block = self.bot.blockAt(block_pos)
-                distance = self.bot.entity.position.distanceTo(block_pos)
-                if distance_min is None or distance < distance_min:
-                    distance_min = distance
-                    block_min = block
-            if distance_min is None:
-                return None
-            return block_min
-            
+            positions = self._find_block_positions(block_names, max_distance, count, exclude)
+            if not positions:
+                return []
+            Vec3 = require('vec3')
+            blocks = []
+            for x, y, z, _ in positions:
+                block = self.bot.blockAt(Vec3(x, y, z))
+                if block:
+                    blocks.append(block)
+            return blocks
+
         except Exception as e:
             print(f"ブロック検索中にエラーが発生しました: {str(e)}")
             import traceback
             traceback.print_exc()
+            return []
+
+    def _find_block_positions(self, block_names, max_distance, count, exclude=None):
+        """
+        指定されたブロックの座標を、BOTから近い順に最大 count 個返します。
+        ワールドキャッシュがあればPython側で検索し、なければ findBlocks を1回だけ呼び出します。
+        距離の計算はPython側で行います。
+
+        Args:
+            block_names (str or list): ブロック名、ブロック名のリスト、またはタグ
+            max_distance (int): 探索する最大距離
+            count (int): 返す最大個数
+            exclude (list, optional): 除外する座標（Vec3 または (x, y, z)）のリスト
+
+        Returns:
+            list: (x, y, z, 距離) のリスト
+        """
+        if self.block_states is not None:
+            names = self.block_states.resolve(block_names)
+        elif isinstance(block_names, str) and block_names in self.bot.registry.blocksByName:
+            names = [block_names]
+        else:
+            names = [name for name in (block_names if isinstance(block_names, list) else [])
+                     if name in self.bot.registry.blocksByName]
+        if not names:
+            print(f"get_nearest_blockを実行しましたが、ブロック '{str(block_names)}' はminecraftのブロック名では見つかりません")
+            return []
+
+        excluded = set()
+        for pos in exclude or []:
+            if isinstance(pos, (tuple, list)):
+                excluded.add(tuple(int(v) for v in pos))
+            else:
+                excluded.add((int(pos.x), int(pos.y), int(pos.z)))
+        # 除外される分だけ多めに探す
+        wanted = count + len(excluded)
+
+        position = self.bot.entity.position
+        center = (position.x, position.y, position.z)
+        found = None
+        if self.world_cache is not None:
+            found = self.world_cache.find_nearest(
+                self.block_states.states(names), center, max_distance, count=wanted
+            )
+        if found is None:
+            if self.block_states is not None:
+                block_ids = self.block_states.block_ids(names)
+            else:
+                block_ids = [self.bot.registry.blocksByName[name].id for name in names]
+            flat = json.loads(self.bridge.findBlockPositions(
+                self.bot, json.dumps(block_ids), center[0], center[1], center[2], max_distance, wanted
+            ))
+            found = []
+            for i in range(0, len(flat), 3):
+                x, y, z = flat[i:i + 3]
+                found.append((x, y, z, math.dist((x, y, z), center)))
+            found.sort(key=lambda f: f[3])
+
+        found = [f for f in found if (f[0], f[1], f[2]) not in excluded][:count]
+        if len(names) == 1 and names[0] in WORKSTATION_KINDS:
+            # 見つけた作業用ブロックは次回以降のために記録しておく
+            world = self._world_key()
+            for x, y, z, _ in found:
+                self.workstations.remember(world, names[0], (x, y, z))
+        return found
+
+    def _world_key(self):
+        """作業用ブロックの記録に使う、接続先サーバーとディメンションを表す文字列を返します。"""
+        try:
+            dimension = self.bot.game.dimension
+        except Exception:
+            dimension = None
+        return f"{self.discovery.minecraft_host}:{self.discovery.minecraft_port}/{dimension}"
+
+    def _verify_workstation(self, position, kind):
+        """
+        記録されている位置に作業用ブロックが残っているかをワールドキャッシュで確認します。
+        
+        Returns:
+            bool or None: 残っていればTrue、別のブロックに変わっていればFalse、チャンクが未ロードならNone
+        """
+        if self.world_cache is None or not self.world_cache.is_loaded(position[0], position[2]):
             return None
+        return self.world_cache.name_at(*position) == kind
+
+    async def _find_workstation(self, kind, max_distance=32, known_distance=128):
+        """
+        作業用ブロック（作業台・かまど・チェスト）を探します。
+        max_distance 以内に見つからない場合は、記録されている位置のうち known_distance 以内で近いものへ移動して確認します。
+        
+        Args:
+            kind (str): ブロック名
+            max_distance (int): 周囲を検索する最大距離
+            known_distance (int): 記録されている位置を使う最大距離
+            
+        Returns:
+            Block or None: 見つかったブロック
+        """
+        block = await self.get_nearest_block(kind, max_distance)
+        if block:
+            return block
+
+        world = self._world_key()
+        position = self.bot.entity.position
+        known = self.workstations.nearest(
+            world, kind, (position.x, position.y, position.z), known_distance, verify=self._verify_workstation
+        )
+        Vec3 = require('vec3')
+        for x, y, z, distance in known[:3]:
+            print(f"記録されている{kind}（座標({x}, {y}, {z})、距離{distance:.1f}）へ移動します")
+            move_result = await self.move_to_position(x, y, z, 2)
+            if not move_result["success"]:
+                continue
+            block = self.bot.blockAt(Vec3(x, y, z))
+            if block and block.name == kind:
+                return block
+            self.workstations.forget(world, (x, y, z))
+        return None
+
+    async def _release_workstation(self, kind, position):
+        """
+        設置した作業用ブロックの使用後の処理を行います。
+        WORKSTATION_POLICY が "collect" の場合は回収し、"keep" の場合はその場に残して次回以降も使います。
+        
+        Args:
+            kind (str): ブロック名
+            position: 設置した座標（Vec3 または (x, y, z)）
+        """
+        if WORKSTATION_POLICY != 'collect':
+            return
+        await self.collect_block(kind, 1)
+        if not isinstance(position, (tuple, list)):
+            position = (position.x, position.y, position.z)
+        self.workstations.forget(self._world_key(), position)
     
     async def get_nearest_free_space(self, X_size=1, Y_size=1, Z_size=1, distance=15, y_offset=0):
         """
@@ -358,21 +610,30 @@ class Skills:
         try:
             Vec3 = require('vec3')
             result = None
-        
+
+            # ワールドキャッシュがあれば、占有グリッドの累積和で全候補を一括判定する
+            if self.world_cache is not None:
+                position = self.bot.entity.position
+                found = self.world_cache.find_free_space(
+                    (position.x, position.y, position.z), (X_size, Y_size, Z_size), distance
+                )
+                if found is not None:
+                    return Vec3(*found) if found else None
+
             # 空気ブロックを検索
             empty_pos = self.bot.findBlocks({
                 'point': self.bot.entity.position,
-                'matching': self.mcdata.blocksByName['air'].id,
+                'matching': self._get_block_id('air'),
                 'maxDistance': distance,
                 'count': 1000
             })
             
             # 各空気ブロックについて、指定されたサイズの空きスペースを確認
+            bot_pos = self.bot.entity.position.floored()
             for pos in empty_pos:
                 empty = True
 
                 # ボットの位置と同じ場合はスキップ
-                bot_pos = self.bot.blockAt(self.bot.entity.position).position
                 if (pos.x == bot_pos.x and pos.y == bot_pos.y and pos.z == bot_pos.z):
                     continue
                 # 空きスペースを確認
@@ -466,13 +727,19 @@ class Skills:
             if not any(True for _ in recipes) and not any(True for _ in crafting_table_recipes):
                 # 材料不足の場合、必要な材料を調べる
                 required_materials = []
-                # レシピから必要な材料を取得
-                recipe_data = self.get_item_crafting_recipes(item_name)
-                if recipe_data and recipe_data[0]:
-                    recipe_dict = recipe_data[0][0]
-                    required_materials = [f"{key}: {value}" for key, value in recipe_dict.items()]
+                plan = self._plan_craft(item_name, num)
+                if plan is not None and plan.missing:
+                    # 中間素材のレシピまで遡って、不足している素材を示す
+                    required_materials = [f"{key}: {value}" for key, value in plan.missing.items()]
+                    result["plan"] = plan.to_dict()
                 else:
-                    required_materials.append("レシピが見つかりません")
+                    # レシピから必要な材料を取得
+                    recipe_data = self.get_item_crafting_recipes(item_name)
+                    if recipe_data and recipe_data[0]:
+                        recipe_dict = recipe_data[0][0]
+                        required_materials = [f"{key}: {value}" for key, value in recipe_dict.items()]
+                    else:
+                        required_materials.append("レシピが見つかりません")
                 
                 error_msg = f"{str(item_name)}を作成するための材料が不足しています"
                 if required_materials:
@@ -500,11 +767,11 @@ class Skills:
                     result["error"] = "recipe_not_found"
                     return result
                     
-                # クラフティングテーブルを探す
-                crafting_table = await self.get_nearest_block('crafting_table', crafting_table_range)
+                # クラフティングテーブルを探す（記録されている作業台も含む）
+                crafting_table = await self._find_workstation('crafting_table', crafting_table_range)
                 if not crafting_table:
                     # インベントリにクラフティングテーブルがあるか確認
-                    if (await self.get_inventory_counts()).get('crafting_table', 0) > 0:
+                    if self._count_item('crafting_table') > 0:
                         # クラフティングテーブルを設置
                         pos = await self.get_nearest_free_space(X_size=1,Z_size=1,distance=6)
                         place_result =await self.place_block('crafting_table', pos.x, pos.y, pos.z)
@@ -556,9 +823,9 @@ class Skills:
                 success_msg = f"{str(item_name)}を{str(num)}個作成しました"
                 self.bot.chat(success_msg)
                 
-                # 設置したクラフティングテーブルを回収
+                # 設置したクラフティングテーブルを回収（ポリシーが "keep" の場合は残す）
                 if placed_table:
-                    await self.collect_block('crafting_table', 1)
+                    await self._release_workstation('crafting_table', crafting_table.position)
                 
                 result["success"] = True
                 result["message"] = success_msg
@@ -572,7 +839,7 @@ class Skills:
                 result["exception"] = str(e)
                 
                 if placed_table:
-                    await self.collect_block('crafting_table', 1)
+                    await self._release_workstation('crafting_table', crafting_table.position)
                 return result
                 
         except Exception as e:
@@ -585,6 +852,120 @@ class Skills:
             traceback.print_exc()
             return result
         
+    def _plan_craft(self, item_name, num=1):
+        """
+        現在のインベントリと近くの作業台の有無から、レシピ索引でクラフト手順を求めます。
+        
+        Returns:
+            CraftPlan: クラフト手順。レシピ索引がない、またはレシピがない場合はNone
+        """
+        if self.recipes is None:
+            return None
+        inventory_counts = self.inventory.as_dict() if self.inventory.attached else self._scan_inventory_counts()
+        has_table = bool(self._find_block_positions('crafting_table', 32, 1))
+        return self.recipes.plan_craft(item_name, num, inventory_counts, has_table)
+
+    def plan_craft(self, item_name, num=1):
+        """
+        指定されたアイテムを作成するために必要なクラフト手順を、材料のレシピまで遡って求めます。
+        例えば原木しか持っていない状態で wooden_pickaxe を指定すると、板材・作業台・棒・ツルハシの順に手順を返します。
+        インベントリにある中間素材は優先して使います。実際のクラフトは行いません。
+        
+        Args:
+            item_name (str): 作成するアイテムの名前 (例: "wooden_pickaxe")
+            num (int): 作成する数量。デフォルトは1
+            
+        Returns:
+            dict: 結果を含む辞書
+                - success (bool): 現在のインベントリだけで全ての手順を実行できる場合はTrue
+                - message (str): 結果メッセージ
+                - steps (list): 実行順のクラフト手順 [{"item", "times", "count", "crafting_table"}, ...]
+                - raw_materials (dict): 使用するクラフトできない素材（原木など）の合計数
+                - missing (dict): 不足している素材とその数
+                - error (str, optional): エラーがある場合のエラーコード
+        """
+        result = {
+            "success": False,
+            "message": "",
+            "steps": [],
+            "raw_materials": {},
+            "missing": {}
+        }
+        plan = self._plan_craft(item_name, num)
+        if plan is None:
+            result["message"] = f"{item_name}のレシピが見つかりません"
+            result["error"] = "recipe_not_found"
+            return result
+
+        result.update(plan.to_dict())
+        if plan.feasible:
+            result["success"] = True
+            result["message"] = f"{item_name}を{num}個作成する手順: " + " → ".join(
+                f"{step.item}×{step.count}" for step in plan.steps
+            )
+        else:
+            missing = ", ".join(f"{name}: {count}" for name, count in plan.missing.items())
+            result["message"] = f"{item_name}を{num}個作成するには素材が不足しています。不足している素材: {missing}"
+            result["error"] = "insufficient_materials"
+        return result
+
+    async def craft_with_plan(self, item_name, num=1):
+        """
+        plan_craft で求めた手順に従い、中間素材から順にまとめてクラフトします。
+        作業台が必要な手順がある場合は、最初に1回だけ作業台を用意し（近くになければインベントリから設置）、
+        全ての手順が終わった後で設置した作業台を回収します。
+        
+        Args:
+            item_name (str): 作成するアイテムの名前 (例: "wooden_pickaxe")
+            num (int): 作成する数量。デフォルトは1
+            
+        Returns:
+            dict: 結果を含む辞書
+                - success (bool): 全ての手順に成功した場合はTrue
+                - message (str): 結果メッセージ
+                - steps (list): 実行したクラフト手順
+                - missing (dict, optional): 不足している素材とその数
+                - error (str, optional): エラーがある場合のエラーコード
+        """
+        self.bot.chat(f"{item_name}を{num}個、材料からまとめて作成します。")
+        result = self.plan_craft(item_name, num)
+        if not result["success"]:
+            self.bot.chat(result["message"])
+            return result
+        steps = result["steps"]
+        result["success"] = False
+
+        placed_table = False
+        table_ready = False
+        try:
+            for step in steps:
+                if step["crafting_table"] and not table_ready:
+                    if not await self._find_workstation('crafting_table', 32):
+                        pos = await self.get_nearest_free_space(X_size=1, Z_size=1, distance=6)
+                        place_result = await self.place_block('crafting_table', pos.x, pos.y, pos.z)
+                        if not place_result["success"]:
+                            result["message"] = place_result["message"]
+                            result["error"] = "crafting_table_placement_failed"
+                            self.bot.chat(result["message"])
+                            return result
+                        placed_table = True
+                    table_ready = True
+
+                craft_result = await self.craft_items(step["item"], step["times"])
+                if not craft_result["success"]:
+                    result["message"] = f"{step['item']}の作成に失敗したため中断しました: {craft_result['message']}"
+                    result["error"] = craft_result.get("error", "crafting_error")
+                    self.bot.chat(result["message"])
+                    return result
+
+            result["success"] = True
+            result["message"] = f"{item_name}を{num}個作成しました（{len(steps)}手順）"
+            self.bot.chat(result["message"])
+            return result
+        finally:
+            if placed_table:
+                await self._release_workstation('crafting_table', pos)
+
     async def place_block(self, block_name, x, y, z, place_on='bottom'):
         """
         指定された座標にブロックを設置します。隣接するブロックから設置します。
@@ -645,11 +1026,7 @@ class Skills:
                 item_name = "redstone"
                 
             # インベントリからブロックを探す
-            block_item = None
-            for item in self.bot.inventory.items():
-                if item.name == item_name:
-                    block_item = item
-                    break
+            block_item = self._find_inventory_item(item_name)
             
             # ブロックがない場合は失敗
             if not block_item:
@@ -780,6 +1157,8 @@ class Skills:
                 result["message"] = f"{block_name}を座標({target_dest})に設置しました"
                 result["success"] = True
                 self.bot.chat(result["message"])
+                if block_name in WORKSTATION_KINDS:
+                    self.workstations.remember(self._world_key(), block_name, (x, y, z), placed=True)
                 
                 # 設置完了を少し待つ
                 await asyncio.sleep(0.2)
@@ -887,11 +1266,7 @@ class Skills:
             
             while True:
                 # インベントリからアイテムを探す
-                item = None
-                for slot_item in self.bot.inventory.items():
-                    if slot_item and slot_item.name == item_name:
-                        item = slot_item
-                        break
+                item = self._find_inventory_item(item_name)
                 
                 if not item:
                     break
@@ -947,18 +1322,14 @@ class Skills:
         
         try:
             # 最も近いチェストを探す
-            chest = await self.get_nearest_block("chest", 32)
+            chest = await self._find_workstation("chest", 32)
             if not chest:
                 result["message"] = "近くにチェストが見つかりませんでした。"
                 self.bot.chat(result["message"])
                 return result
                 
             # インベントリからアイテムを探す
-            item = None
-            for slot_item in self.bot.inventory.items():
-                if slot_item and slot_item.name == item_name:
-                    item = slot_item
-                    break
+            item = self._find_inventory_item(item_name)
                     
             if not item:
                 result["message"] = f"{item_name}をチェストに入れることができません。インベントリにありません。"
@@ -1015,7 +1386,7 @@ class Skills:
         
         try:
             # 最も近いチェストを探す
-            chest = await self.get_nearest_block("chest", 32)
+            chest = await self._find_workstation("chest", 32)
             if not chest:
                 result["message"] = "近くにチェストが見つかりませんでした。"
                 self.bot.chat(result["message"])
@@ -1096,7 +1467,7 @@ class Skills:
         try:
             # 最も近いチェストを探す
             chest = self.bot.findBlocks({
-                'matching':self.mcdata.blocksByName['chest'].id,
+                'matching': self._get_block_id('chest'),
                 'maxDistance': maxDistance,
                 'count': 10
             })
@@ -1176,10 +1547,7 @@ class Skills:
             
             # アイテム名が指定されている場合はインベントリから探す
             if item_name:
-                for inv_item in self.bot.inventory.items():
-                    if inv_item.name == item_name:
-                        item = inv_item
-                        break
+                item = self._find_inventory_item(item_name)
             
             # アイテムが見つからない場合
             if not item:
@@ -1307,7 +1675,7 @@ class Skills:
             }
             
             # エンティティまでの距離を計算
-            distance = self.bot.entity.position.distanceTo(position)
+            distance = entity.distance_to(*self.entity_table.self_position)
             result["distance"] = distance
             
             # エンティティが見つかったことを通知
@@ -1435,13 +1803,13 @@ class Skills:
                 inverted_goal = self.pathfinder.goals.GoalInvert(goal)
                 
                 # パスファインダーの設定
-                self.bot.pathfinder.setMovements(self.pathfinder.Movements(self.bot))
+                movements = self._get_movements()
+                self.bot.pathfinder.setMovements(movements)
                 
                 # チートモードの場合はテレポート
                 if hasattr(self.bot.modes, 'isOn') and self.bot.modes.isOn('cheat'):
                     try:
-                        move = self.pathfinder.Movements(self.bot)
-                        path = self.bot.pathfinder.getPathTo(move, inverted_goal, 10000)
+                        path = self.bot.pathfinder.getPathTo(movements, inverted_goal, 10000)
                         
                         if path and path.path and len(path.path) > 0:
                             last_move = path.path[len(path.path) - 1]
@@ -1518,7 +1886,7 @@ class Skills:
         self.bot.chat(f"{len(hostile_entities)}体の敵対的なエンティティから逃げます。")
         
         # 現在のプレイヤーの位置
-        player_pos = self.bot.entity.position
+        player_pos = self.entity_table.self_position
         
         # 各敵からの反発ベクトルを計算（各敵からプレイヤーを遠ざける方向）
         escape_vector = {'x': 0, 'y': 0, 'z': 0}
@@ -1572,7 +1940,7 @@ class Skills:
         self.bot.chat(result["message"])
         return result
 
-    async def collect_block(self, block_name, num=1, exclude=None):
+    async def collect_block(self, block_name, num=1, exclude=None, batch=True):
         """
         指定された名前のブロックを指定個数、採掘・収集します。
         最も近くにある安全に採掘可能なブロックを探し、適切なツールを装備して収集を試みます。
@@ -1583,9 +1951,12 @@ class Skills:
             block_name (str): 収集するブロックの名前 (例: "oak_log", "stone", "coal_ore")。
                             鉱石の場合、"coal" のように指定しても "coal_ore" や "deepslate_coal_ore" を探します。
                             "dirt" を指定すると "grass_block" も対象になります。
+                            "#log" のようにタグで指定すると、"_log" で終わる全てのブロックが対象になります。
             num (int, optional): 収集する目標のブロック数。Defaults to 1.
             exclude (list[Vec3], optional): 収集対象から除外するブロックの座標 (Vec3オブジェクト) のリスト。
                                          特定の場所にあるブロックを無視したい場合に使用します。Defaults to None.
+            batch (bool, optional): num が2以上の場合に、候補をまとめて探して巡回経路の順に採掘します。
+                                    候補が尽きるか無効になった場合にだけ再検索します。Defaults to True.
 
         Returns:
             dict: 収集結果の詳細を含む辞書。
@@ -1638,67 +2009,57 @@ class Skills:
         if block_name == 'dirt':
             blocktypes.append('grass_block')
         
-        for i in range(num):
-            blocks = []
-            for btype in blocktypes:
-                found_block = await self.get_nearest_block(btype, 500)
-                await asyncio.sleep(0.1)
-                if found_block:
-                    blocks.append(found_block)
-            
-            # 除外位置のフィルタリング
-            if exclude and blocks:
-                blocks = [block for block in blocks if not any(
-                    block.position.x == pos.x and 
-                    block.position.y == pos.y and 
-                    block.position.z == pos.z 
-                    for pos in exclude
-                )]
-            # 安全に採掘可能なブロックのフィルタリング
-            movements = self.bot.pathfinder.movements
-            movements.dontMineUnderFallingBlock = False
-            blocks = [block for block in blocks if movements.safeToBreak(block)]
-            if not blocks:
-                result["message"] = f"近くに{block_name}が見つかりません。"
-                result["error"] = "no_blocks_found"
-                break
-                
-            block = blocks[0]
-            # 適切なツールを装備a
-            self.bot.tool.equipForBlock(block)
-            if self.bot.heldItem:
-                held_item_id = self.bot.heldItem.type
-            else:
-                held_item_id = None
-            if not block.canHarvest(held_item_id):
-                self.bot.chat(f"{str(block_name)}を採掘するための適切なツールがありません。")
-                result["message"] = f"{block_name}を採掘するための適切なツールがありません。"
-                result["error"] = "no_suitable_tool"
-                print(result["message"])
+        if batch and num > 1:
+            # 候補をまとめて探し、巡回経路の順に採掘する
+            if await self._collect_block_batch(block_name, blocktypes, num, exclude, result):
                 return result
-            try:
-                move_result = await self.move_to_position(block.position.x, block.position.y, block.position.z, min_distance=1,dontcreateflow=False)
-                if not move_result["success"]:
-                    result["message"] = f"{block_name}の収集に失敗: {move_result['message']}"
-                    result["error"] = "move_failed"
-                    print(result["message"])
-                    return result
-                else:
-                    self.bot.dig(block)
-                    await asyncio.sleep(0.3)
-                    await self.pickup_nearby_items()
-                    await self.auto_light()
-            except Exception as e:
-                if str(e) == 'NoChests':
-                    result["message"] = f"{block_name}の収集に失敗: インベントリが一杯で、保管場所がありません。"
-                    result["error"] = "inventory_full"
-                    print(result["message"])
+        else:
+            for i in range(num):
+                # 全てのブロックタイプを1回の検索でまとめて探し、近い順に候補を得る
+                blocks = await self.get_nearest_blocks(blocktypes, 500, count=5, exclude=exclude)
+                # 安全に採掘可能なブロックのフィルタリング
+                movements = self._get_movements(dontMineUnderFallingBlock=False)
+                block = next((block for block in blocks if movements.safeToBreak(block)), None)
+                if block is None:
+                    result["message"] = f"近くに{block_name}が見つかりません。"
+                    result["error"] = "no_blocks_found"
                     break
+
+                # 適切なツールを装備a
+                self.bot.tool.equipForBlock(block)
+                if self.bot.heldItem:
+                    held_item_id = self.bot.heldItem.type
                 else:
-                    result["message"] = f"{block_name}の収集に失敗: {str(e)}"
-                    result["error"] = "collection_failed"
+                    held_item_id = None
+                if not self._can_harvest(block, held_item_id):
+                    self.bot.chat(f"{str(block_name)}を採掘するための適切なツールがありません。")
+                    result["message"] = f"{block_name}を採掘するための適切なツールがありません。"
+                    result["error"] = "no_suitable_tool"
                     print(result["message"])
-                    continue
+                    return result
+                try:
+                    move_result = await self.move_to_position(block.position.x, block.position.y, block.position.z, min_distance=1,dontcreateflow=False)
+                    if not move_result["success"]:
+                        result["message"] = f"{block_name}の収集に失敗: {move_result['message']}"
+                        result["error"] = "move_failed"
+                        print(result["message"])
+                        return result
+                    else:
+                        self.bot.dig(block)
+                        await asyncio.sleep(0.3)
+                        await self.pickup_nearby_items()
+                        await self.auto_light()
+                except Exception as e:
+                    if str(e) == 'NoChests':
+                        result["message"] = f"{block_name}の収集に失敗: インベントリが一杯で、保管場所がありません。"
+                        result["error"] = "inventory_full"
+                        print(result["message"])
+                        break
+                    else:
+                        result["message"] = f"{block_name}の収集に失敗: {str(e)}"
+                        result["error"] = "collection_failed"
+                        print(result["message"])
+                        continue
                     
         result["result"] = await self.get_inventory_counts()
         result["success"] = True
@@ -1708,6 +2069,104 @@ class Skills:
         print(result)
         return result
         
+    async def _collect_block_batch(self, block_name, blocktypes, num, exclude, result):
+        """
+        collect_block のバッチモードです。num 個以上の候補をまとめて探して巡回経路を作り、
+        その順に移動・採掘します。候補が尽きるか無効になった場合にだけ再検索します。
+
+        Args:
+            block_name (str): 収集するブロックの名前（メッセージ用）
+            blocktypes (list): 収集対象のブロック名のリスト
+            num (int): 収集する目標のブロック数
+            exclude (list): 収集対象から除外するブロックの座標のリスト
+            result (dict): collect_block の結果辞書（このメソッド内で更新します）
+
+        Returns:
+            bool: collect_block をその場で終了すべき場合（ツールがない、移動できない）はTrue
+        """
+        Vec3 = require('vec3')
+        movements = self._get_movements(dontMineUnderFallingBlock=False)
+        if self.block_states is not None:
+            names = set(self.block_states.resolve(blocktypes))
+        else:
+            names = set(blocktypes)
+        # 採掘済み・無効と分かった座標は再検索の対象から外す
+        visited = list(exclude or [])
+        route = []
+        collected = 0
+        move_failures = 0
+        # まだ拾っていないドロップのうち、最初に掘ったブロックの座標
+        first_drop = None
+
+        while collected < num:
+            if not route:
+                candidates = self._find_block_positions(blocktypes, 500, min(2 * (num - collected), 128), visited)
+                if not candidates:
+                    result["message"] = f"近くに{block_name}が見つかりません。"
+                    result["error"] = "no_blocks_found"
+                    break
+                position = self.bot.entity.position
+                route = plan_route((position.x, position.y, position.z), [c[:3] for c in candidates])
+                print(f"{block_name}の候補を{len(route)}個見つけました。巡回経路の順に採掘します。")
+
+            x, y, z = route.pop(0)
+            visited.append((x, y, z))
+            # 既に壊されたブロックはワールドキャッシュで判定し、ブリッジを呼ばずに読み飛ばす
+            if self.world_cache is not None and self.world_cache.is_loaded(x, z) and self.world_cache.name_at(x, y, z) not in names:
+                continue
+            block = self.bot.blockAt(Vec3(x, y, z))
+            if not block or block.name not in names or not movements.safeToBreak(block):
+                continue
+
+            # 適切なツールを装備
+            self.bot.tool.equipForBlock(block)
+            held_item_id = self.bot.heldItem.type if self.bot.heldItem else None
+            if not self._can_harvest(block, held_item_id):
+                self.bot.chat(f"{str(block_name)}を採掘するための適切なツールがありません。")
+                result["message"] = f"{block_name}を採掘するための適切なツールがありません。"
+                result["error"] = "no_suitable_tool"
+                print(result["message"])
+                return True
+            try:
+                # 拾い残したドロップから離れすぎる前に拾う（候補が少しずつ連なっている場合に、
+                # pickup_nearby_items の範囲外まで運ばれないようにする）
+                if first_drop is not None and math.dist(first_drop, (x, y, z)) > 8:
+                    await self.pickup_nearby_items()
+                    first_drop = None
+                move_result = await self.move_to_position(x, y, z, min_distance=1, dontcreateflow=False)
+                if not move_result["success"]:
+                    # 到達できない候補は飛ばし、続けて失敗する場合は中断する
+                    move_failures += 1
+                    if move_failures >= 3:
+                        result["message"] = f"{block_name}の収集に失敗: {move_result['message']}"
+                        result["error"] = "move_failed"
+                        print(result["message"])
+                        return True
+                    continue
+                move_failures = 0
+                self.bot.dig(block)
+                await asyncio.sleep(0.3)
+                collected += 1
+                # ドロップは次の候補に移動する前、または最後にまとめて拾う
+                if first_drop is None:
+                    first_drop = (x, y, z)
+                await self.auto_light()
+            except Exception as e:
+                if str(e) == 'NoChests':
+                    result["message"] = f"{block_name}の収集に失敗: インベントリが一杯で、保管場所がありません。"
+                    result["error"] = "inventory_full"
+                    print(result["message"])
+                    break
+                else:
+                    result["message"] = f"{block_name}の収集に失敗: {str(e)}"
+                    result["error"] = "collection_failed"
+                    print(result["message"])
+                    continue
+
+        if first_drop is not None:
+            await self.pickup_nearby_items()
+        return False
+
     async def should_place_torch(self):
         """
         松明を設置すべきかどうかを周辺にある松明の有無およびインベントリに松明があるかどうかの基づいて判断します。
@@ -1725,18 +2184,17 @@ class Skills:
         # 近くに松明がない場合
         if not nearest_torch:
             # 現在位置のブロックを確認
-            block = self.bot.blockAt(pos)
+            if self.world_cache is not None and self.world_cache.is_loaded(pos.x, pos.z):
+                block_name = self.world_cache.name_at(pos.x, pos.y, pos.z)
+            else:
+                block = self.bot.blockAt(pos)
+                block_name = block.name if block and hasattr(block, 'name') else None
             
             # インベントリに松明があるかチェック
-            has_torch = False
-            if hasattr(self.bot, 'inventory') and hasattr(self.bot.inventory, 'items'):
-                for item in self.bot.inventory.items():
-                    if item and hasattr(item, 'name') and item.name == 'torch':
-                        has_torch = True
-                        break
+            has_torch = self._count_item('torch') > 0
                     
             # 現在位置が空気で、松明を持っている場合に設置可能
-            return has_torch and block and hasattr(block, 'name') and block.name == 'air'
+            return has_torch and block_name == 'air'
             
         return False
         
@@ -1778,6 +2236,8 @@ class Skills:
         Returns:
             list: ブロック名のリスト
         """
+        if self.block_states is not None:
+            return sorted(self.block_states.block_id_by_name)
         block_names = []
         try:
             if hasattr(self.bot.registry, 'blocksByName'):
@@ -1861,24 +2321,37 @@ class Skills:
                 return result
 
         try:
-            # パスファインダーの動きを設定
-            movements = self.pathfinder.Movements(self.bot)
-            movements.canDig = canDig
-            movements.dontCreateFlow = dontcreateflow
-            movements.dontMineUnderFaillingBlock = dontMineUnderFaillingBlock
-            movements.canPlaceOn = canPlaceOn
-            movements.allow1by1towers = allow1by1towers
+            # パスファインダーの動きを設定（同じ設定のMovementsは再利用する）
+            flags = {
+                "canDig": canDig,
+                "dontCreateFlow": dontcreateflow,
+                "dontMineUnderFaillingBlock": dontMineUnderFaillingBlock,
+                "canPlaceOn": canPlaceOn,
+                "allow1by1towers": allow1by1towers,
+            }
+            movements = self._get_movements(**flags)
             self.bot.pathfinder.setMovements(movements)
             # 目標位置を設定
             goal = self.pathfinder.goals.GoalNear(x, y, z, min_distance)
-            # パスを取得
-            path = self.bot.pathfinder.getPathTo(movements,goal)
-            if path.status == "error":
+            # 直近に同じ条件で経路計算に成功していれば、計算を省く（キャッシュには success だけが保存される）
+            cache_key, cache_start, cache_revision = self._path_cache_entry(
+                flags, (current_pos.x, current_pos.y, current_pos.z), (x, y, z), min_distance
+            )
+            status = None
+            if cache_key is not None:
+                status = self.path_status_cache.get(cache_key, cache_start, cache_revision)
+            if status is None and onlyCheckPath:
+                # 移動しない場合だけ経路を計算する。移動する場合は noPath でも途中までの経路をたどり、
+                # 到達できたかを最後の距離チェックで判定する
+                status = self.bot.pathfinder.getPathTo(movements, goal).status
+                if cache_key is not None:
+                    self.path_status_cache.put(cache_key, cache_start, cache_revision, status)
+            if status == "noPath":
                 result["message"] = f"目標位置に到達できる経路を生成できませんでした。目的地が水中・溶岩にあるか、現在の装備では採掘出来ないブロック・空間に阻まれています"
                 result["error"] = "path_not_found"
                 self.bot.chat(result["message"])
                 return result
-            elif path.status == "timeout":
+            elif status == "timeout":
                 result["message"] = f"パスの生成がタイムアウトしました。目標位置が遠すぎる可能性があります"
                 result["error"] = "path_timeout"
                 self.bot.chat(result["message"])
@@ -1887,100 +2360,104 @@ class Skills:
                 result["success"] = True
                 result["message"] = f"目標位置 {x}, {y}, {z} に移動可能です。"
                 return result
-            # 目標に向かう
-            self.bot.pathfinder.setGoal(goal)
-            await asyncio.sleep(1)
+            # 目標に向かう。到着・停止・スタックはpathfinderのイベントで受け取る
+            events = asyncio.Queue()
+            loop = asyncio.get_running_loop()
 
-            last_position = None
-            stuck_time = 0
-            temp_free_space = None
-            move_start_time = asyncio.get_event_loop().time() # 移動開始時間を記録
-            while self.bot.pathfinder.isMoving() or self.bot.pathfinder.isMining() or self.bot.pathfinder.isBuilding():
-                # --- タイムアウトチェック ---
-                current_time = asyncio.get_event_loop().time()
-                if (current_time - move_start_time) > move_timeout:
-                    print(f"タイムアウトしました。移動可能最大時間を超過しました。動作を途中で停止します ({move_timeout}秒)。")
-                    self.bot.pathfinder.setGoal(None) # 目的地をリセット
-                    await asyncio.sleep(1) # ゴールリセットの反映を待つ
-                    result["success"] = False
-                    result["message"] = f"タイムアウトしました。移動可能最大時間を超過しました。動作を途中で停止します ({move_timeout}秒)。"
-                    result["error"] = "move_timeout"
-                    # 現在位置を記録
-                    current_pos_timeout = await self.get_bot_position()
-                    result["position"] = { "x": current_pos_timeout[0], "y": current_pos_timeout[1], "z": current_pos_timeout[2] }
-                    return result
-                # --- ここまで追加 ---
-                
-                mining = self.bot.pathfinder.isMining()
-                building = self.bot.pathfinder.isBuilding()
-                current_position = self.bot.entity.position
-                # スタック検出ロジック
-                if not mining and not building:
-                    if last_position and (
-                        abs(current_position.x - last_position.x) < 0.01 and
-                        abs(current_position.y - last_position.y) < 0.01 and
-                        abs(current_position.z - last_position.z) < 0.01
-                    ):
-                        stuck_time += 1
-                    else:
-                        stuck_time = 0
-
-                    # 2秒以上同じ位置でスタックしている場合
-                    if stuck_time >= 2:
-                        self.bot.chat("スタックを検出しました。解消を試みます。")
-                        free_space = None
-                        search_distance = 100
-                        while free_space is None and search_distance < 500: # 無限ループ防止
-                            free_space = await self.get_nearest_free_space(X_size=1,Y_size=2,Z_size=1,distance=search_distance)
-                            if free_space:
-                                break
-                            search_distance += 100
-
-                        if free_space is None:
-                            self.bot.chat("近くに一時退避できるスペースが見つかりません。移動を中断します。")
-                            self.bot.pathfinder.setGoal(None) # 目的地リセット
-                            await asyncio.sleep(1)
-                            result["success"] = False
-                            result["message"] = "スタック解消中に退避スペースが見つからず、移動を中断しました。"
-                            result["error"] = "stuck_no_space"
-                            current_pos_stuck = await self.get_bot_position()
-                            result["position"] = { "x": current_pos_stuck[0], "y": current_pos_stuck[1], "z": current_pos_stuck[2] }
-                            return result
+            def on_goal_event(kind, *args):
+                # ブリッジのスレッドから呼ばれるため、イベントループ側でキューに入れる
+                loop.call_soon_threadsafe(events.put_nowait, (kind, args))
+
+            watcher = self.bridge.watchGoal(self.bot, on_goal_event, 2000)
+            try:
+                self.bot.pathfinder.setGoal(goal)
+
+                temp_free_space = None
+                move_start_time = loop.time() # 移動開始時間を記録
+                while True:
+                    # --- タイムアウトチェック ---
+                    remaining = move_timeout - (loop.time() - move_start_time)
+                    try:
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError()
+                        kind, args = await asyncio.wait_for(events.get(), remaining)
+                    except asyncio.TimeoutError:
+                        print(f"タイムアウトしました。移動可能最大時間を超過しました。動作を途中で停止します ({move_timeout}秒)。")
+                        self.bot.pathfinder.setGoal(None) # 目的地をリセット
+                        result["success"] = False
+                        result["message"] = f"タイムアウトしました。移動可能最大時間を超過しました。動作を途中で停止します ({move_timeout}秒)。"
+                        result["error"] = "move_timeout"
+                        # 現在位置を記録
+                        current_pos_timeout = await self.get_bot_position()
+                        result["position"] = { "x": current_pos_timeout[0], "y": current_pos_timeout[1], "z": current_pos_timeout[2] }
+                        return result
 
-                        if temp_free_space and temp_free_space.x == free_space.x and temp_free_space.y == free_space.y and temp_free_space.z == free_space.z:
-                            # 一時的な移動で解消出来なければワープ (これはBotの能力に依存、通常は推奨されない)
-                            # self.bot.chat(f"/tp bot {free_space.x} {free_space.y} {free_space.z}")
-                            self.bot.chat("一時退避を試みましたがスタックが解消できませんでした。移動を中断します。")
+                    if kind == "goal_reached":
+                        if cache_key is not None:
+                            self.path_status_cache.put(cache_key, cache_start, cache_revision, "success")
+                        break
+                    if kind in ("path_stop", "idle"):
+                        # 止まった位置で到達できたかは、最後の距離チェックで判定する
+                        break
+                    if kind == "path_update":
+                        print(f"経路の計算結果: {args[0]}")
+                        if args[0] == "timeout" and temp_free_space is None:
+                            # 最初の経路計算がタイムアウトした場合は中断する
                             self.bot.pathfinder.setGoal(None)
-                            await asyncio.sleep(1)
-                            result["success"] = False
-                            result["message"] = "スタック解消に失敗しました。移動を中断します。"
-                            result["error"] = "stuck_unresolved"
-                            current_pos_stuck_fail = await self.get_bot_position()
-                            result["position"] = { "x": current_pos_stuck_fail[0], "y": current_pos_stuck_fail[1], "z": current_pos_stuck_fail[2] }
+                            result["message"] = f"パスの生成がタイムアウトしました。目標位置が遠すぎる可能性があります"
+                            result["error"] = "path_timeout"
+                            self.bot.chat(result["message"])
                             return result
-                        else:
-                            # 一時的な目標地点に移動
-                            temp_goal = self.pathfinder.goals.GoalNear(free_space.x, free_space.y, free_space.z, 0)
-                            self.bot.pathfinder.setGoal(temp_goal)
-                            await asyncio.sleep(1)
-                            temp_free_space = free_space
-                            self.bot.chat(f"一時的に {free_space.x:.1f}, {free_space.y:.1f}, {free_space.z:.1f} へ移動します。")
-                            await asyncio.sleep(2) # 一時目標への移動を待つ
-
-                        # 元の目標地点に再設定
-                        self.bot.pathfinder.setGoal(goal)
-                        await asyncio.sleep(1)
-                        self.bot.chat("元の目標への移動を再開します。")
-                        await asyncio.sleep(0.5)
-                        stuck_time = 0
-                        move_start_time = asyncio.get_event_loop().time() # スタック解消後、タイマーリセット
-
-                last_position = current_position
-                await asyncio.sleep(0.5) # ループのインターバル
+                        # noPath の場合も pathfinder は途中までの経路をたどるので、止まるまで待つ
+                        continue
+                    if kind != "stuck":
+                        continue
+
+                    # 2秒以上同じ位置でスタックしている場合（Node側で move イベントから検出）
+                    self.bot.chat("スタックを検出しました。解消を試みます。")
+                    # 近い順に探すので、探索距離を段階的に広げる必要はない
+                    free_space = await self.get_nearest_free_space(X_size=1,Y_size=2,Z_size=1,distance=100)
+
+                    if free_space is None:
+                        self.bot.chat("近くに一時退避できるスペースが見つかりません。移動を中断します。")
+                        self.bot.pathfinder.setGoal(None) # 目的地リセット
+                        result["success"] = False
+                        result["message"] = "スタック解消中に退避スペースが見つからず、移動を中断しました。"
+                        result["error"] = "stuck_no_space"
+                        current_pos_stuck = await self.get_bot_position()
+                        result["position"] = { "x": current_pos_stuck[0], "y": current_pos_stuck[1], "z": current_pos_stuck[2] }
+                        return result
+
+                    if temp_free_space and temp_free_space.x == free_space.x and temp_free_space.y == free_space.y and temp_free_space.z == free_space.z:
+                        # 一時的な移動で解消出来なければワープ (これはBotの能力に依存、通常は推奨されない)
+                        # self.bot.chat(f"/tp bot {free_space.x} {free_space.y} {free_space.z}")
+                        self.bot.chat("一時退避を試みましたがスタックが解消できませんでした。移動を中断します。")
+                        self.bot.pathfinder.setGoal(None)
+                        result["success"] = False
+                        result["message"] = "スタック解消に失敗しました。移動を中断します。"
+                        result["error"] = "stuck_unresolved"
+                        current_pos_stuck_fail = await self.get_bot_position()
+                        result["position"] = { "x": current_pos_stuck_fail[0], "y": current_pos_stuck_fail[1], "z": current_pos_stuck_fail[2] }
+                        return result
+
+                    # 一時的な目標地点に移動し、到着するか3秒経つまで待つ
+                    temp_goal = self.pathfinder.goals.GoalNear(free_space.x, free_space.y, free_space.z, 0)
+                    self.bot.pathfinder.setGoal(temp_goal)
+                    temp_free_space = free_space
+                    self.bot.chat(f"一時的に {free_space.x:.1f}, {free_space.y:.1f}, {free_space.z:.1f} へ移動します。")
+                    await self._wait_goal_event(events, ("goal_reached", "path_stop", "idle"), 3)
+
+                    # 一時目標のイベントが残っていれば捨ててから、元の目標地点に再設定
+                    while not events.empty():
+                        events.get_nowait()
+                    self.bot.pathfinder.setGoal(goal)
+                    self.bot.chat("元の目標への移動を再開します。")
+                    move_start_time = loop.time() # スタック解消後、タイマーリセット
+            finally:
+                watcher.detach()
+
             # 移動完了後、パスファインダーのゴールをリセット
             self.bot.pathfinder.setGoal(None)
-            await asyncio.sleep(1)
             # --- 移動完了後の処理 ---
             bot_x, bot_y, bot_z = await self.get_bot_position()
             # 目標位置との距離を計算 (インデント修正)
@@ -2019,10 +2496,37 @@ class Skills:
 
         return result
         
+    async def _wait_goal_event(self, events, kinds, timeout):
+        """
+        watchGoal や watchFurnace から届くイベントのうち、kinds のいずれかが届くまで最大 timeout 秒待ちます。
+
+        Args:
+            events (asyncio.Queue): (イベント名, 引数) を受け取るキュー
+            kinds (tuple): 待つイベント名
+            timeout (float): 最大待機時間（秒）
+
+        Returns:
+            str or None: 届いたイベント名。タイムアウトした場合はNone
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                kind, _ = await asyncio.wait_for(events.get(), remaining)
+            except asyncio.TimeoutError:
+                return None
+            if kind in kinds:
+                return kind
+
     async def smelt_item(self, item_name, num=1):
         """
         32ブロック以内にある「かまど」または、インベントリに「かまど」がある場合、「かまど」にアイテムを入れて精錬します。燃料として石炭、木炭、木材を使用します。
         精錬が完了するまで待機し、完了したアイテムを回収します。
+        近くに複数のかまどがある場合は、材料を分けて並行して精錬します。
+        待機せずに別の作業を行いたい場合は start_smelting と collect_smelting を使用してください。
         
         Args:
             item_name (str): 精錬するアイテム名（例: "raw_iron", "raw_copper", "beef"など）
@@ -2037,198 +2541,323 @@ class Skills:
                 - error (str, optional): エラーがある場合のエラーコード
         """
         self.bot.chat(f"{item_name}を精錬します。")
+        start_result = await self.start_smelting(item_name, num)
+        if not start_result["success"]:
+            return {
+                "success": False,
+                "message": start_result["message"],
+                "smelted": 0,
+                "item_name": item_name,
+                "error": start_result.get("error"),
+            }
+        return await self.collect_smelting(start_result["job"], wait=True)
+
+    async def start_smelting(self, item_name, num=1, max_furnaces=4):
+        """
+        精錬をジョブとして開始し、完了を待たずに戻ります。
+        32ブロック以内のかまど（最大 max_furnaces 台）に材料を分けて投入し、燃料も必要な分だけ入れます。
+        かまどがない場合は、記録されているかまどへ移動するか、インベントリのかまどを設置します。
+        精錬中は別の作業を行うことができ、完成品は collect_smelting で回収します。
+        
+        Args:
+            item_name (str): 精錬するアイテム名（例: "raw_iron", "raw_copper", "beef"など）
+            num (int): 精錬するアイテムの数。デフォルトは1
+            max_furnaces (int): 使用するかまどの最大数。デフォルトは4
+            
+        Returns:
+            dict: 結果を含む辞書
+                - success (bool): 1台以上のかまどで精錬を開始できた場合はTrue
+                - message (str): 結果メッセージ
+                - job (SmeltingJob): 精錬ジョブのハンドル。job.wait() で完了予定まで待機でき、
+                                     job.remaining_seconds() で残り時間を確認できます
+                - error (str, optional): エラーがある場合のエラーコード
+                
+        Example:
+            >>> job = (await skills.start_smelting('raw_iron', 8))["job"]
+            >>> await skills.collect_block('oak_log', 4)
+            >>> await skills.collect_smelting(job)
+        """
         result = {
             "success": False,
             "message": "",
-            "smelted": 0,
             "item_name": item_name,
+            "job": None,
         }
-        
+
         # 精錬可能なアイテムか確認
-        is_smeltable = self._is_smeltable(item_name)
-        if not is_smeltable:
+        if not self._is_smeltable(item_name):
             result["message"] = f"{item_name}は精錬できません。「raw_」で始まる生の鉱石や食材を指定してください。"
             result["error"] = "not_smeltable"
             self.bot.chat(result["message"])
             return result
+
+        # 精錬するアイテムを持っているか確認
+        if self._count_item(item_name) < num:
+            result["message"] = f"精錬するための{item_name}が足りません"
+            result["error"] = "insufficient_items"
+            self.bot.chat(result["message"])
+            return result
+
+        furnaces = await self._gather_furnaces(max_furnaces)
+        if not furnaces:
+            result["message"] = "近くにかまどがなく、インベントリにもかまどがありません"
+            result["error"] = "no_furnace"
+            self.bot.chat(result["message"])
+            return result
+
+        start_tick = int(self.bot.time.age)
+        started_at = time.monotonic()
+        assignments = []
+        remaining = num
+        for index, (furnace_block, placed) in enumerate(furnaces):
+            if remaining <= 0:
+                break
+            # 残りのかまどで均等に分ける（使えないかまどがあった場合は残りのかまどに回す）
+            share = math.ceil(remaining / (len(furnaces) - index))
+            loaded = await self._load_furnace(furnace_block, item_name, share)
+            if not loaded["success"]:
+                result["message"] = loaded["message"]
+                result["error"] = loaded["error"]
+                print(loaded["message"])
+                continue
+            elapsed_ticks = int((time.monotonic() - started_at) * TICKS_PER_SECOND)
+            position = furnace_block.position
+            assignments.append(FurnaceAssignment(
+                (int(position.x), int(position.y), int(position.z)),
+                share,
+                start_tick + elapsed_ticks + SMELT_TICKS * share,
+                placed,
+            ))
+            remaining -= share
+
+        if not assignments:
+            self.bot.chat(result["message"])
+            return result
+
+        job = SmeltingJob(item_name, start_tick, assignments, started_at)
+        result["success"] = True
+        result["job"] = job
+        result["message"] = (
+            f"{item_name}を{job.count}個、{len(assignments)}台のかまどで精錬中です"
+            f"（完了まで約{job.remaining_seconds():.0f}秒）"
+        )
+        if remaining > 0:
+            result["message"] += f"。{remaining}個はかまどに投入できませんでした"
+        result.pop("error", None)
+        self.bot.chat(result["message"])
+        print(result["message"])
+        return result
+
+    async def collect_smelting(self, job, wait=True):
+        """
+        start_smelting で開始した精錬ジョブの完成品を、各かまどから回収します。
+        wait=True の場合は各かまどの完了予定まで待ち、かまどのウィンドウの更新を受け取りながら全て完成するまで待機します。
+        wait=False の場合は、その時点で完成している分だけを回収します。
+        
+        Args:
+            job (SmeltingJob): start_smelting が返したジョブ
+            wait (bool): 完成を待つかどうか。デフォルトはTrue
             
-        # かまどを探す
-        placed_furnace = False
-        furnace_block = await self.get_nearest_block('furnace', 32)
-        if not furnace_block:
-            # かまどを持っているか確認
-            if (await self.get_inventory_counts()).get('furnace', 0) > 0:
-                # かまどを設置
-                pos = await self.get_nearest_free_space(X_size=1,Z_size=1,distance=15)
-                place_result = await self.place_block('furnace', pos.x, pos.y, pos.z)
-                await asyncio.sleep(1)
-                if place_result["success"]:
-                    furnace_block = await self.get_nearest_block('furnace', 32)
-                    placed_furnace = True
-                else:
-                    result["message"] = "かまどの設置に失敗しました"
-                    result["error"] = "furnace_placement_failed"
-                    self.bot.chat(result["message"])
-                    return result
+        Returns:
+            dict: 結果を含む辞書
+                - success (bool): 1個以上回収できた場合はTrue
+                - message (str): 結果メッセージ
+                - smelted (int): これまでに回収した完成品の数
+                - item_name (str): 精錬したアイテム名
+                - smelted_item_name (str, optional): 完成品のアイテム名
+                - error (str, optional): エラーがある場合のエラーコード
+        """
+        result = {
+            "success": False,
+            "message": "",
+            "smelted": 0,
+            "item_name": job.item_name,
+        }
+
+        for assignment in sorted(job.assignments, key=lambda a: a.expected_tick):
+            if assignment.done:
+                continue
+            if wait:
+                await asyncio.sleep(job.remaining_seconds(assignment))
+            try:
+                await self._collect_furnace_output(job, assignment, wait)
+            except Exception as e:
+                result["message"] = f"かまど操作中にエラーが発生しました: {str(e)}"
+                result["error"] = "furnace_error"
+                import traceback
+                traceback.print_exc()
+                continue
+            # 設置したかまどを回収（ポリシーが "keep" の場合は残す）
+            if assignment.placed and assignment.done:
+                await self._release_workstation('furnace', assignment.position)
+
+        total_smelted = job.collected
+        result["smelted"] = total_smelted
+        if job.smelted_item_name:
+            result["smelted_item_name"] = job.smelted_item_name
+
+        if total_smelted == 0:
+            if not result["message"]:
+                result["message"] = f"{job.item_name}の精錬に失敗しました" if wait else f"{job.item_name}の精錬はまだ完了していません"
+                result["error"] = "smelting_failed" if wait else "not_ready"
+        elif total_smelted < job.count:
+            result["success"] = True
+            result["message"] = f"{job.count}個中{total_smelted}個の{job.item_name}を精錬しました"
+        else:
+            result["success"] = True
+            result["message"] = f"{job.item_name}を{total_smelted}個精錬しました"
+            if job.smelted_item_name:
+                result["message"] = f"{job.item_name}を精錬し、{total_smelted}個の{job.smelted_item_name}を取得しました"
+        if result["success"]:
+            result.pop("error", None)
+        self.bot.chat(result["message"])
+        print(result)
+        return result
+
+    async def _gather_furnaces(self, max_furnaces):
+        """
+        精錬に使うかまどを集めます。32ブロック以内のかまどを近い順に最大 max_furnaces 台返し、
+        見つからない場合は記録されているかまど、またはインベントリのかまどを設置して使います。
+        
+        Returns:
+            list: (かまどのBlock, BOTが今回設置したか) のリスト
+        """
+        Vec3 = require('vec3')
+        furnaces = []
+        for x, y, z, _ in self._find_block_positions('furnace', 32, max_furnaces):
+            block = self.bot.blockAt(Vec3(x, y, z))
+            if block and block.name == 'furnace':
+                furnaces.append((block, False))
+        if furnaces:
+            return furnaces
+
+        furnace_block = await self._find_workstation('furnace', 32)
+        if furnace_block:
+            return [(furnace_block, False)]
+
+        # かまどを持っていれば設置する
+        if self._count_item('furnace') > 0:
+            pos = await self.get_nearest_free_space(X_size=1, Z_size=1, distance=15)
+            place_result = await self.place_block('furnace', pos.x, pos.y, pos.z)
+            await asyncio.sleep(1)
+            if place_result["success"]:
+                furnace_block = await self.get_nearest_block('furnace', 32)
+                if furnace_block:
+                    return [(furnace_block, True)]
             else:
-                result["message"] = f"近くにかまどがなく、インベントリにもかまどがありません"
-                result["error"] = "no_furnace"
-                self.bot.chat(result["message"])
-                return result
-                
-        # かまどまで移動
+                print("かまどの設置に失敗しました")
+        return []
+
+    async def _load_furnace(self, furnace_block, item_name, count):
+        """
+        かまどに燃料と材料を投入します。燃料は、かまどに残っている材料と合わせた精錬に足りない分だけ補充します。
+        
+        Returns:
+            dict: success / message / error を含む辞書
+        """
+        result = {"success": False, "message": "", "error": None}
         if self.bot.entity.position.distanceTo(furnace_block.position) > 4:
             await self.move_to_position(
-                furnace_block.position.x, 
-                furnace_block.position.y, 
-                furnace_block.position.z, 
+                furnace_block.position.x,
+                furnace_block.position.y,
+                furnace_block.position.z,
                 2
             )
-            
-        # かまどを開く
+
+        self.bot.lookAt(furnace_block.position)
+        furnace = self.bot.openFurnace(furnace_block)
         try:
-            # かまどを見る
-            self.bot.lookAt(furnace_block.position)
-            
-            # かまどを開く
-            furnace = self.bot.openFurnace(furnace_block)
-            
-            # 既に精錬中のアイテムがあるか確認
+            # 既に別のアイテムを精錬中のかまどは使わない
             input_item = furnace.inputItem()
+            queued = 0
             if input_item and input_item.type and input_item.count > 0:
                 if self._get_item_name(input_item.type) != item_name:
                     result["message"] = f"かまどは既に{self._get_item_name(input_item.type)}を精錬中です"
                     result["error"] = "already_smelting"
-                    furnace.close()
-                    
-                    # 設置したかまどを回収
-                    if placed_furnace:
-                        await self.collect_block('furnace', 1)
-                        
-                    self.bot.chat(result["message"])
                     return result
-                    
-            # 精錬するアイテムを持っているか確認
-            inv_counts = await self.get_inventory_counts()
-            if not inv_counts.get(item_name, 0) or inv_counts.get(item_name, 0) < num:
-                result["message"] = f"精錬するための{item_name}が足りません"
-                result["error"] = "insufficient_items"
-                furnace.close()
-                
-                # 設置したかまどを回収
-                if placed_furnace:
-                    await self.collect_block('furnace', 1)
-                    
-                self.bot.chat(result["message"])
-                return result
-                
-            # 燃料を確認・投入
-            if not furnace.fuelItem() or furnace.fuelItem().count <= 0:
+                queued = input_item.count
+
+            # 燃料を確認・投入。スロットに残っている燃料で足りない分（投入後の材料の合計に対して）だけ補充する
+            slot = furnace.fuelItem()
+            slot_count = slot.count if slot and slot.count > 0 else 0
+            if slot_count:
+                slot_name = self._get_item_name(slot.type)
+                shortfall = queued + count - FUEL_BURN.get(slot_name, 1) * slot_count
+                # 燃料スロットには同じ種類の燃料しか追加できない
+                fuel = self._find_inventory_item(slot_name) if self._count_item(slot_name) > 0 else None
+                if shortfall > 0 and fuel is None:
+                    result["message"] = f"かまどの燃料（{slot_name} {slot_count}個）では足りず、同じ燃料を持っていないため補充できません"
+                    result["error"] = "no_fuel"
+                    return result
+            else:
+                shortfall = queued + count
                 fuel = self._get_smelting_fuel()
                 if not fuel:
                     result["message"] = f"{item_name}を精錬するための燃料（石炭、木炭、木材など）がありません"
                     result["error"] = "no_fuel"
-                    furnace.close()
-                    
-                    # 設置したかまどを回収
-                    if placed_furnace:
-                        await self.collect_block('furnace', 1)
-                        
-                    self.bot.chat(result["message"])
-                    print(result)
                     return result
-                    
-                # 燃料を投入
-                furnace.putFuel(fuel.type, None, fuel.count)
-                self.bot.chat(f"かまどに{fuel.count}個の{fuel.name}を燃料として投入しました")
-                print(f"かまどに{fuel.count}個の{fuel.name}を燃料として投入しました")
-                
+            if shortfall > 0:
+                amount = min(self._count_item(fuel.name), fuel_needed(fuel.name, shortfall), 64 - slot_count)
+                if amount > 0:
+                    furnace.putFuel(fuel.type, None, amount)
+                    print(f"かまどに{amount}個の{fuel.name}を燃料として投入しました")
+
             # 精錬するアイテムをかまどに入れる
-            item_id = self._get_item_id(item_name)
-            furnace.putInput(item_id, None, num)
-            
-            # 精錬が完了するまで待機して結果を収集
-            total_smelted = 0
-            collected_last = True
-            smelted_item = None
-            
-            # 少し待機して精錬が始まるのを待つ
-            await asyncio.sleep(0.2)
-            
-            while total_smelted < num:
-                # 10秒ごとに確認
-                await asyncio.sleep(10)
-                
-                # 結果を確認
-                collected = False
+            furnace.putInput(self._get_item_id(item_name), None, count)
+            result["success"] = True
+            return result
+        finally:
+            furnace.close()
+
+    async def _collect_furnace_output(self, job, assignment, wait):
+        """
+        1台のかまどから完成品を取り出します。
+        wait=True の場合は、かまどのウィンドウの更新（完成品・材料の個数の変化）を受け取りながら、
+        割り当てた分が全て完成するか、材料がなくなるまで待ちます。
+        """
+        Vec3 = require('vec3')
+        x, y, z = assignment.position
+        if self.bot.entity.position.distanceTo(Vec3(x, y, z)) > 4:
+            move_result = await self.move_to_position(x, y, z, 2)
+            if not move_result["success"]:
+                print(f"かまど（座標({x}, {y}, {z})）に到達できませんでした")
+                return
+        furnace_block = self.bot.blockAt(Vec3(x, y, z))
+        if not furnace_block or furnace_block.name != 'furnace':
+            print(f"座標({x}, {y}, {z})にかまどがありません")
+            self.workstations.forget(self._world_key(), assignment.position)
+            return
+
+        events = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        def on_furnace_event(kind, *args):
+            # ブリッジのスレッドから呼ばれるため、イベントループ側でキューに入れる
+            loop.call_soon_threadsafe(events.put_nowait, (kind, args))
+
+        self.bot.lookAt(furnace_block.position)
+        furnace = self.bot.openFurnace(furnace_block)
+        watcher = self.bridge.watchFurnace(furnace, on_furnace_event)
+        try:
+            while not assignment.done:
                 if furnace.outputItem():
                     smelted_item = furnace.takeOutput()
                     if smelted_item:
-                        total_smelted += smelted_item.count
-                        collected = True
-                        
-                # 何も取得できなかった場合
-                if not collected and not collected_last:
-                    break  # 前回も今回も何も取得できなかった場合は終了
-                    
-                collected_last = collected
-                
-            # かまどを閉じる
+                        assignment.collected += smelted_item.count
+                        job.smelted_item_name = self._get_item_name(smelted_item.type)
+                        continue
+                input_item = furnace.inputItem()
+                if not wait or not input_item or input_item.count <= 0:
+                    break
+                # 次の1個が完成するまでウィンドウの更新を待つ（余裕を持って1個分の2倍）
+                kind = await self._wait_goal_event(events, ("update",), 2 * SMELT_TICKS / TICKS_PER_SECOND)
+                if kind is None:
+                    print("かまどの精錬が進んでいないため待機を終了します")
+                    break
+        finally:
+            watcher.detach()
             furnace.close()
-            
-            # 設置したかまどを回収
-            if placed_furnace:
-                await self.collect_block('furnace', 1)
-                
-            # 結果を設定
-            if total_smelted == 0:
-                result["message"] = f"{item_name}の精錬に失敗しました"
-                result["error"] = "smelting_failed"
-                self.bot.chat(result["message"])
-                print(result)
-                return result
-                
-            if total_smelted < num:
-                result["message"] = f"{num}個中{total_smelted}個の{item_name}を精錬しました"
-                result["success"] = True
-                result["smelted"] = total_smelted
-                
-                if smelted_item:
-                    result["smelted_item_name"] = self._get_item_name(smelted_item.type)
-                    
-                self.bot.chat(result["message"])
-                print(result)
-                return result
-                
-            result["message"] = f"{item_name}を{total_smelted}個精錬しました"
-            if smelted_item:
-                result["smelted_item_name"] = self._get_item_name(smelted_item.type)
-                result["message"] = f"{item_name}を精錬し、{total_smelted}個の{self._get_item_name(smelted_item.type)}を取得しました"
-                
-            result["success"] = True
-            result["smelted"] = total_smelted
-            self.bot.chat(result["message"])
-            print(result)
-            return result
-            
-        except Exception as e:
-            result["message"] = f"かまど操作中にエラーが発生しました: {str(e)}"
-            result["error"] = "furnace_error"
-            
-            import traceback
-            traceback.print_exc()
-            print(result)
-            self.bot.chat(result["message"])
-            
-            # 設置したかまどを回収
-            if placed_furnace:
-                try:
-                    await self.collect_block('furnace', 1)
-                except:
-                    pass
-                    
-            return result
-    
+
     async def clear_nearest_furnace(self):
         """
         最も近いかまどを見つけ、中のアイテムをすべて取り出します。
@@ -2249,7 +2878,7 @@ class Skills:
         
         try:
             # 最も近いかまどを見つける
-            furnace_block = await self.get_nearest_block('furnace', 32)
+            furnace_block = await self._find_workstation('furnace', 32)
             if not furnace_block:
                 result["message"] = "近くにかまどが見つかりません"
                 result["error"] = "no_furnace"
@@ -2406,6 +3035,8 @@ class Skills:
             "entity_name": entity.name if hasattr(entity, 'name') else "不明なエンティティ"
         }
         
+        # EntityRecord の場合は攻撃用にJavaScriptのエンティティを取得
+        entity = self._resolve_entity(entity)
         # エンティティの存在確認
         if not entity or not hasattr(entity, 'position') or not entity.position:
             result["message"] = "攻撃対象のエンティティが無効です"
@@ -2457,9 +3088,10 @@ class Skills:
             # PVPモジュールを使用
             self.bot.pvp.attack(entity)
             
-            # エンティティが死ぬまで待機
-            while self._is_entity_nearby(entity, 24):
-                await asyncio.sleep(1)
+            # エンティティが死ぬまで待機（エンティティテーブルを見るだけなのでブリッジ呼び出しは発生しない）
+            target = self.entity_table.get(entity.id) or entity
+            while self._is_entity_nearby(target, 24):
+                await asyncio.sleep(0.2)
                 if hasattr(self.bot, 'interrupt_code') and self.bot.interrupt_code:
                     self.bot.pvp.stop()
                     result["message"] = "攻撃が中断されました"
@@ -2514,13 +3146,19 @@ class Skills:
             return result
         while enemy:
             # 敵との距離に応じた行動
-            enemy_distance = self.bot.entity.position.distanceTo(enemy.position)
+            enemy_distance = enemy.distance_to(*self.entity_table.self_position)
+            enemy_entity = self._resolve_entity(enemy)
+            if not enemy_entity:
+                # 既にいなくなっている場合は次の敵を探す
+                enemy = self._get_nearest_hostile_entity(range)
+                enemies_killed += 1
+                continue
             
             # クリーパーとファントム以外の敵が遠い場合は接近
             if enemy_distance >= 4 and enemy.name != 'creeper' and enemy.name != 'phantom':
                 try:
-                    self.bot.pathfinder.setMovements(self.pathfinder.Movements(self.bot))
-                    await self.bot.pathfinder.goto(self.pathfinder.goals.GoalFollow(enemy, 3.5), True)
+                    self.bot.pathfinder.setMovements(self._get_movements())
+                    await self.bot.pathfinder.goto(self.pathfinder.goals.GoalFollow(enemy_entity, 3.5), True)
                 except Exception:
                     # エンティティが死んでいる場合などはエラーを無視
                     pass
@@ -2528,8 +3166,8 @@ class Skills:
             # 敵が近すぎる場合は距離を取る
             if enemy_distance <= 2:
                 try:
-                    self.bot.pathfinder.setMovements(self.pathfinder.Movements(self.bot))
-                    inverted_goal = self.pathfinder.goals.GoalInvert(self.pathfinder.goals.GoalFollow(enemy, 2))
+                    self.bot.pathfinder.setMovements(self._get_movements())
+                    inverted_goal = self.pathfinder.goals.GoalInvert(self.pathfinder.goals.GoalFollow(enemy_entity, 2))
                     await self.bot.pathfinder.goto(inverted_goal, True)
                 except Exception:
                     # エンティティが死んでいる場合などはエラーを無視
@@ -2538,7 +3176,7 @@ class Skills:
             # 攻撃開始
             has_pvp = hasattr(self.bot, 'pvp') and self.bot.pvp is not None
             
-            self.bot.pvp.attack(enemy)
+            self.bot.pvp.attack(enemy_entity)
                 
             attacked = True
             
@@ -2550,7 +3188,7 @@ class Skills:
             enemy = self._get_nearest_hostile_entity(range)
             
             # 前の敵がいなくなった場合はカウント
-            if enemy != previous_enemy and not self._is_entity_nearby(previous_enemy, range):
+            if (enemy is None or enemy.id != previous_enemy.id) and not self._is_entity_nearby(previous_enemy, range):
                 enemies_killed += 1
             
             if hasattr(self.bot, 'interrupt_code') and self.bot.interrupt_code:
@@ -2593,48 +3231,33 @@ class Skills:
             "message": ""
         }
         
-        # 最も近いアイテムを取得する関数
-        def get_nearest_item():
-            nearest_item_list = []
-            
-            # bot.entities はエンティティの辞書やリストと仮定
-            for entity_id in self.bot.entities:
-                entity = self.bot.entities[entity_id]
-                if hasattr(entity, 'name') and entity.name == 'item':
-                    drop_item_name = self._get_item_name(self._get_item_id_from_entity(entity))
-                    if not item_name is None and item_name != drop_item_name:
-                        continue
-                    # 距離計算
-                    dx = self.bot.entity.position.x - entity.position.x
-                    dy = self.bot.entity.position.y - entity.position.y
-                    dz = self.bot.entity.position.z - entity.position.z
-                    current_distance = (dx*dx + dy*dy + dz*dz) ** 0.5
-                    
-                    if current_distance < distance:
-                        nearest_item_list.append(entity)
-            return nearest_item_list
-
-        # 最も近いアイテムを取得
-        nearest_item_list = get_nearest_item()
+        # 範囲内のドロップアイテムを近い順に取得
+        nearest_item_list = [
+            record for _, record in self._query_entities(distance, names={'item'})
+            if item_name is None or record.item == item_name
+        ]
         if nearest_item_list == []:
             result["message"] = "周囲のドロップアイテムはありません。"
             return result
         
         item_list = []
         for nearest_item in nearest_item_list:
+            # 既に拾われている（消滅した）アイテムは飛ばす
+            if self.entity_table.get(nearest_item.id) is None:
+                continue
             # アイテムに近づく
-            block_pos = self.bot.blockAt(nearest_item.position)
-            if block_pos:
-                move_result = await self.move_to_position(block_pos.position.x, block_pos.position.y, block_pos.position.z, 0.5)
-                if not move_result["success"]:
-                    break
+            move_result = await self.move_to_position(
+                math.floor(nearest_item.x), math.floor(nearest_item.y), math.floor(nearest_item.z), 0.5
+            )
+            if not move_result["success"]:
+                break
 
-            # アイテムIDを取得
-            item_id = self._get_item_id_from_entity(nearest_item)
-            item_name = self._get_item_name(item_id)
-            item_list.append(item_name)
-            # 少し待機してアイテムが拾われるのを待つ
-            await asyncio.sleep(0.2)
+            item_list.append(nearest_item.item)
+            # アイテムが拾われる（エンティティが消える）まで最大1秒待つ
+            for _ in range(10):
+                if self.entity_table.get(nearest_item.id) is None:
+                    break
+                await asyncio.sleep(0.1)
                 
         result["success"] = True
         item_str = ", ".join(item_list)
@@ -2719,7 +3342,7 @@ class Skills:
                     item_id = self.bot.heldItem.type
                             
                 # ブロックを採掘できるか確認
-                if hasattr(block, 'canHarvest') and not block.canHarvest(item_id):
+                if not self._can_harvest(block, item_id):
                     result["message"] = f"{block.name}を採掘するための適切なツールを持っていません"
                     result["error"] = "no_suitable_tool"
                     self.bot.chat(result["message"])
@@ -2902,11 +3525,7 @@ class Skills:
                 return result
             
             # クワを探して装備
-            hoe = None
-            for item in self.bot.inventory.items():
-                if 'hoe' in item.name:
-                    hoe = item
-                    break
+            hoe = self._find_inventory_item(lambda name: 'hoe' in name)
             if not hoe:
                 result["message"] = "クワを持っていないため耕せません。"
                 self.bot.chat(result["message"])
@@ -2944,11 +3563,7 @@ class Skills:
                     seed_type += 's'  # 一般的な間違いを修正
                     
                 # 種を探す
-                seeds = None
-                for item in self.bot.inventory.items():
-                    if item.name == seed_type:
-                        seeds = item
-                        break
+                seeds = self._find_inventory_item(seed_type)
                 if not seeds:
                     result["message"] = f"{seed_type}を持っていないため植えられません。" + \
                                        (f"座標({x}, {y}, {z})は耕しました。" if result["tilled"] else "")
@@ -3012,7 +3627,13 @@ class Skills:
             [[{'oak_planks': 4}, {'craftedCount': 1}], [{'spruce_planks': 4}, {'craftedCount': 1}]...]
         """
         self.bot.chat(f"{item_name}のクラフトレシピを取得します。")
-        item_id = self.mcdata.itemsByName[item_name].id
+        if self.recipes is not None:
+            found = self.recipes.get(item_name)
+            if not found:
+                return None
+            return [[dict(r.ingredients), {"craftedCount": r.count}] for r in found]
+
+        item_id = self._get_item_id(item_name)
         if item_id not in self.mcdata.recipes:
             return None
             
@@ -3028,7 +3649,7 @@ class Skills:
             for ingredient in ingredients:
                 if not ingredient:
                     continue
-                ingredient_name = self.mcdata.items[ingredient].name
+                ingredient_name = self._get_item_name(ingredient)
                 if ingredient_name not in recipe:
                     recipe[ingredient_name] = 0
                 recipe[ingredient_name] += 1
@@ -3086,7 +3707,7 @@ class Skills:
                 return result
             
             # 指定された液体ブロックを探す
-            block_id = self.mcdata.blocksByName[liquid_type].id
+            block_id = self._get_block_id(liquid_type)
             blocks = self.bot.findBlocks({
                 'matching': block_id,
                 'maxDistance': max_distance,
@@ -3209,11 +3830,7 @@ class Skills:
             result["position"] = {"x": x, "y": y, "z": z}
             
             # 液体入りバケツを探す
-            filled_bucket = None
-            
-            for item in self.bot.inventory.items():
-                if item.name == f"{liquid_type}_bucket":
-                    filled_bucket = item
+            filled_bucket = self._find_inventory_item(f"{liquid_type}_bucket")
             
             if not filled_bucket:
                 result["message"] = f"{liquid_type}_bucketを持っていないため液体を配置できません。"
@@ -3297,8 +3914,8 @@ class Skills:
         try:
             if hasattr(self.mcdata, 'makeItem'):
                 return self.mcdata.makeItem(item_name, count)
-            elif hasattr(self.mcdata, 'itemsByName') and item_name in self.mcdata.itemsByName:
-                item_id = self.mcdata.itemsByName[item_name].id
+            item_id = self._get_item_id(item_name)
+            if item_id is not None:
                 return {
                     'type': item_id,
                     'count': count,
@@ -3370,6 +3987,43 @@ class Skills:
         self.bot.equip(best_weapon, 'hand')
         return True
         
+    def _refresh_entities(self, max_age=0.05):
+        """
+        エンティティの索引を返します。イベントで更新されている場合はそのまま返し、
+        そうでない場合は entitySnapshot を1回呼び出して作り直します（直前の更新から max_age 秒以内であれば何もしません）。
+
+        Returns:
+            EntityTable: 更新後のエンティティの索引
+        """
+        if self.entity_table.attached:
+            return self.entity_table
+        now = time.monotonic()
+        if self._entities_refreshed_at is None or now - self._entities_refreshed_at >= max_age:
+            self.entity_table.load_snapshot(self.bridge.entitySnapshot(self.bot))
+            self._entities_refreshed_at = now
+        return self.entity_table
+
+    def _resolve_entity(self, entity):
+        """
+        EntityRecord に対応するJavaScriptのエンティティを返します。それ以外はそのまま返します。
+
+        Args:
+            entity: EntityRecord またはJavaScriptのエンティティ
+
+        Returns:
+            Entity or None: JavaScriptのエンティティ。既に存在しない場合はNone
+        """
+        if isinstance(entity, EntityRecord):
+            return self.bot.entities[entity.id]
+        return entity
+
+    def _query_entities(self, max_distance, names=None, hostile=None):
+        """BOTの位置を中心にエンティティを検索し、(距離, EntityRecord) のリストを近い順に返します。"""
+        table = self._refresh_entities()
+        if table.self_position is None:
+            return []
+        return table.query(table.self_position, max_distance, names=names, hostile=hostile)
+
     def _get_nearby_entity_of_type(self, entity_type, max_distance=24):
         """
         指定された種類の最も近いエンティティを取得します。
@@ -3379,13 +4033,12 @@ class Skills:
             max_distance (int): 検索する最大距離
             
         Returns:
-            Entity: 最も近いエンティティ、見つからない場合はNone
+            EntityRecord: 最も近いエンティティ、見つからない場合はNone
         """
         try:
-            entities = self._get_nearby_entities(max_distance)
-            for entity in entities:
-                if hasattr(entity, 'name') and entity.name == entity_type:
-                    return entity
+            found = self._query_entities(max_distance, names={entity_type})
+            if found:
+                return found[0][1]
         except Exception as e:
             print(f"エンティティ検索エラー: {e}")
             
@@ -3399,29 +4052,10 @@ class Skills:
             max_distance (int): 検索する最大距離。デフォルトは24
             
         Returns:
-            Entity or None: 最も近い敵対的なエンティティ。見つからない場合はNone
+            EntityRecord or None: 最も近い敵対的なエンティティ。見つからない場合はNone
         """
-        def calculate_distance(pos1, pos2):
-            """2点間のユークリッド距離を計算"""
-            return ((pos1.x - pos2.x) ** 2 + 
-                   (pos1.y - pos2.y) ** 2 + 
-                   (pos1.z - pos2.z) ** 2) ** 0.5
-
-        # 敵対的なエンティティをフィルタリング
-        hostile_entities = [
-            entity for entity in self._get_nearby_entities(max_distance)
-            if self._is_hostile(entity)
-        ]
-        
-        if not hostile_entities:
-            return None
-            
-        # 距離でソート
-        hostile_entities.sort(
-            key=lambda e: calculate_distance(self.bot.entity.position, e.position)
-        )
-        
-        return hostile_entities[0] if hostile_entities else None
+        found = self._query_entities(max_distance, hostile=True)
+        return found[0][1] if found else None
         
     def _get_nearby_entities(self, max_distance=24):
         """
@@ -3431,45 +4065,18 @@ class Skills:
             max_distance (int): 検索する最大距離。デフォルトは24
             
         Returns:
-            list: 距離順にソートされた近くのエンティティのリスト
+            list: 距離順にソートされた近くのエンティティ（EntityRecord）のリスト
         """
-        if not self.bot or not self.bot.entity or not hasattr(self.bot.entity, 'position'):
+        if not self.bot:
             return []
-            
-        def calculate_distance(pos1, pos2):
-            """2点間のユークリッド距離を計算"""
-            return ((pos1.x - pos2.x) ** 2 + 
-                   (pos1.y - pos2.y) ** 2 + 
-                   (pos1.z - pos2.z) ** 2) ** 0.5
-            
-        nearby_entities = []
-        # JavaScriptのオブジェクトとして実装されているentitiesをキーで反復処理
-        for entity_id in self.bot.entities:
-            entity = self.bot.entities[entity_id]
-            if not entity or not hasattr(entity, 'id'):  # エンティティがNoneの場合はスキップ
-                continue
-                
-            if entity.id == self.bot.entity.id:  # 自分自身は除外
-                continue
-                
-            if hasattr(entity, 'position') and entity.position:
-                distance = calculate_distance(self.bot.entity.position, entity.position)
-                if distance <= max_distance:
-                    nearby_entities.append(entity)
-                
-        # 距離でソート
-        nearby_entities.sort(
-            key=lambda e: calculate_distance(self.bot.entity.position, e.position)
-        )
-        
-        return nearby_entities
+        return [record for _, record in self._query_entities(max_distance)]
         
     def _is_entity_nearby(self, entity, max_distance=24):
         """
         特定のエンティティが近くにいるか確認します。
         
         Args:
-            entity: 確認するエンティティ
+            entity: 確認するエンティティ（EntityRecord またはJavaScriptのエンティティ）
             max_distance (int): 検索する最大距離
             
         Returns:
@@ -3478,12 +4085,15 @@ class Skills:
         # エンティティが有効かチェック
         if not entity or not hasattr(entity, 'id'):
             return False
-            
-        entities = self._get_nearby_entities(max_distance)
-        for e in entities:
-            if hasattr(e, 'id') and e.id == entity.id:
-                return True
-        return False
+
+        table = self._refresh_entities()
+        record = table.get(entity.id)
+        if record is None or table.self_position is None:
+            return False
+        # 死亡済み（消滅待ち）のエンティティは query() と同じく居ないものとして扱う
+        if record.health is not None and record.health <= 0:
+            return False
+        return record.distance_to(*table.self_position) <= max_distance
     
     def _is_hostile(self, entity):
         """
@@ -3495,17 +4105,8 @@ class Skills:
         Returns:
             bool: 敵対的な場合はTrue
         """
-        hostile_mobs = [
-            'zombie', 'skeleton', 'creeper', 'spider', 'enderman', 
-            'witch', 'slime', 'silverfish', 'cave_spider', 'ghast',
-            'zombie_pigman', 'blaze', 'magma_cube', 'wither_skeleton',
-            'guardian', 'elder_guardian', 'shulker', 'husk', 'stray',
-            'phantom', 'drowned', 'pillager', 'ravager', 'vex',
-            'evoker', 'vindicator', 'hoglin', 'zoglin', 'piglin_brute'
-        ]
-        
         try:
-            return entity.name in hostile_mobs
+            return entity.name in HOSTILE_MOBS
         except:
             return False
         
@@ -3550,9 +4151,8 @@ class Skills:
                      'oak_log', 'spruce_log', 'birch_log', 'jungle_log', 'acacia_log', 'dark_oak_log']
                      
         for fuel_type in fuel_types:
-            for item in self.bot.inventory.items():
-                if item.name == fuel_type:
-                    return item
+            if self._count_item(fuel_type) > 0:
+                return self._find_inventory_item(fuel_type)
                     
         return None
         
@@ -3566,6 +4166,8 @@ class Skills:
         Returns:
             str: アイテム名。IDが見つからない場合はNone
         """
+        if self.registry is not None:
+            return self.registry.item_name(item_id)
         item = self.mcdata.items[item_id]
         
         if item:
@@ -3582,6 +4184,8 @@ class Skills:
         Returns:
             int: アイテムID
         """
+        if self.registry is not None:
+            return self.registry.item_id(item_name)
         try:
             if hasattr(self.mcdata, 'itemsByName') and item_name in self.mcdata.itemsByName:
                 return self.mcdata.itemsByName[item_name].id
@@ -3593,6 +4197,30 @@ class Skills:
         # アイテムが見つからない場合はエラー
         return None
     
+    def _get_block_id(self, block_name):
+        """
+        ブロック名からブロックIDを取得します。
+        
+        Args:
+            block_name (str): ブロック名
+            
+        Returns:
+            int: ブロックID。見つからない場合はNone
+        """
+        if self.block_states is not None:
+            return self.block_states.block_id_by_name.get(block_name)
+        block = self.mcdata.blocksByName[block_name]
+        return block.id if block else None
+
+    def _can_harvest(self, block, item_id):
+        """
+        item_id のアイテム（素手なら None）でブロックを回収できるかを返します。
+        レジストリ表の適正ツールで判定し、ブリッジ経由の block.canHarvest を呼びません。
+        """
+        if self.registry is not None:
+            return self.registry.can_harvest(block.name, item_id)
+        return block.canHarvest(item_id)
+
     def _get_item_id_from_entity(self, entity):
         """
         エンティティからアイテムIDを取得します。
@@ -3644,6 +4272,14 @@ class Skills:
                 self.pathfinder = self.discovery.pathfinder
                 self.movements = self.discovery.movements
                 self.mineflayer = self.discovery.mineflayer
+                self._load_registry()
+                self._load_recipes()
+                # 新しいbotのワールドイベントを購読し直す
+                self._attach_world_cache()
+                self._attach_entity_table()
+                self._attach_inventory()
+                self._movements_cache.clear()
+                self.path_status_cache.clear()
                 print("Skillsクラス内の参照を更新しました。")
             else:
                 result["message"] = f"サーバーへの再接続に失敗しました（タイムアウト: {timeout}秒）。サーバーの状態を確認してください。"
@@ -0,0 +1,130 @@
+import asyncio
+import math
+import time
+
+# かまどで1個精錬するのにかかるティック数（1秒 = 20ティック）
+SMELT_TICKS = 200
+TICKS_PER_SECOND = 20
+
+# 燃料1個で精錬できるアイテムの数
+FUEL_BURN = {
+    'coal': 8, 'charcoal': 8, 'coal_block': 80, 'lava_bucket': 100, 'blaze_rod': 12,
+    'oak_planks': 1.5, 'spruce_planks': 1.5, 'birch_planks': 1.5, 'jungle_planks': 1.5,
+    'acacia_planks': 1.5, 'dark_oak_planks': 1.5,
+    'oak_log': 1.5, 'spruce_log': 1.5, 'birch_log': 1.5, 'jungle_log': 1.5,
+    'acacia_log': 1.5, 'dark_oak_log': 1.5,
+}
+
+
+def fuel_needed(fuel_name, count):
+    """count 個を精錬するのに必要な燃料 fuel_name の個数を返します。"""
+    return math.ceil(count / FUEL_BURN.get(fuel_name, 1))
+
+
+class FurnaceAssignment:
+    """1つのかまどに割り当てた精錬の内容です。"""
+
+    __slots__ = ("position", "count", "expected_tick", "collected", "placed")
+
+    def __init__(self, position, count, expected_tick, placed=False):
+        self.position = position
+        self.count = count
+        self.expected_tick = expected_tick
+        self.collected = 0
+        self.placed = placed
+
+    @property
+    def done(self):
+        return self.collected >= self.count
+
+
+class SmeltingJob:
+    """
+    start_smelting が返す精錬ジョブのハンドルです。
+    材料は複数のかまどに分けて投入済みで、各かまどの完了予定ティック（1個あたり200ティック）を保持します。
+    精錬の待ち時間はBOTを拘束しないため、その間に別の作業を行えます。
+    完成品は collect_smelting で回収します。
+
+    Example:
+        >>> job = (await skills.start_smelting('raw_iron', 8))["job"]
+        >>> await skills.collect_block('oak_log', 4)   # 精錬中に別の作業を行う
+        >>> await job.wait()                            # 完了予定まで待つ
+        >>> await skills.collect_smelting(job)
+    """
+
+    def __init__(self, item_name, start_tick, assignments, started_at=None):
+        self.item_name = item_name
+        self.start_tick = start_tick
+        self.assignments = assignments
+        self.smelted_item_name = None
+        # start_tick を取得した時点の time.monotonic()。現在のティックの推定に使います
+        self._started_at = started_at if started_at is not None else time.monotonic()
+
+    @property
+    def count(self):
+        """投入した材料の合計数を返します。"""
+        return sum(a.count for a in self.assignments)
+
+    @property
+    def collected(self):
+        """回収済みの完成品の合計数を返します。"""
+        return sum(a.collected for a in self.assignments)
+
+    @property
+    def expected_tick(self):
+        """全てのかまどの精錬が終わる予定のティック（ワールドの経過ティック）を返します。"""
+        return max((a.expected_tick for a in self.assignments), default=self.start_tick)
+
+    def current_tick(self):
+        """ジョブ開始時のティックと経過時間から、現在のティックを推定します。"""
+        return self.start_tick + int((time.monotonic() - self._started_at) * TICKS_PER_SECOND)
+
+    def remaining_seconds(self, assignment=None):
+        """精錬が終わるまでの残り秒数の目安を返します。assignment を指定するとそのかまどの分を返します。"""
+        tick = assignment.expected_tick if assignment is not None else self.expected_tick
+        return max(0.0, (tick - self.current_tick()) / TICKS_PER_SECOND)
+
+    def is_ready(self):
+        """全てのかまどで完了予定ティックを過ぎたかを返します。"""
+        return self.remaining_seconds() == 0
+
+    def done(self):
+        """全ての完成品を回収済みかを返します。"""
+        return all(a.done for a in self.assignments)
+
+    async def wait(self, timeout=None):
+        """
+        完了予定ティックまで待機します。
+
+        Args:
+            timeout (float, optional): 最大待機秒数
+
+        Returns:
+            bool: 完了予定を過ぎていればTrue、timeout で打ち切った場合はFalse
+        """
+        remaining = self.remaining_seconds()
+        if timeout is not None and remaining > timeout:
+            await asyncio.sleep(timeout)
+            return False
+        await asyncio.sleep(remaining)
+        return True
+
+    def to_dict(self):
+        return {
+            "item_name": self.item_name,
+            "count": self.count,
+            "collected": self.collected,
+            "remaining_seconds": round(self.remaining_seconds(), 1),
+            "furnaces": [
+                {
+                    "position": {"x": a.position[0], "y": a.position[1], "z": a.position[2]},
+                    "count": a.count,
+                    "collected": a.collected,
+                    "remaining_seconds": round(self.remaining_seconds(a), 1),
+                }
+                for a in self.assignments
+            ],
+        }
+
+    def __repr__(self):
+        return f"SmeltingJob(item_name={self.item_name!r}, collected={self.collected}/{self.count}, remaining={self.remaining_seconds():.0f}s)"
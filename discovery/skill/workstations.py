@@ -0,0 +1,132 @@
+import json
+import math
+import os
+import threading
+
+from .registry import cache_dir
+
+# 位置を記録する作業用ブロック
+WORKSTATION_KINDS = frozenset(['crafting_table', 'furnace', 'chest'])
+
+# 設置した作業用ブロックを使用後にどうするか。"keep" はその場に残し、"collect" は従来通り回収します
+WORKSTATION_POLICY = os.environ.get('DISCOVERY_WORKSTATION_POLICY', 'keep')
+
+
+class WorkstationRegistry:
+    """
+    BOTが設置した、または見つけた作業台・かまど・チェストの位置を、ワールドごとに保持します。
+    内容はディスクに保存し、再起動後も同じワールドであれば使い続けます。
+    記録はブロックの状態と照合し、別のブロックに変わっていたものは参照時に削除します。
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir(), 'workstations.json')
+        # {world: {(x, y, z): {"kind": str, "placed": bool}}}
+        self._stations = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=None):
+        """保存済みの記録を読み込みます。読み込めない場合は空の状態で作成します。"""
+        registry = cls(path)
+        if os.path.exists(registry.path):
+            try:
+                with open(registry.path, encoding='utf-8') as f:
+                    payload = json.load(f)
+                for world, rows in payload.items():
+                    registry._stations[world] = {
+                        (x, y, z): {"kind": kind, "placed": placed} for x, y, z, kind, placed in rows
+                    }
+            except Exception as e:
+                print(f"作業用ブロックの記録を読み込めませんでした。空の状態から始めます: {e}")
+        return registry
+
+    def save(self):
+        """記録をディスクに保存します。"""
+        with self._lock:
+            payload = {
+                world: [[x, y, z, info["kind"], info["placed"]] for (x, y, z), info in stations.items()]
+                for world, stations in self._stations.items()
+            }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"作業用ブロックの記録を保存できませんでした（無視します）: {e}")
+
+    # --- 更新 ---
+
+    def remember(self, world, kind, position, placed=False):
+        """
+        作業用ブロックの位置を記録します。既に記録済みで内容が同じ場合は保存しません。
+
+        Args:
+            world (str): ワールドを識別する文字列
+            kind (str): ブロック名（WORKSTATION_KINDS のいずれか）
+            position (tuple): 座標 (x, y, z)
+            placed (bool): BOTが設置したものか
+        """
+        if kind not in WORKSTATION_KINDS:
+            return
+        key = tuple(int(math.floor(v)) for v in position)
+        with self._lock:
+            stations = self._stations.setdefault(world, {})
+            previous = stations.get(key)
+            if previous is not None and previous["kind"] == kind and (previous["placed"] or not placed):
+                return
+            stations[key] = {"kind": kind, "placed": placed or bool(previous and previous["placed"])}
+        self.save()
+
+    def forget(self, world, position):
+        """記録を削除します。"""
+        key = tuple(int(math.floor(v)) for v in position)
+        with self._lock:
+            removed = self._stations.get(world, {}).pop(key, None)
+        if removed is not None:
+            self.save()
+
+    # --- 参照 ---
+
+    def nearest(self, world, kind, center, max_distance, verify=None):
+        """
+        記録されている作業用ブロックのうち、center から近い順に (x, y, z, 距離) のリストを返します。
+
+        Args:
+            world (str): ワールドを識別する文字列
+            kind (str): ブロック名
+            center (tuple): 検索の中心座標 (x, y, z)
+            max_distance (float): 検索する最大距離
+            verify (callable, optional): (座標, ブロック名) を受け取り、ブロックが残っていればTrue、
+                                         別のブロックに変わっていればFalse、確認できなければNoneを返す関数。
+                                         Falseになった記録は削除します。
+
+        Returns:
+            list: (x, y, z, 距離) のリスト
+        """
+        with self._lock:
+            candidates = [
+                (position, math.dist(position, center))
+                for position, info in self._stations.get(world, {}).items()
+                if info["kind"] == kind
+            ]
+        found = []
+        stale = []
+        for position, distance in sorted(candidates, key=lambda c: c[1]):
+            if distance > max_distance:
+                break
+            if verify is not None and verify(position, kind) is False:
+                stale.append(position)
+                continue
+            found.append((*position, distance))
+        for position in stale:
+            self.forget(world, position)
+        return found
+
+    def is_placed(self, world, position):
+        """BOTが設置したものとして記録されているかを返します。"""
+        key = tuple(int(math.floor(v)) for v in position)
+        info = self._stations.get(world, {}).get(key)
+        return bool(info and info["placed"])
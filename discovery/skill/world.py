@@ -0,0 +1,634 @@
+import base64
+import json
+import math
+import threading
+import numpy as np
+
+
+def _window_sums(array, size):
+    """
+    3次元配列の、大きさ size の全ての窓の合計を累積和（summed-area table）で一括計算します。
+
+    Args:
+        array (np.ndarray): 3次元配列
+        size (tuple): 窓の大きさ (X, Y, Z)
+
+    Returns:
+        np.ndarray: [i, j, k] が array[i:i+X, j:j+Y, k:k+Z] の合計となる配列
+    """
+    sx, sy, sz = array.shape
+    table = np.zeros((sx + 1, sy + 1, sz + 1), dtype=np.int32)
+    table[1:, 1:, 1:] = array.cumsum(axis=0, dtype=np.int32).cumsum(axis=1).cumsum(axis=2)
+    X, Y, Z = size
+    return (table[X:, Y:, Z:] - table[:-X, Y:, Z:] - table[X:, :-Y, Z:] - table[X:, Y:, :-Z]
+            + table[:-X, :-Y, Z:] + table[:-X, Y:, :-Z] + table[X:, :-Y, :-Z] - table[:-X, :-Y, :-Z])
+
+
+class BlockVolume:
+    """
+    直方体範囲のブロックを、パレット（ブロック名のリスト）と uint16 のインデックス配列で保持します。
+    indices[dx, dy, dz] が origin + (dx, dy, dz) の位置のブロックを表します。
+    未ロード領域のブロック名は None です。
+    """
+
+    def __init__(self, origin, palette, indices):
+        self.origin = tuple(int(v) for v in origin)
+        self.palette = list(palette)
+        self.indices = indices
+
+    @classmethod
+    def from_json(cls, raw):
+        """
+        bridge.js の scanCuboid が返すJSON文字列から BlockVolume を作成します。
+
+        Args:
+            raw (str): scanCuboid の戻り値
+
+        Returns:
+            BlockVolume: 取得したブロック範囲
+        """
+        payload = json.loads(raw)
+        data = np.frombuffer(base64.b64decode(payload["data"]), dtype="<u2")
+        indices = data.reshape(payload["shape"])
+        return cls(payload["origin"], payload["palette"], indices)
+
+    @property
+    def shape(self):
+        return self.indices.shape
+
+    def palette_ids(self, names):
+        """指定されたブロック名に対応するパレットIDの配列を返します。"""
+        names = {names} if isinstance(names, str) else set(names)
+        return np.array([i for i, name in enumerate(self.palette) if name in names], dtype=np.uint16)
+
+    def mask(self, names):
+        """指定されたブロック名の位置を True とする bool 配列を返します。"""
+        return np.isin(self.indices, self.palette_ids(names))
+
+    def offsets(self, center):
+        """
+        各セルの center からの相対座標 (dx, dy, dz) をブロードキャスト可能な配列で返します。
+
+        Args:
+            center (tuple): 基準となるブロック座標 (x, y, z)
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: 各軸の相対座標
+        """
+        sx, sy, sz = self.shape
+        dx = np.arange(sx).reshape(sx, 1, 1) + (self.origin[0] - center[0])
+        dy = np.arange(sy).reshape(1, sy, 1) + (self.origin[1] - center[1])
+        dz = np.arange(sz).reshape(1, 1, sz) + (self.origin[2] - center[2])
+        return dx, dy, dz
+
+    def to_block_list(self, exclude=("air", None)):
+        """
+        従来の _get_surrounding_blocks と同じ形式のリストに変換します。
+
+        Args:
+            exclude (tuple): 除外するブロック名。デフォルトは空気と未ロード領域。
+
+        Returns:
+            list: {'name': ブロック名, 'position': {'x', 'y', 'z'}} のリスト
+        """
+        keep = np.array([name not in exclude for name in self.palette], dtype=bool)
+        if not keep.any():
+            return []
+        xs, ys, zs = np.nonzero(keep[self.indices])
+        ids = self.indices[xs, ys, zs]
+        ox, oy, oz = self.origin
+        return [
+            {'name': self.palette[i], 'position': {'x': ox + x, 'y': oy + y, 'z': oz + z}}
+            for i, x, y, z in zip(ids.tolist(), xs.tolist(), ys.tolist(), zs.tolist())
+        ]
+
+
+    def classify_directions(self, center, exclude=("air", None)):
+        """
+        範囲内のブロックを center から見た方向（前後左右と中心）ごとに分類し、ブロック名の一覧を返します。
+        前は +Z 方向で、判定は 中心 → 前 → 右 → 後ろ → 左 の順に行います（境界のセルは先に判定された方向に入ります）。
+
+        Args:
+            center (tuple): 基準となるブロック座標 (x, y, z)。y は分類に使用しません。
+            exclude (tuple): 除外するブロック名。デフォルトは空気と未ロード領域。
+
+        Returns:
+            dict: front_blocks / right_blocks / back_blocks / left_blocks / center_blocks をキーとした、
+                  重複のないソート済みブロック名のリスト
+        """
+        dx, _, dz = self.offsets(center)
+        abs_dx, abs_dz = np.abs(dx), np.abs(dz)
+        remaining = np.ones((dx.shape[0], dz.shape[2]), dtype=bool)
+        conditions = [
+            ("center_blocks", (dx == 0) & (dz == 0)),
+            ("front_blocks", (dz > 0) & (abs_dx <= dz)),
+            ("right_blocks", (dx > 0) & (abs_dz <= dx)),
+            ("back_blocks", (dz < 0) & (abs_dx <= abs_dz)),
+            ("left_blocks", (dx < 0) & (abs_dz <= abs_dx)),
+        ]
+        # 方向の判定は水平面 (x, z) だけで決まるので、2次元のマスクを作ってから y 方向に適用する
+        masks = {}
+        for key, condition in conditions:
+            mask = condition[:, 0, :] & remaining
+            remaining &= ~mask
+            masks[key] = mask
+
+        keep = np.array([name not in exclude for name in self.palette], dtype=bool)
+        result = {}
+        for key in ("front_blocks", "right_blocks", "back_blocks", "left_blocks", "center_blocks"):
+            ids = np.unique(self.indices.transpose(0, 2, 1)[masks[key]])
+            result[key] = sorted(self.palette[i] for i in ids.tolist() if keep[i])
+        return result
+
+class BlockStateTable:
+    """
+    bridge.js の blockStates が返すステートID表を、ステートIDで引ける配列として保持します。
+    """
+
+    def __init__(self, rows):
+        max_block = max(row[0] for row in rows)
+        max_state = max(row[3] for row in rows)
+        self.names = [None] * (max_block + 1)
+        self.diggable = np.zeros(max_block + 1, dtype=bool)
+        self.solid = np.zeros(max_block + 1, dtype=bool)
+        self.block_of_state = np.zeros(max_state + 1, dtype=np.int32)
+        self.states_by_name = {}
+        self.block_id_by_name = {}
+        for block_id, name, min_state, max_state, diggable, solid in rows:
+            self.names[block_id] = name
+            self.block_id_by_name[name] = block_id
+            self.diggable[block_id] = diggable
+            self.solid[block_id] = solid
+            self.block_of_state[min_state:max_state + 1] = block_id
+            self.states_by_name[name] = np.arange(min_state, max_state + 1, dtype=np.int32)
+        self.air_state = int(self.states_by_name["air"][0]) if "air" in self.states_by_name else 0
+
+    @classmethod
+    def from_json(cls, raw):
+        """bridge.js の blockStates の戻り値から BlockStateTable を作成します。"""
+        return cls(json.loads(raw))
+
+    def __contains__(self, name):
+        return name in self.states_by_name
+
+    def states(self, names):
+        """
+        ブロック名（またはそのリスト）に対応するステートIDの配列を返します。
+
+        Args:
+            names (str or list): ブロック名
+
+        Returns:
+            np.ndarray: ステートIDの配列（該当なしの場合は空配列）
+        """
+        names = [names] if isinstance(names, str) else list(names)
+        found = [self.states_by_name[name] for name in names if name in self.states_by_name]
+        if not found:
+            return np.empty(0, dtype=np.int32)
+        return np.concatenate(found)
+
+    def resolve(self, names):
+        """
+        ブロック名・ブロック名のリスト・タグを、存在するブロック名のリストに展開します。
+        タグは "#log" のように # で始め、名前そのもの、または "_log" で終わる全てのブロックに一致します。
+
+        Args:
+            names (str or list): ブロック名またはタグ
+
+        Returns:
+            list: 重複のないブロック名のリスト（存在しない名前は含みません）
+        """
+        names = [names] if isinstance(names, str) else list(names)
+        resolved = []
+        for name in names:
+            if not isinstance(name, str):
+                continue
+            if name.startswith("#"):
+                suffix = name[1:]
+                matches = [n for n in self.states_by_name if n == suffix or n.endswith("_" + suffix)]
+            else:
+                matches = [name] if name in self.states_by_name else []
+            resolved.extend(n for n in matches if n not in resolved)
+        return resolved
+
+    def block_ids(self, names):
+        """ブロック名のリストに対応するブロックIDのリストを返します。"""
+        return [self.block_id_by_name[name] for name in names if name in self.block_id_by_name]
+
+    def name_of(self, state):
+        """ステートIDからブロック名を返します。None（未ロード）の場合は None を返します。"""
+        if state is None or state < 0 or state >= len(self.block_of_state):
+            return None
+        return self.names[self.block_of_state[state]]
+
+
+class _Section:
+    """16x16x16 のセクション。palette はステートID、data は palette へのインデックスで [x, y, z] 順です。"""
+
+    __slots__ = ("palette", "data")
+
+    def __init__(self, palette, data):
+        self.palette = palette
+        self.data = data
+
+    def dense(self):
+        return self.palette[self.data]
+
+    def set(self, x, y, z, state):
+        hits = np.nonzero(self.palette == state)[0]
+        if len(hits):
+            index = hits[0]
+        else:
+            index = len(self.palette)
+            self.palette = np.append(self.palette, np.int32(state))
+            if index > 255 and self.data.dtype == np.uint8:
+                self.data = self.data.astype(np.uint16)
+        self.data[x, y, z] = index
+
+
+class _Column:
+    __slots__ = ("min_y", "sections", "revision")
+
+    def __init__(self, min_y, sections):
+        self.min_y = min_y
+        self.sections = sections
+        self.revision = 0
+
+
+class WorldCache:
+    """
+    ロード済みチャンクのブロックをPython側に保持するキャッシュです。
+    bridge.js の attachWorldFeed から chunkColumnLoad / chunkColumnUnload / blockUpdate を受け取って更新するため、
+    ブロックの検索をブリッジを介さずに配列の参照だけで行えます。
+    イベントはブリッジのスレッドから届くので、更新と参照はロックで保護しています。
+    """
+
+    def __init__(self, states):
+        self.states = states
+        self._columns = {}
+        self._lock = threading.Lock()
+        self._handle = None
+        self._callback = None
+
+    # --- イベントの受信 ---
+
+    def attach(self, bot, bridge):
+        """
+        bot のワールドイベントの購読を開始します。ロード済みのチャンクもこの時点で取り込まれます。
+
+        Args:
+            bot: Mineflayer の bot
+            bridge: require した bridge.js
+        """
+        self.detach()
+
+        def on_event(kind, *args):
+            try:
+                if kind == "load":
+                    self.load_column(json.loads(args[0]))
+                elif kind == "unload":
+                    self.unload_column(int(args[0]), int(args[1]))
+                elif kind == "blocks":
+                    self.apply_block_updates(json.loads(args[0]))
+            except Exception as e:
+                print(f"ワールドキャッシュの更新中にエラーが発生しました: {e}")
+
+        # コールバックへの参照を保持しておかないとGCで回収されるため、属性に保存します
+        self._callback = on_event
+        self._handle = bridge.attachWorldFeed(bot, on_event)
+
+    def detach(self):
+        """ワールドイベントの購読を解除し、キャッシュを空にします。"""
+        if self._handle is not None:
+            try:
+                self._handle.detach()
+            except Exception as e:
+                print(f"ワールドキャッシュの購読解除に失敗しました（無視します）: {e}")
+        self._handle = None
+        self._callback = None
+        with self._lock:
+            self._columns.clear()
+
+    def load_column(self, payload):
+        """dumpColumn 形式の辞書からチャンク列を取り込みます。"""
+        sections = []
+        for section in payload["sections"]:
+            if section is None:
+                sections.append(None)
+                continue
+            dtype = np.uint8 if section["bits"] == 8 else "<u2"
+            data = np.frombuffer(base64.b64decode(section["data"]), dtype=dtype).reshape(16, 16, 16).copy()
+            sections.append(_Section(np.array(section["palette"], dtype=np.int32), data))
+        column = _Column(int(payload["minY"]), sections)
+        with self._lock:
+            previous = self._columns.get((payload["x"], payload["z"]))
+            if previous is not None:
+                column.revision = previous.revision + 1
+            self._columns[(payload["x"], payload["z"])] = column
+
+    def unload_column(self, chunk_x, chunk_z):
+        with self._lock:
+            self._columns.pop((chunk_x, chunk_z), None)
+
+    def apply_block_updates(self, flat):
+        """[x, y, z, stateId, ...] 形式のブロック更新を反映します。"""
+        with self._lock:
+            for i in range(0, len(flat), 4):
+                self._set_state(flat[i], flat[i + 1], flat[i + 2], flat[i + 3])
+
+    def _set_state(self, x, y, z, state):
+        column = self._columns.get((x >> 4, z >> 4))
+        if column is None:
+            return
+        index = (y - column.min_y) >> 4
+        if index < 0 or index >= len(column.sections):
+            return
+        section = column.sections[index]
+        if section is None:
+            if state == self.states.air_state:
+                return
+            section = _Section(np.array([self.states.air_state], dtype=np.int32), np.zeros((16, 16, 16), dtype=np.uint8))
+            column.sections[index] = section
+        section.set(x & 15, (y - column.min_y) & 15, z & 15, state)
+        column.revision += 1
+
+    # --- 参照 ---
+
+    def is_loaded(self, x, z):
+        """ブロック座標 (x, z) を含むチャンク列がキャッシュされているかを返します。"""
+        return (math.floor(x) >> 4, math.floor(z) >> 4) in self._columns
+
+    def column_revision(self, chunk_x, chunk_z):
+        """チャンク列の更新回数を返します。未ロードの場合は None です。"""
+        column = self._columns.get((chunk_x, chunk_z))
+        return None if column is None else column.revision
+
+    def state_at(self, x, y, z):
+        """
+        指定座標のステートIDを返します。
+
+        Returns:
+            int or None: ステートID。未ロード領域またはワールドの高さ範囲外の場合は None
+        """
+        x, y, z = math.floor(x), math.floor(y), math.floor(z)
+        with self._lock:
+            column = self._columns.get((x >> 4, z >> 4))
+            if column is None:
+                return None
+            index = (y - column.min_y) >> 4
+            if index < 0 or index >= len(column.sections):
+                return None
+            section = column.sections[index]
+            if section is None:
+                return self.states.air_state
+            return int(section.palette[section.data[x & 15, (y - column.min_y) & 15, z & 15]])
+
+    def name_at(self, x, y, z):
+        """指定座標のブロック名を返します。未ロード領域の場合は None です。"""
+        return self.states.name_of(self.state_at(x, y, z))
+
+    def _state_grid(self, origin, shape):
+        """origin から shape の範囲のステートIDを int32 配列で返します。未ロード領域は -1 です。"""
+        x0, y0, z0 = origin
+        sx, sy, sz = shape
+        grid = np.full(shape, -1, dtype=np.int32)
+        with self._lock:
+            for cx in range(x0 >> 4, ((x0 + sx - 1) >> 4) + 1):
+                for cz in range(z0 >> 4, ((z0 + sz - 1) >> 4) + 1):
+                    column = self._columns.get((cx, cz))
+                    if column is None:
+                        continue
+                    ax0, ax1 = max(x0, cx * 16), min(x0 + sx, cx * 16 + 16)
+                    az0, az1 = max(z0, cz * 16), min(z0 + sz, cz * 16 + 16)
+                    first = max(y0 - column.min_y, 0) >> 4
+                    last = min((y0 + sy - 1 - column.min_y) >> 4, len(column.sections) - 1)
+                    for index in range(first, last + 1):
+                        base_y = column.min_y + index * 16
+                        ay0, ay1 = max(y0, base_y), min(y0 + sy, base_y + 16)
+                        target = grid[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0, az0 - z0:az1 - z0]
+                        section = column.sections[index]
+                        if section is None:
+                            target[...] = self.states.air_state
+                        else:
+                            target[...] = section.palette[section.data[
+                                ax0 - cx * 16:ax1 - cx * 16, ay0 - base_y:ay1 - base_y, az0 - cz * 16:az1 - cz * 16
+                            ]]
+        return grid
+
+    def volume(self, center, x_distance, y_distance, z_distance):
+        """
+        center を中心とした直方体範囲を BlockVolume として返します。
+
+        Args:
+            center (tuple): 中心のブロック座標 (x, y, z)
+            x_distance (int): X方向の距離
+            y_distance (int): Y方向の距離
+            z_distance (int): Z方向の距離
+
+        Returns:
+            BlockVolume or None: 範囲内のブロック。中心のチャンクがキャッシュされていない場合は None
+        """
+        if not self.is_loaded(center[0], center[2]):
+            return None
+        origin = (center[0] - x_distance, center[1] - y_distance, center[2] - z_distance)
+        shape = (2 * x_distance + 1, 2 * y_distance + 1, 2 * z_distance + 1)
+        grid = self._state_grid(origin, shape)
+        states, inverse = np.unique(grid, return_inverse=True)
+        palette = [self.states.name_of(int(state)) for state in states]
+        return BlockVolume(origin, palette, inverse.reshape(shape).astype(np.uint16))
+
+    def find_nearest(self, state_ids, center, max_distance, count=1):
+        """
+        指定したステートIDのブロックを center から近い順に最大 count 個返します。
+        セクションを距離順に調べ、パレットに対象が含まれないセクションは読み飛ばします。
+
+        Args:
+            state_ids (np.ndarray): 探すブロックのステートID
+            center (tuple): 探索の中心座標 (x, y, z)（小数可）
+            max_distance (float): 探索する最大距離
+            count (int): 返す最大個数
+
+        Returns:
+            list or None: (x, y, z, 距離) のリスト。中心のチャンクがキャッシュされていない場合は None
+        """
+        if not self.is_loaded(center[0], center[2]):
+            return None
+        state_ids = np.asarray(state_ids, dtype=np.int32)
+        if len(state_ids) == 0 or count <= 0:
+            return []
+        cx, cy, cz = (float(v) for v in center)
+        match_air = bool(np.isin(self.states.air_state, state_ids))
+        # 空気のみのセクション（None）を対象にする場合の全セル座標
+        all_cells = np.nonzero(np.ones((16, 16, 16), dtype=bool))
+
+        with self._lock:
+            # 範囲内のセクションを、中心からセクションまでの最短距離の順に並べる
+            candidates = []
+            for (chunk_x, chunk_z), column in self._columns.items():
+                ddx = max(chunk_x * 16 - cx, 0, cx - (chunk_x * 16 + 16))
+                ddz = max(chunk_z * 16 - cz, 0, cz - (chunk_z * 16 + 16))
+                horizontal = ddx * ddx + ddz * ddz
+                if horizontal > max_distance * max_distance:
+                    continue
+                for index, section in enumerate(column.sections):
+                    if section is None and not match_air:
+                        continue
+                    base_y = column.min_y + index * 16
+                    ddy = max(base_y - cy, 0, cy - (base_y + 16))
+                    box = math.sqrt(horizontal + ddy * ddy)
+                    if box <= max_distance:
+                        candidates.append((box, chunk_x, chunk_z, base_y, section))
+            candidates.sort(key=lambda c: c[0])
+
+            found = []
+            for box, chunk_x, chunk_z, base_y, section in candidates:
+                if len(found) >= count:
+                    found.sort(key=lambda f: f[3])
+                    del found[count:]
+                    if found[-1][3] <= box:
+                        break
+                if section is None:
+                    xs, ys, zs = all_cells
+                else:
+                    hit = np.isin(section.palette, state_ids)
+                    if not hit.any():
+                        continue
+                    xs, ys, zs = np.nonzero(hit[section.data])
+                wx = xs + chunk_x * 16
+                wy = ys + base_y
+                wz = zs + chunk_z * 16
+                dist = np.sqrt((wx - cx) ** 2 + (wy - cy) ** 2 + (wz - cz) ** 2)
+                keep = dist <= max_distance
+                if not keep.any():
+                    continue
+                order = np.argsort(dist[keep])[:count]
+                for x, y, z, d in zip(wx[keep][order].tolist(), wy[keep][order].tolist(),
+                                      wz[keep][order].tolist(), dist[keep][order].tolist()):
+                    found.append((x, y, z, d))
+
+        found.sort(key=lambda f: f[3])
+        return found[:count]
+
+    def _loaded_extent(self, center):
+        """center からキャッシュ済みの最も遠いチャンク列までの水平距離を返します。"""
+        with self._lock:
+            keys = list(self._columns)
+        if not keys:
+            return 0
+        cx, cz = center[0], center[2]
+        return max(
+            math.hypot(max(abs(chunk_x * 16 - cx), abs(chunk_x * 16 + 16 - cx)),
+                       max(abs(chunk_z * 16 - cz), abs(chunk_z * 16 + 16 - cz)))
+            for chunk_x, chunk_z in keys
+        )
+
+    def _height_bounds(self):
+        """キャッシュ済みのチャンク列のY座標の範囲 (最小, 最大+1) を返します。キャッシュが空の場合は None です。"""
+        with self._lock:
+            columns = list(self._columns.values())
+        if not columns:
+            return None
+        return (min(column.min_y for column in columns),
+                max(column.min_y + len(column.sections) * 16 for column in columns))
+
+    def _may_contain(self, chunk_x, chunk_z, y0, y1, state):
+        """チャンク列の y0〜y1 の範囲のセクションのパレットに state が含まれうるかを返します。"""
+        with self._lock:
+            column = self._columns.get((chunk_x, chunk_z))
+            if column is None:
+                return False
+            first = max(y0 - column.min_y, 0) >> 4
+            last = min((y1 - column.min_y) >> 4, len(column.sections) - 1)
+            for index in range(first, last + 1):
+                section = column.sections[index]
+                if section is None:
+                    if state == self.states.air_state:
+                        return True
+                elif (section.palette == state).any():
+                    return True
+        return False
+
+    def find_free_space(self, center, size, max_distance, exclude=None):
+        """
+        上部が空気で、その真下が掘れるブロックになっている X×Y×Z の空間を、center から近い順に探します。
+        候補位置を 16x16x16 のタイル（チャンクのセクションと同じ区切り）に分け、center に近いタイルから順に
+        累積和で一括判定します。見つかった候補より近い位置を含むタイルがなくなった時点で探索を終えるため、
+        max_distance が大きくても、近くに空間があれば必要な範囲しか読みません。
+
+        Args:
+            center (tuple): 探索の中心座標 (x, y, z)（小数可）
+            size (tuple): 空間の大きさ (X, Y, Z)
+            max_distance (float): 探索する最大距離
+            exclude (set): 候補から除外するブロック座標 (x, y, z) の集合
+
+        Returns:
+            tuple or None: 見つかった空間の南西角の座標 (x, y, z)。見つからない場合は ()、
+                           中心のチャンクがキャッシュされていない場合は None
+        """
+        if not self.is_loaded(center[0], center[2]):
+            return None
+        X, Y, Z = (max(1, int(v)) for v in size)
+        fx, fy, fz = (float(v) for v in center)
+        cx, cy, cz = math.floor(fx), math.floor(fy), math.floor(fz)
+        exclude = exclude or set()
+        air_state = self.states.air_state
+        diggable_states = self.states.diggable[self.states.block_of_state]
+        limit = min(max_distance, self._loaded_extent(center) + max(X, Z))
+
+        # 候補の南西角の範囲。Y はワールドの高さ範囲に収める（地面は y - 1、上端は y + Y - 1）
+        bounds = self._height_bounds()
+        if bounds is None:
+            return None
+        y_low = max(bounds[0] + 1, math.floor(fy - limit))
+        y_high = min(bounds[1] - Y, math.ceil(fy + limit))
+        if y_low > y_high:
+            return ()
+        x_low, x_high = math.floor(fx - limit), math.ceil(fx + limit)
+        z_low, z_high = math.floor(fz - limit), math.ceil(fz + limit)
+
+        tiles = []
+        for tx in range(x_low & ~15, x_high + 1, 16):
+            for tz in range(z_low & ~15, z_high + 1, 16):
+                # 地面のない（未ロードの）チャンクには候補がない
+                if (tx >> 4, tz >> 4) not in self._columns:
+                    continue
+                dx = max(tx - fx, 0.0, fx - (tx + 15))
+                dz = max(tz - fz, 0.0, fz - (tz + 15))
+                for ty in range(y_low & ~15, y_high + 1, 16):
+                    dy = max(ty - fy, 0.0, fy - (ty + 15))
+                    near = math.sqrt(dx * dx + dy * dy + dz * dz)
+                    if near <= limit:
+                        tiles.append((near, tx, ty, tz))
+        tiles.sort()
+
+        best = None
+        for near, tx, ty, tz in tiles:
+            if best is not None and near >= best[0]:
+                break
+            ya, yb = max(ty, y_low), min(ty + 15, y_high)
+            ny = yb - ya + 1
+            # 角のブロック自体が空気である必要があるため、空気を含まないセクションだけのタイルは読まない
+            if not self._may_contain(tx >> 4, tz >> 4, ya, yb, air_state):
+                continue
+            # 上部の空気判定に (X, Y, Z)、地面の判定に y - 1 の層が必要
+            origin = (tx, ya - 1, tz)
+            grid = self._state_grid(origin, (16 + X - 1, ny + Y, 16 + Z - 1))
+            air = (grid == air_state).astype(np.uint8)
+            ground = ((grid >= 0) & diggable_states[np.clip(grid, 0, None)]).astype(np.uint8)
+
+            air_ok = _window_sums(air, (X, Y, Z))[:, 1:, :] == X * Y * Z
+            ground_ok = _window_sums(ground, (X, 1, Z))[:, :ny, :] == X * Z
+            xs, ys, zs = np.nonzero(air_ok & ground_ok)
+            if not len(xs):
+                continue
+            wx, wy, wz = xs + tx, ys + ya, zs + tz
+            dist = np.sqrt((wx - fx) ** 2 + (wy - fy) ** 2 + (wz - fz) ** 2)
+            for i in np.argsort(dist, kind="stable").tolist():
+                if dist[i] > limit or (best is not None and dist[i] >= best[0]):
+                    break
+                cell = (int(wx[i]), int(wy[i]), int(wz[i]))
+                if cell == (cx, cy, cz) or cell in exclude:
+                    continue
+                best = (float(dist[i]), cell)
+                break
+        return best[1] if best is not None else ()
@@ -0,0 +1,76 @@
+import time
+from collections import OrderedDict
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """16進数で表した2つの知覚ハッシュの、異なるビットの数を返します。"""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+class VisionCache:
+    """
+    スクリーンショットの分析結果（YAML）を保持するキャッシュです。
+    キーは (BOTのブロック座標, 方角, attention_hint) で、同じキーの中では画像の知覚ハッシュ（dHash）が
+    max_distance ビット以内で一致する結果を返します。BOTが動いておらず景色も変わっていなければ、
+    画像分析のAPIを呼ばずに前回の結果を使えます。
+    ttl 秒を過ぎた結果は使わず、maxsize を超えた場合は最も長く使われていないものから削除します。
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300.0, max_distance: int = 4):
+        """
+        Args:
+            maxsize (int): 保持する結果の最大数
+            ttl (float): 結果の有効期間（秒）
+            max_distance (int): ほぼ同じ画像とみなす知覚ハッシュのハミング距離の上限（64ビット中）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, frame_hash: str | None) -> str | None:
+        """
+        ほぼ同じ画像の分析結果があれば返します。
+
+        Args:
+            key (tuple): (ブロック座標, 方角, attention_hint)
+            frame_hash (str | None): 画像の知覚ハッシュ
+
+        Returns:
+            str | None: 分析結果。該当がない場合はNone
+        """
+        if frame_hash is None:
+            self.misses += 1
+            return None
+        now = time.monotonic()
+        best = None
+        for entry_key in list(self._entries):
+            entry_hash, result, created_at = self._entries[entry_key]
+            if now - created_at > self.ttl:
+                del self._entries[entry_key]
+                continue
+            if entry_key[0] != key:
+                continue
+            distance = hamming_distance(entry_hash, frame_hash)
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, entry_key, result)
+        if best is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(best[1])
+        self.hits += 1
+        return best[2]
+
+    def put(self, key: tuple, frame_hash: str | None, result: str) -> None:
+        """分析結果を保存します。"""
+        if frame_hash is None:
+            return
+        self._entries[(key, frame_hash)] = (frame_hash, result, time.monotonic())
+        self._entries.move_to_end((key, frame_hash))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()